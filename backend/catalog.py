@@ -0,0 +1,727 @@
+"""Compiled, memory-mapped food catalog shared by server.py and simple_server.py.
+
+The JSON datasets are compiled once into ``datasets/catalog.bin``: fixed-width
+numeric columns, string-id columns, a shared string table and open-addressing
+hash tables for key lookup.  Workers mmap the file instead of parsing JSON, so
+opening the catalog costs the same whatever its size and every process shares
+the same pages through the OS page cache.
+
+Build it explicitly with ``python catalog.py build``; ``load_catalog`` also
+rebuilds it on the fly when the source datasets are newer than the image.
+
+``CatalogStore`` publishes immutable ``CatalogSnapshot`` objects (catalog,
+patients and every registered derived index) and swaps them atomically on
+reload, so request handlers grab ``store.current`` once and finish on it.
+Derived indexes and the name resolver decode every record, so a snapshot
+builds each of them on first use rather than when it is loaded.
+"""
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from abc import abstractmethod
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).parent
+DATASETS_DIR = ROOT_DIR / 'datasets'
+CATALOG_FILENAME = 'catalog.bin'
+
+FOOD_SOURCE = 'food_dataset.json'
+ALLERGY_SOURCE = 'allergy_map.json'
+RECIPE_SOURCE = 'recipes.json'
+ALIAS_SOURCE = 'food_aliases.json'
+PATIENT_SOURCE = 'patients.json'
+CATALOG_SOURCES = (FOOD_SOURCE, ALLERGY_SOURCE, RECIPE_SOURCE, ALIAS_SOURCE)
+
+MAGIC = b'AYCATLG\0'
+FORMAT_VERSION = 2
+
+# Record layout.  Field order matches food_dataset.json so rehydrated records
+# serialize exactly like the source.
+FOOD_FIELDS = (
+    'name', 'category', 'calories_per_100g', 'protein', 'carbs', 'fat', 'fiber',
+    'rasa', 'guna', 'virya', 'vipaka', 'dosha_effect', 'seasonal',
+    'climate_preference', 'allergens', 'preparation_time', 'cooking_method',
+)
+NUMERIC_FIELDS = ('calories_per_100g', 'protein', 'carbs', 'fat', 'fiber', 'preparation_time')
+STRING_FIELDS = ('name', 'category', 'virya', 'vipaka', 'climate_preference', 'cooking_method')
+LIST_FIELDS = ('rasa', 'guna', 'seasonal', 'allergens')
+DOSHAS = ('Vata', 'Pitta', 'Kapha')
+
+# FOODSTR row: key, string fields, one id per dosha, JSON of unknown fields, int mask.
+_STR_COLUMNS = 1 + len(STRING_FIELDS) + len(DOSHAS) + 2
+_EXTRAS_COLUMN = _STR_COLUMNS - 2
+_INTMASK_COLUMN = _STR_COLUMNS - 1
+_NONE = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<8sHHI16s')
+_SECTION = struct.Struct('<8sQQ')
+_SOURCE = struct.Struct('<IIQQ')
+
+
+class CatalogError(Exception):
+    """Raised when a compiled catalog is missing, corrupt or out of date."""
+
+
+def _fnv1a(data: bytes) -> int:
+    h = 0x811C9DC5
+    for byte in data:
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def _read_json(path: Path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def source_fingerprint(datasets_dir: Path = DATASETS_DIR, sources=CATALOG_SOURCES) -> List[tuple]:
+    """(name, size, mtime_ns) for each catalog source; a stat per file, no reads."""
+    fingerprint = []
+    for name in sources:
+        try:
+            st = os.stat(Path(datasets_dir) / name)
+            fingerprint.append((name, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            fingerprint.append((name, 0, 0))
+    return fingerprint
+
+
+def dataset_version(datasets_dir: Path = DATASETS_DIR) -> str:
+    """Content hash of the catalog sources, used as the dataset version."""
+    digest = hashlib.blake2b(digest_size=8)
+    for name in CATALOG_SOURCES:
+        path = Path(datasets_dir) / name
+        digest.update(name.encode())
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def check_aliases(foods: Mapping, aliases: Mapping):
+    """Raise ``CatalogError`` for aliases the resolver could not honour: an alias of a food that is
+    not in the catalog, one listed for two foods, or one that is another food's key or name."""
+    problems = [f"aliases for unknown food '{key}'" for key in aliases if key not in foods]
+    names = {}
+    for key, food in foods.items():
+        for name in (key, food.get('name', '')):
+            names.setdefault(FoodResolver._normalize(name), key)
+    owners: Dict[str, str] = {}
+    for key, listed in aliases.items():
+        for alias in listed:
+            normalized = FoodResolver._normalize(alias)
+            if owners.setdefault(normalized, key) != key:
+                problems.append(f"alias '{alias}' listed for both '{owners[normalized]}' and '{key}'")
+            elif names.get(normalized, key) != key:
+                problems.append(f"alias '{alias}' of '{key}' names the food '{names[normalized]}'")
+    if problems:
+        raise CatalogError(f"Invalid {ALIAS_SOURCE}: " + "; ".join(problems))
+
+
+# ---------------------------------------------------------------------------
+# Compiler
+# ---------------------------------------------------------------------------
+
+class _StringTable:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return sid
+
+    def pack(self) -> bytes:
+        blobs = [v.encode('utf-8') for v in self.values]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        head = struct.pack(f'<II{len(offsets)}I', len(blobs), 0, *offsets)
+        return head + b''.join(blobs)
+
+
+def _hash_slots(keys: List[str]) -> bytes:
+    capacity = 8
+    while capacity < len(keys) * 2:
+        capacity *= 2
+    slots = [0] * capacity
+    for index, key in enumerate(keys):
+        pos = _fnv1a(key.encode('utf-8')) & (capacity - 1)
+        while slots[pos]:
+            pos = (pos + 1) & (capacity - 1)
+        slots[pos] = index + 1
+    return struct.pack(f'<{capacity}I', *slots)
+
+
+def _keyed_lists(table: Dict[str, List[str]], strings: _StringTable, pool: List[int]) -> bytes:
+    rows = []
+    for key, values in table.items():
+        rows.extend((strings.add(key), len(pool), len(values)))
+        pool.extend(strings.add(str(v)) for v in values)
+    return struct.pack(f'<{len(rows)}I', *rows)
+
+
+def _encode_foods(foods: Dict[str, Dict[str, Any]], strings: _StringTable, pool: List[int]):
+    numeric = [[math.nan] * len(foods) for _ in NUMERIC_FIELDS]
+    str_rows: List[int] = []
+    list_rows: List[int] = []
+    for index, (key, food) in enumerate(foods.items()):
+        int_mask = 0
+        for col, field in enumerate(NUMERIC_FIELDS):
+            value = food.get(field)
+            if value is not None:
+                numeric[col][index] = float(value)
+                if isinstance(value, int) and not isinstance(value, bool):
+                    int_mask |= 1 << col
+        dosha = food.get('dosha_effect') or {}
+        extras = {k: v for k, v in food.items() if k not in FOOD_FIELDS}
+        if 'dosha_effect' in food and set(dosha) - set(DOSHAS):
+            extras['dosha_effect'] = dosha
+        str_rows.append(strings.add(key))
+        str_rows.extend(strings.add(food.get(field)) for field in STRING_FIELDS)
+        str_rows.extend(strings.add(dosha.get(d)) if 'dosha_effect' in food else _NONE for d in DOSHAS)
+        str_rows.append(strings.add(json.dumps(extras)) if extras else _NONE)
+        str_rows.append(int_mask)
+        for field in LIST_FIELDS:
+            values = food.get(field)
+            if values is None:
+                list_rows.extend((0, _NONE))
+            else:
+                list_rows.extend((len(pool), len(values)))
+                pool.extend(strings.add(str(v)) for v in values)
+    columns = b''.join(struct.pack(f'<{len(col)}d', *col) for col in numeric)
+    return (columns,
+            struct.pack(f'<{len(str_rows)}I', *str_rows),
+            struct.pack(f'<{len(list_rows)}I', *list_rows))
+
+
+def compile_catalog(datasets_dir: Path = DATASETS_DIR, output: Optional[Path] = None) -> Path:
+    """Compile the JSON datasets into a catalog image, replacing it atomically."""
+    datasets_dir = Path(datasets_dir)
+    output = Path(output) if output else datasets_dir / CATALOG_FILENAME
+    fingerprint = source_fingerprint(datasets_dir)
+
+    foods = _read_json(datasets_dir / FOOD_SOURCE, {})
+    allergy_map = _read_json(datasets_dir / ALLERGY_SOURCE, {})
+    recipes = _read_json(datasets_dir / RECIPE_SOURCE, {})
+    aliases = _read_json(datasets_dir / ALIAS_SOURCE, {})
+    check_aliases(foods, aliases)
+
+    strings = _StringTable()
+    pool: List[int] = []
+    food_num, food_str, food_lst = _encode_foods(foods, strings, pool)
+    allergy_rows = _keyed_lists(allergy_map, strings, pool)
+    recipe_rows = _keyed_lists(recipes, strings, pool)
+    alias_rows = _keyed_lists(aliases, strings, pool)
+    sources = b''.join(_SOURCE.pack(strings.add(name), 0, size, mtime)
+                       for name, size, mtime in fingerprint)
+
+    sections = [
+        (b'FOODNUM\0', food_num),
+        (b'FOODSTR\0', food_str),
+        (b'FOODLST\0', food_lst),
+        (b'FOODHSH\0', _hash_slots(list(foods))),
+        (b'ALLERGY\0', allergy_rows),
+        (b'ALLGHSH\0', _hash_slots(list(allergy_map))),
+        (b'RECIPES\0', recipe_rows),
+        (b'RECPHSH\0', _hash_slots(list(recipes))),
+        (b'ALIASES\0', alias_rows),
+        (b'ALIAHSH\0', _hash_slots(list(aliases))),
+        (b'LISTPOOL', struct.pack(f'<{len(pool)}I', *pool)),
+        (b'SOURCES\0', sources),
+        (b'STRINGS\0', strings.pack()),
+    ]
+
+    version = dataset_version(datasets_dir)
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    directory, body = [], []
+    for name, payload in sections:
+        padding = -offset % 8
+        body.append(b'\0' * padding)
+        offset += padding
+        directory.append(_SECTION.pack(name, offset, len(payload)))
+        body.append(payload)
+        offset += len(payload)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(sections), version.encode('ascii'))
+
+    fd, tmp_path = tempfile.mkstemp(dir=output.parent, prefix='.catalog-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), 0o644)
+            f.write(header)
+            f.write(b''.join(directory))
+            f.write(b''.join(body))
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    logging.info(f"Compiled catalog {version} with {len(foods)} foods to {output}")
+    return output
+
+
+# ---------------------------------------------------------------------------
+# Loader
+# ---------------------------------------------------------------------------
+
+class _Image:
+    """Zero-copy views over the sections of a mapped catalog file."""
+
+    def __init__(self, path: Path):
+        if sys.byteorder != 'little':
+            raise CatalogError("Compiled catalogs are little-endian only")
+        with open(path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # empty file
+                raise CatalogError(f"Empty catalog image {path}") from e
+        buf = memoryview(self._mmap)
+        if len(buf) < _HEADER.size:
+            raise CatalogError(f"Truncated catalog image {path}")
+        magic, fmt, _, count, version = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise CatalogError(f"Unsupported catalog image {path} (format {fmt})")
+        self.version = version.decode('ascii')
+        self.sections: Dict[str, memoryview] = {}
+        for i in range(count):
+            name, offset, length = _SECTION.unpack_from(buf, _HEADER.size + i * _SECTION.size)
+            if offset + length > len(buf):
+                raise CatalogError(f"Corrupt section {name!r} in {path}")
+            self.sections[name.rstrip(b'\0').decode('ascii')] = buf[offset:offset + length]
+
+        strings = self.sections['STRINGS']
+        string_count = struct.unpack_from('<I', strings, 0)[0]
+        self._string_offsets = strings[8:8 + 4 * (string_count + 1)].cast('I')
+        self._string_blob = strings[8 + 4 * (string_count + 1):]
+        self._string_cache: Dict[int, str] = {}
+
+        self.pool = self.sections['LISTPOOL'].cast('I')
+
+    def string(self, sid: int) -> Optional[str]:
+        if sid == _NONE:
+            return None
+        value = self._string_cache.get(sid)
+        if value is None:
+            start, end = self._string_offsets[sid], self._string_offsets[sid + 1]
+            value = self._string_cache[sid] = str(self._string_blob[start:end], 'utf-8')
+        return value
+
+    def strings(self, start: int, count: int) -> List[str]:
+        return [self.string(sid) for sid in self.pool[start:start + count]]
+
+    def sources(self) -> List[tuple]:
+        return [(self.string(sid), size, mtime)
+                for sid, _, size, mtime in _SOURCE.iter_unpack(self.sections['SOURCES'])]
+
+    def close(self):
+        self.sections.clear()
+        self._string_offsets = self._string_blob = self.pool = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views are still referenced (e.g. by an in-flight request); the
+            # mapping is released when they are garbage collected.
+            pass
+
+
+class _HashedTable(Mapping):
+    """Read-only mapping backed by an open-addressing hash section.
+
+    ``Mapping`` is already abstract, so subclasses missing ``_key_sid`` or
+    ``_decode`` fail when instantiated.
+    """
+
+    def __init__(self, image: _Image, slots: memoryview, size: int):
+        self._image = image
+        self._slots = slots.cast('I')
+        self._mask = len(self._slots) - 1
+        self._size = size
+        self._cache: Dict[int, Any] = {}
+
+    @abstractmethod
+    def _key_sid(self, index: int) -> int:
+        """String id of row ``index``'s key."""
+
+    @abstractmethod
+    def _decode(self, index: int):
+        """The value of row ``index``."""
+
+    def index_of(self, key: str) -> int:
+        """Row index of ``key`` in the image, or -1 when absent."""
+        if not isinstance(key, str) or not self._size:
+            return -1
+        pos = _fnv1a(key.encode('utf-8')) & self._mask
+        while True:
+            slot = self._slots[pos]
+            if not slot:
+                return -1
+            if self._image.string(self._key_sid(slot - 1)) == key:
+                return slot - 1
+            pos = (pos + 1) & self._mask
+
+    def record(self, index: int):
+        value = self._cache.get(index)
+        if value is None:
+            value = self._cache[index] = self._decode(index)
+        return value
+
+    def key_at(self, index: int) -> str:
+        return self._image.string(self._key_sid(index))
+
+    def __getitem__(self, key):
+        index = self.index_of(key)
+        if index < 0:
+            raise KeyError(key)
+        return self.record(index)
+
+    def __contains__(self, key):
+        return self.index_of(key) >= 0
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self.key_at(index)
+
+    def __len__(self):
+        return self._size
+
+    def items(self):
+        return ((self.key_at(i), self.record(i)) for i in range(self._size))
+
+    def values(self):
+        return (self.record(i) for i in range(self._size))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+
+class FoodTable(_HashedTable):
+    """Food records decoded lazily from the columns of a catalog image."""
+
+    def __init__(self, image: _Image):
+        self._str_rows = image.sections['FOODSTR'].cast('I')
+        self._list_rows = image.sections['FOODLST'].cast('I')
+        size = len(self._str_rows) // _STR_COLUMNS
+        super().__init__(image, image.sections['FOODHSH'], size)
+        numeric = image.sections['FOODNUM'].cast('d')
+        self.columns = {field: numeric[i * size:(i + 1) * size]
+                        for i, field in enumerate(NUMERIC_FIELDS)}
+
+    def _key_sid(self, index: int) -> int:
+        return self._str_rows[index * _STR_COLUMNS]
+
+    def _decode(self, index: int) -> Dict[str, Any]:
+        image = self._image
+        row = self._str_rows[index * _STR_COLUMNS:(index + 1) * _STR_COLUMNS]
+        values: Dict[str, Any] = {}
+        for col, field in enumerate(STRING_FIELDS, start=1):
+            if row[col] != _NONE:
+                values[field] = image.string(row[col])
+        int_mask = row[_INTMASK_COLUMN]
+        for col, field in enumerate(NUMERIC_FIELDS):
+            value = self.columns[field][index]
+            if not math.isnan(value):
+                values[field] = int(value) if int_mask & (1 << col) else value
+        for col, field in enumerate(LIST_FIELDS):
+            start, count = self._list_rows[(index * len(LIST_FIELDS) + col) * 2:][:2]
+            if count != _NONE:
+                values[field] = image.strings(start, count)
+        dosha_ids = row[1 + len(STRING_FIELDS):1 + len(STRING_FIELDS) + len(DOSHAS)]
+        if any(sid != _NONE for sid in dosha_ids):
+            values['dosha_effect'] = {d: image.string(sid) for d, sid in zip(DOSHAS, dosha_ids)
+                                      if sid != _NONE}
+        extras = json.loads(image.string(row[_EXTRAS_COLUMN])) if row[_EXTRAS_COLUMN] != _NONE else {}
+        values.update(extras)
+        record = {field: values.pop(field) for field in FOOD_FIELDS if field in values}
+        record.update(values)
+        return record
+
+
+class ListTable(_HashedTable):
+    """``name -> [str, ...]`` tables: the allergy map, recipes and food aliases."""
+
+    def __init__(self, image: _Image, rows: str, slots: str):
+        self._rows = image.sections[rows].cast('I')
+        super().__init__(image, image.sections[slots], len(self._rows) // 3)
+
+    def _key_sid(self, index: int) -> int:
+        return self._rows[index * 3]
+
+    def _decode(self, index: int) -> List[str]:
+        return self._image.strings(self._rows[index * 3 + 1], self._rows[index * 3 + 2])
+
+
+class Catalog:
+    """Foods, allergy map, recipe table and food aliases of one dataset version."""
+
+    def __init__(self, version: str, foods: Mapping, allergy_map: Mapping,
+                 recipes: Mapping, aliases: Mapping, image: Optional[_Image] = None):
+        self.version = version
+        self.foods = foods
+        self.allergy_map = allergy_map
+        self.recipes = recipes
+        self.aliases = aliases
+        self._image = image
+
+    @property
+    def compiled(self) -> bool:
+        return self._image is not None
+
+    @classmethod
+    def open(cls, path: Path) -> 'Catalog':
+        """Map a compiled catalog image."""
+        image = _Image(Path(path))
+        return cls(image.version, FoodTable(image),
+                   ListTable(image, 'ALLERGY', 'ALLGHSH'),
+                   ListTable(image, 'RECIPES', 'RECPHSH'),
+                   ListTable(image, 'ALIASES', 'ALIAHSH'),
+                   image)
+
+    @classmethod
+    def from_sources(cls, datasets_dir: Path = DATASETS_DIR) -> 'Catalog':
+        """Parse the JSON datasets directly (used when no image can be written)."""
+        datasets_dir = Path(datasets_dir)
+        foods = _read_json(datasets_dir / FOOD_SOURCE, {})
+        aliases = _read_json(datasets_dir / ALIAS_SOURCE, {})
+        check_aliases(foods, aliases)
+        return cls(dataset_version(datasets_dir), foods,
+                   _read_json(datasets_dir / ALLERGY_SOURCE, {}),
+                   _read_json(datasets_dir / RECIPE_SOURCE, {}),
+                   aliases)
+
+    def is_stale(self, datasets_dir: Path = DATASETS_DIR) -> bool:
+        if self._image is None:
+            return False
+        return [tuple(s) for s in self._image.sources()] != source_fingerprint(datasets_dir)
+
+    def close(self):
+        if self._image is not None:
+            self._image.close()
+
+
+def load_catalog(datasets_dir: Path = DATASETS_DIR, path: Optional[Path] = None) -> Catalog:
+    """Open the compiled catalog, (re)building it first if missing or stale."""
+    datasets_dir = Path(datasets_dir)
+    path = Path(path) if path else datasets_dir / CATALOG_FILENAME
+    try:
+        catalog = Catalog.open(path)
+        if not catalog.is_stale(datasets_dir):
+            return catalog
+        catalog.close()
+        logging.info(f"Catalog image {path} is stale, rebuilding")
+    except (FileNotFoundError, CatalogError, KeyError) as e:
+        logging.info(f"Catalog image unavailable ({e}), compiling")
+    try:
+        compile_catalog(datasets_dir, path)
+        return Catalog.open(path)
+    except OSError as e:
+        logging.warning(f"Could not write catalog image {path} ({e}); using JSON datasets")
+        return Catalog.from_sources(datasets_dir)
+
+
+# ---------------------------------------------------------------------------
+# Name resolution
+# ---------------------------------------------------------------------------
+
+class FoodResolver:
+    """Maps keys, display names, spelling variants and aliases to a food key.
+
+    Precedence is key > display name > spelling variant > alias.  Aliases
+    are unambiguous: the compiler rejects one listed for two foods or naming
+    another food (``check_aliases``).
+    """
+
+    def __init__(self, foods: Mapping, aliases: Mapping):
+        self._lookup: Dict[str, str] = {}
+        self.spellings: Dict[str, List[str]] = {}
+        self.aliases: Dict[str, List[str]] = {}
+        self.alias_patterns: Dict[str, Any] = {}
+
+        for key in foods:
+            self._lookup.setdefault(key.lower(), key)
+        for key, food in foods.items():
+            self._lookup.setdefault(food['name'].lower(), key)
+        for key, food in foods.items():
+            name = food['name'].lower()
+            variants = [key.lower(), name, name.replace(' ', ''),
+                        key.replace('_', ' ').lower(), key.replace('_', '').lower()]
+            self.spellings[key] = list(dict.fromkeys(variants))
+            for variant in variants:
+                self._lookup.setdefault(variant, key)
+        for key, names in aliases.items():
+            if key not in foods:
+                continue
+            names = [n.lower() for n in names]
+            self.aliases[key] = names
+            self.alias_patterns[key] = re.compile(
+                r'\b(?:' + '|'.join(re.escape(n) for n in names) + r')(?:e?s)?\b')
+            for alias in names:
+                self._lookup.setdefault(alias, key)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return ' '.join(text.lower().replace('_', ' ').split())
+
+    def resolve(self, text: Optional[str]) -> Optional[str]:
+        """Canonical food key for ``text``, or None when it names no food."""
+        if not text:
+            return None
+        key = self._lookup.get(text.lower().strip())
+        if key is None:
+            normalized = self._normalize(text)
+            key = self._lookup.get(normalized) or self._lookup.get(normalized.replace(' ', ''))
+        return key
+
+
+# ---------------------------------------------------------------------------
+# Versioned snapshots and hot reload
+# ---------------------------------------------------------------------------
+
+class CatalogSnapshot:
+    """One immutable dataset version plus the indexes derived from it."""
+
+    def __init__(self, catalog: Catalog, patients: List[Dict[str, Any]], patients_digest: str,
+                 builders: Optional[Dict[str, Callable[['CatalogSnapshot'], Any]]] = None):
+        self.catalog = catalog
+        self.foods = catalog.foods
+        self.allergy_map = catalog.allergy_map
+        self.recipes = catalog.recipes
+        self.aliases = catalog.aliases
+        self.patients = patients
+        self.version = hashlib.blake2b(f"{catalog.version}:{patients_digest}".encode(),
+                                       digest_size=6).hexdigest()
+        self.loaded_at = time.time()
+        self.builders = dict(builders or {})
+        self.indexes: Dict[str, Any] = {}
+        self._resolver: Optional[FoodResolver] = None
+        # Reentrant: a builder may use another index of the same snapshot
+        self._build_lock = threading.RLock()
+
+    @property
+    def resolver(self) -> FoodResolver:
+        if self._resolver is None:
+            with self._build_lock:
+                if self._resolver is None:
+                    self._resolver = FoodResolver(self.foods, self.aliases)
+        return self._resolver
+
+    def index(self, name: str):
+        """A derived index registered with ``CatalogStore.register_index``, built on first use."""
+        try:
+            return self.indexes[name]
+        except KeyError:
+            with self._build_lock:
+                if name not in self.indexes:
+                    self.indexes[name] = self.builders[name](self)
+                return self.indexes[name]
+
+
+class CatalogStore:
+    """Holds the active snapshot and atomically replaces it on reload."""
+
+    def __init__(self, datasets_dir: Path = DATASETS_DIR):
+        self.datasets_dir = Path(datasets_dir)
+        self._builders: Dict[str, Callable[[CatalogSnapshot], Any]] = {}
+        self._subscribers: List[Callable[[CatalogSnapshot], None]] = []
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._fingerprint = self._current_fingerprint()
+        self.current = self._build_snapshot()
+
+    def _current_fingerprint(self) -> List[tuple]:
+        return source_fingerprint(self.datasets_dir, CATALOG_SOURCES + (PATIENT_SOURCE,))
+
+    def _build_snapshot(self) -> CatalogSnapshot:
+        catalog = load_catalog(self.datasets_dir)
+        patients_path = self.datasets_dir / PATIENT_SOURCE
+        raw = patients_path.read_bytes() if patients_path.exists() else b'[]'
+        return CatalogSnapshot(catalog, json.loads(raw), hashlib.blake2b(raw, digest_size=8).hexdigest(),
+                               self._builders)
+
+    def register_index(self, name: str, builder: Callable[[CatalogSnapshot], Any]):
+        """Derive ``name`` from every snapshot, the first time ``snapshot.index(name)`` is called."""
+        with self._reload_lock:
+            self._builders[name] = builder
+            self.current.builders[name] = builder
+
+    def subscribe(self, callback: Callable[[CatalogSnapshot], None]):
+        """Call ``callback(snapshot)`` after each publish."""
+        self._subscribers.append(callback)
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the snapshot if the datasets changed; returns True when a new one was published."""
+        with self._reload_lock:
+            fingerprint = self._current_fingerprint()
+            if not force and fingerprint == self._fingerprint:
+                return False
+            try:
+                snapshot = self._build_snapshot()
+            except Exception as e:
+                # Keep serving the previous version; a half-written dataset
+                # file is retried on the next poll.
+                logging.error(f"Dataset reload failed, keeping {self.current.version}: {e}")
+                return False
+            self._fingerprint = fingerprint
+            if not force and snapshot.version == self.current.version:
+                return False
+            previous, self.current = self.current, snapshot
+        logging.info(f"Published dataset version {snapshot.version} (was {previous.version})")
+        for callback in self._subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logging.error(f"Dataset reload subscriber failed: {e}")
+        return True
+
+    def start_watcher(self, interval: float = 5.0):
+        """Poll the dataset files in a daemon thread and reload on change."""
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload()
+
+        self._watcher = threading.Thread(target=watch, name='dataset-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect the compiled food catalog")
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('--datasets', default=str(DATASETS_DIR))
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.command == 'build':
+        print(compile_catalog(args.datasets, args.output))
+    else:
+        catalog = Catalog.open(args.output or Path(args.datasets) / CATALOG_FILENAME)
+        print(f"version={catalog.version} foods={len(catalog.foods)} "
+              f"allergens={len(catalog.allergy_map)} recipes={len(catalog.recipes)} "
+              f"stale={catalog.is_stale(args.datasets)}")
@@ -0,0 +1,277 @@
+"""Compact storage of diet charts.
+
+A chart's foods are catalog records scaled to a portion, so a stored chart
+keeps per meal only one ``[key, base grams, fitted grams, [swap keys]]`` entry
+per food and the rationale, plus the weather, the dataset version, the patient fields the
+portion notes derive from and the chart-level texts.  ``rehydrate`` rebuilds
+the API shape (``EnhancedDietChart``) from the catalog foods of the chart's
+dataset version with the same arithmetic chart generation uses
+(``food_item``, ``meal``, ``chart_notes``).  ``patient_diet_charts`` entries
+reference their chart by ``chart_id`` instead of embedding a second copy.
+
+Food records are archived in ``catalog_foods`` per (dataset version, key) the
+first time a chart using them is saved, so charts saved before a catalog
+reload still rehydrate to what was served.
+
+Charts saved in the old full form are read as they are and compacted on first
+read (``compact_legacy``), only when rehydrating the compact form reproduces
+them exactly.  Schema 2 charts, which packed each food into one
+``"key|base|grams|swap,keys"`` string, are still read as they are.
+"""
+import re
+from collections import ChainMap
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+
+SCHEMA = 3
+# Compact schemas rehydrate can read; 2 stored each food as a "key|base|grams|swaps" string
+COMPACT_SCHEMAS = (2, SCHEMA)
+ARCHIVE = 'catalog_foods'
+# Chart fields stored as they are
+STORED_FIELDS = ('id', 'patient_id', 'created_at', 'weather_context', 'total_daily_calories', 'ayurvedic_analysis',
+                 'recommendations', 'dataset_version', 'degraded_stages')
+# Chart fields rebuilt on read
+DERIVED_FIELDS = ('meals', 'smart_swaps_applied', 'portion_adjustments')
+# Stored-only fields, not part of the API shape
+INTERNAL_FIELDS = ('schema', 'patient', 'inputs', 'root_id')
+
+_SCALED_TARGET = re.compile(r"of (\d+) kcal/day target")
+
+
+def encode_food(food_key: str, base_portion: int, portion_g: int, swaps: Iterable[str]) -> list:
+    return [food_key, base_portion, portion_g, list(swaps)]
+
+
+def decode_food(stored_food) -> Tuple[str, int, int, List[str]]:
+    if isinstance(stored_food, str):
+        # Schema 2
+        food_key, base_portion, portion_g, swaps = stored_food.rsplit('|', 3)
+        return food_key, int(base_portion), int(portion_g), swaps.split(',') if swaps else []
+    food_key, base_portion, portion_g, swaps = stored_food
+    return food_key, base_portion, portion_g, list(swaps)
+
+
+def food_item(food: Mapping[str, Any], portion_g: int, base_portion: int, swaps: List[str],
+              activity_level: Optional[str], target_adjusted: bool) -> Dict[str, Any]:
+    """One ``EnhancedFoodItem``: the catalog record with nutrition for ``portion_g`` grams."""
+    factor = portion_g / 100
+    return {
+        'name': food['name'],
+        'category': food['category'],
+        'quantity': f"{portion_g}g",
+        'calories': int(food['calories_per_100g'] * factor),
+        'protein': round(food['protein'] * factor, 1),
+        'carbs': round(food['carbs'] * factor, 1),
+        'fat': round(food['fat'] * factor, 1),
+        'fiber': round(food['fiber'] * factor, 1),
+        'rasa': food['rasa'],
+        'guna': food['guna'],
+        'virya': food['virya'],
+        'vipaka': food['vipaka'],
+        'dosha_effect': food['dosha_effect'],
+        'allergens': food.get('allergens', []),
+        'smart_swaps': swaps,
+        'portion_info': {
+            "age_adjusted": True,
+            "activity_level": activity_level,
+            "base_portion": base_portion,
+            "target_adjusted": target_adjusted
+        }
+    }
+
+
+def meal(meal_type: str, foods: List[Dict[str, Any]], rationale: str) -> Dict[str, Any]:
+    """One ``Meal`` with its calorie total and macronutrient bars."""
+    protein_cal = sum(f['protein'] * 4 for f in foods)
+    carb_cal = sum(f['carbs'] * 4 for f in foods)
+    fat_cal = sum(f['fat'] * 9 for f in foods)
+    total_cal = protein_cal + carb_cal + fat_cal
+    return {
+        'meal_type': meal_type.title(),
+        'foods': foods,
+        'total_calories': sum(f['calories'] for f in foods),
+        'ayurvedic_rationale': rationale,
+        'nutrient_bars': {
+            "protein": round((protein_cal / total_cal * 100) if total_cal > 0 else 0, 1),
+            "carbs": round((carb_cal / total_cal * 100) if total_cal > 0 else 0, 1),
+            "fat": round((fat_cal / total_cal * 100) if total_cal > 0 else 0, 1)
+        }
+    }
+
+
+def chart_notes(foods: Mapping[str, Any], portions: Dict[str, List[tuple]], swaps: Dict[str, List[List[str]]],
+                portion_note: Optional[str], calorie_target: Optional[int]) -> Tuple[List[str], Dict[str, str]]:
+    """``smart_swaps_applied`` and ``portion_adjustments`` for (key, base, grams) portions and swap keys."""
+    smart_swaps_applied = []
+    portion_adjustments = {}
+    for meal_type, meal_portions in portions.items():
+        for (food_key, base_portion, portion_g), food_swaps in zip(meal_portions, swaps[meal_type]):
+            name = foods[food_key]['name']
+            if food_swaps:
+                smart_swaps_applied.append(f"{name} → {foods[food_swaps[0]]['name']}")
+            portion_adjustments[name] = portion_note
+            if calorie_target and portion_g != base_portion:
+                portion_adjustments[name] += f", scaled {base_portion}g → {portion_g}g for {calorie_target} kcal/day"
+    return smart_swaps_applied, portion_adjustments
+
+
+def compact(chart: Dict[str, Any], portions: Dict[str, List[tuple]], swaps: Dict[str, List[List[str]]],
+            patient: Dict[str, Any], **extra) -> Dict[str, Any]:
+    """The stored form of ``chart`` (``EnhancedDietChart.dict()``), built from ``portions`` and swap keys."""
+    stored = {field: chart[field] for field in STORED_FIELDS}
+    stored.update(extra)
+    stored['schema'] = SCHEMA
+    stored['patient'] = patient
+    stored['meals'] = [
+        {
+            'meal_type': str(getattr(built['meal_type'], 'value', built['meal_type'])),
+            'rationale': built['ayurvedic_rationale'],
+            'foods': [encode_food(food_key, base_portion, portion_g, food_swaps)
+                      for (food_key, base_portion, portion_g), food_swaps in zip(portions[meal_type], swaps[meal_type])]
+        }
+        for meal_type, built in zip(portions, chart['meals'])
+    ]
+    return stored
+
+
+def stored_portions(stored: Dict[str, Any]) -> Tuple[Dict[str, List[tuple]], Dict[str, List[List[str]]]]:
+    """(key, base, grams) portions and swap keys per meal of a stored chart."""
+    portions, swaps = {}, {}
+    for stored_meal in stored['meals']:
+        meal_type = stored_meal['meal_type'].lower()
+        foods = [decode_food(stored_food) for stored_food in stored_meal['foods']]
+        portions[meal_type] = [(key, base, grams) for key, base, grams, _ in foods]
+        swaps[meal_type] = [food_swaps for _, _, _, food_swaps in foods]
+    return portions, swaps
+
+
+def _known_foods(stored_meal: Dict[str, Any], foods: Mapping[str, Any]) -> List[Tuple[str, int, int, List[str]]]:
+    """Decoded foods of a stored meal, leaving out foods and swaps no longer in ``foods``."""
+    return [(key, base, grams, [swap for swap in food_swaps if swap in foods])
+            for key, base, grams, food_swaps in map(decode_food, stored_meal['foods']) if key in foods]
+
+
+def _meal(stored_meal: Dict[str, Any], known: List[tuple], foods: Mapping[str, Any],
+          patient: Dict[str, Any]) -> Dict[str, Any]:
+    target_adjusted = bool(patient['calorie_target'])
+    return meal(stored_meal['meal_type'], [
+        food_item(foods[key], grams, base, [foods[swap]['name'] for swap in food_swaps],
+                  patient['activity_level'], target_adjusted)
+        for key, base, grams, food_swaps in known
+    ], stored_meal['rationale'])
+
+
+def rehydrate_meal(stored_meal: Dict[str, Any], foods: Mapping[str, Any], patient: Dict[str, Any]) -> Dict[str, Any]:
+    """The API shape of one stored meal."""
+    return _meal(stored_meal, _known_foods(stored_meal, foods), foods, patient)
+
+
+def rehydrate(stored: Dict[str, Any], foods: Mapping[str, Any]) -> Dict[str, Any]:
+    """The API shape of a stored chart; charts still in the full form are returned as they are."""
+    if stored.get('schema') not in COMPACT_SCHEMAS:
+        return stored
+    patient = stored['patient']
+    chart = {field: value for field, value in stored.items() if field not in INTERNAL_FIELDS}
+    chart['meals'], portions, swaps = [], {}, {}
+    for stored_meal in stored['meals']:
+        known = _known_foods(stored_meal, foods)
+        meal_type = stored_meal['meal_type'].lower()
+        portions[meal_type] = [(key, base, grams) for key, base, grams, _ in known]
+        swaps[meal_type] = [food_swaps for _, _, _, food_swaps in known]
+        chart['meals'].append(_meal(stored_meal, known, foods, patient))
+    chart['smart_swaps_applied'], chart['portion_adjustments'] = chart_notes(
+        foods, portions, swaps, patient['portion_note'], patient['calorie_target']
+    )
+    return chart
+
+
+def food_keys(stored: Dict[str, Any]) -> Set[str]:
+    """Every catalog key a stored chart refers to."""
+    keys = set()
+    for stored_meal in stored.get('meals', []):
+        for key, _, _, food_swaps in map(decode_food, stored_meal['foods']):
+            keys.add(key)
+            keys.update(food_swaps)
+    return keys
+
+
+def food_names(snapshot) -> Dict[str, str]:
+    """Catalog key for each food name (first key wins), for compacting old charts."""
+    names = {}
+    for key, food in snapshot.foods.items():
+        names.setdefault(food['name'], key)
+    return names
+
+
+def compact_legacy(chart: Dict[str, Any], foods: Mapping[str, Any], names: Mapping[str, str]) -> Optional[Dict[str, Any]]:
+    """The stored form of a chart saved in the full form, or None unless it rehydrates to the same chart."""
+    try:
+        meals, portion_note, activity_level = [], None, None
+        for full_meal in chart['meals']:
+            stored_foods = []
+            for food in full_meal['foods']:
+                portion_info = food['portion_info']
+                activity_level = portion_info['activity_level']
+                stored_foods.append(encode_food(names[food['name']], portion_info['base_portion'],
+                                                int(food['quantity'][:-1]), [names[swap] for swap in food['smart_swaps']]))
+            meals.append({'meal_type': full_meal['meal_type'], 'rationale': full_meal['ayurvedic_rationale'],
+                          'foods': stored_foods})
+        for note in chart['portion_adjustments'].values():
+            portion_note = note.split(", scaled ")[0]
+            break
+        scaled = [m.group(1) for m in map(_SCALED_TARGET.search, chart['recommendations']) if m]
+        stored = {field: value for field, value in chart.items()
+                  if field not in DERIVED_FIELDS and field != '_id'}
+        if 'inputs' in stored:
+            # Portions are now read from the stored meals
+            stored['inputs'] = {field: value for field, value in stored['inputs'].items() if field != 'portions'}
+        stored.update(schema=SCHEMA, meals=meals, patient={
+            'portion_note': portion_note,
+            'activity_level': activity_level,
+            'calorie_target': int(scaled[0]) if scaled else None
+        })
+    except (KeyError, ValueError, TypeError, AttributeError):
+        return None
+    rebuilt = rehydrate(stored, foods)
+    if any(rebuilt.get(field) != chart.get(field) for field in DERIVED_FIELDS + STORED_FIELDS):
+        return None
+    return stored
+
+
+class FoodArchive:
+    """Catalog food records by dataset version, for rehydrating charts after a catalog reload."""
+
+    def __init__(self):
+        # (version, key) pairs this process has archived
+        self.saved: Set[Tuple[Optional[str], str]] = set()
+
+    async def remember(self, db, version: Optional[str], foods: Mapping[str, Any], keys: Iterable[str]):
+        new = sorted(key for key in keys if (version, key) not in self.saved and key in foods)
+        if not new:
+            return
+        await db[ARCHIVE].bulk_write([
+            UpdateOne({'_id': f"{version}|{key}"},
+                      {'$setOnInsert': {'version': version, 'key': key, 'food': dict(foods[key])}},
+                      upsert=True)
+            for key in new
+        ], ordered=False)
+        self.saved.update((version, key) for key in new)
+
+    async def lookup(self, db, snapshot, stored_charts: Iterable[Dict[str, Any]]) -> Dict[Optional[str], Mapping]:
+        """Food records to rehydrate charts with, by dataset version; one query for older versions."""
+        wanted: Dict[Optional[str], Set[str]] = {}
+        for stored in stored_charts:
+            version = stored.get('dataset_version')
+            if stored.get('schema') in COMPACT_SCHEMAS and version != snapshot.version:
+                wanted.setdefault(version, set()).update(food_keys(stored))
+        foods_by_version: Dict[Optional[str], Mapping] = {snapshot.version: snapshot.foods}
+        if wanted:
+            ids = [f"{version}|{key}" for version, keys in wanted.items() for key in keys]
+            archived: Dict[Optional[str], Dict[str, Any]] = {}
+            for record in await db[ARCHIVE].find({'_id': {'$in': ids}}).to_list(length=None):
+                archived.setdefault(record['version'], {})[record['key']] = record['food']
+            # Foods missing from the archive are taken from the current catalog
+            for version in wanted:
+                foods_by_version[version] = ChainMap(archived.get(version, {}), snapshot.foods)
+        return foods_by_version
@@ -0,0 +1,93 @@
+"""Versioned diet charts stored as deltas.
+
+A generated chart is saved in ``enhanced_diet_charts`` (in the compact form of
+chart_storage.py) together with the ``inputs`` later regenerations start
+from: the request without its recipe images and the parsed recipe
+ingredients.  Regenerating it with a changed input saves only a delta in
+``diet_chart_versions``: the stored meals that came out different, the
+weather when it was refetched, and the chart-level summary (totals,
+recommendations), linked to its parent and to the root chart.
+
+Any version is rebuilt by loading the root and its deltas (two indexed
+queries) and overlaying the deltas along the parent chain, so a doctor may
+branch from any earlier version.
+"""
+import copy
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING
+
+VERSIONS = 'diet_chart_versions'
+# Chart fields every version stores, as they change with any meal
+SUMMARY_FIELDS = ('total_daily_calories', 'ayurvedic_analysis', 'recommendations', 'dataset_version',
+                  'degraded_stages', 'patient')
+
+
+async def ensure_indexes(db):
+    await db.enhanced_diet_charts.create_index([('id', ASCENDING)])
+    await db[VERSIONS].create_index([('id', ASCENDING)], unique=True)
+    await db[VERSIONS].create_index([('root_id', ASCENDING)])
+
+
+def meal_key(meal: Dict[str, Any]) -> str:
+    return meal['meal_type'].lower()
+
+
+def root_fields(chart_id: str) -> Dict[str, Any]:
+    """Fields stored with a freshly generated chart so it can be regenerated."""
+    return {'version': 1, 'parent_id': None, 'root_id': chart_id}
+
+
+def make_delta(parent: Dict[str, Any], chart: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """What stored ``chart`` (a regeneration of stored ``parent``) changed, as a version document."""
+    parent_meals = {meal_key(meal): meal for meal in parent['meals']}
+    delta = {
+        'id': chart['id'],
+        'root_id': parent['root_id'],
+        'parent_id': parent['id'],
+        'version': parent['version'] + 1,
+        'patient_id': chart['patient_id'],
+        'created_at': chart['created_at'],
+        'changes': changes,
+        'meals': {meal_key(meal): meal for meal in chart['meals'] if parent_meals.get(meal_key(meal)) != meal},
+        'request': chart['inputs']['request'],
+    }
+    delta.update({field: chart[field] for field in SUMMARY_FIELDS})
+    if chart['weather_context'] != parent['weather_context']:
+        delta['weather_context'] = chart['weather_context']
+    return delta
+
+
+def overlay(root: Dict[str, Any], deltas: Iterable[Dict[str, Any]], chart_id: str) -> Optional[Dict[str, Any]]:
+    """The stored chart for version ``chart_id`` of ``root``."""
+    by_id = {delta['id']: delta for delta in deltas}
+    chain: List[Dict[str, Any]] = []
+    current = by_id.get(chart_id)
+    while current is not None:
+        chain.append(current)
+        current = by_id.get(current['parent_id'])
+    if not chain or chain[-1]['parent_id'] != root['id']:
+        return None
+
+    chart = copy.deepcopy(root)
+    for delta in reversed(chain):
+        chart['meals'] = [delta['meals'].get(meal_key(meal), meal) for meal in chart['meals']]
+        chart['inputs']['request'] = delta['request']
+        chart['weather_context'] = delta.get('weather_context', chart['weather_context'])
+        chart.update({field: delta[field] for field in SUMMARY_FIELDS + ('id', 'parent_id', 'version', 'created_at')})
+    return chart
+
+
+async def load(db, chart_id: str) -> Optional[Dict[str, Any]]:
+    """Any stored chart version by id, or None."""
+    chart = await db.enhanced_diet_charts.find_one({'id': chart_id}, {'_id': 0})
+    if chart is not None:
+        return chart
+    version = await db[VERSIONS].find_one({'id': chart_id}, {'_id': 0, 'root_id': 1})
+    if version is None:
+        return None
+    root = await db.enhanced_diet_charts.find_one({'id': version['root_id']}, {'_id': 0})
+    if root is None:
+        return None
+    deltas = await db[VERSIONS].find({'root_id': version['root_id']}, {'_id': 0}).to_list(length=None)
+    return overlay(root, deltas, chart_id)
@@ -0,0 +1,74 @@
+"""Offline climatology: typical weather per Indian city and month.
+
+``datasets/climatology.json`` lists monthly mean temperature and humidity and
+the season of each month for the cities the clinics serve.  It is packed into
+flat arrays (12 entries per city, temperatures in tenths of a degree) with a
+dict from normalized city names and aliases to rows, so the weather for a
+city and month is a couple of index lookups and needs no network.
+
+Cities not in the table get the all-city monthly mean and the most common
+season for that month.  Seasons follow the Indian calendar rather than the
+temperature thresholds live weather uses, so monsoon months come out as
+"Monsoon".
+"""
+import json
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SEASON_CODES = {"W": "Winter", "S": "Summer", "M": "Monsoon", "A": "Autumn"}
+MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September",
+          "October", "November", "December")
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def normalize(city: str) -> str:
+    """'  New Delhi, IN' -> 'new delhi'"""
+    return " ".join(city.split(",")[0].lower().split())
+
+
+class Climatology:
+    def __init__(self, cities: Dict[str, Dict[str, Any]]):
+        self.names = list(cities)
+        self.rows: Dict[str, int] = {}
+        self.tenths = array('h')
+        self.humidity = array('B')
+        seasons = []
+        for row, (name, normals) in enumerate(cities.items()):
+            for alias in [name] + normals.get('aliases', []):
+                self.rows[normalize(alias)] = row
+            self.tenths.extend(round(t * 10) for t in normals['temperature'])
+            self.humidity.extend(round(h) for h in normals['humidity'])
+            seasons.append(normals['seasons'])
+
+        # Last row: the all-city mean, for cities not in the table
+        count = len(self.names)
+        self.tenths.extend(round(sum(self.tenths[r * 12 + m] for r in range(count)) / count) for m in range(12))
+        self.humidity.extend(round(sum(self.humidity[r * 12 + m] for r in range(count)) / count) for m in range(12))
+        seasons.append("".join(Counter(codes[m] for codes in seasons).most_common(1)[0][0] for m in range(12)))
+        self.seasons = "".join(seasons)
+
+    @classmethod
+    def load(cls, path: Path) -> 'Climatology':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['cities'])
+
+    def __contains__(self, city: str) -> bool:
+        return normalize(city) in self.rows
+
+    def weather(self, city: str, month: Optional[int] = None) -> Dict[str, Any]:
+        """WeatherData fields for ``city`` in ``month`` (1-12, default: the current month in India)."""
+        if month is None:
+            month = datetime.now(IST).month
+        row = self.rows.get(normalize(city), len(self.names))
+        at = row * 12 + month - 1
+        season = SEASON_CODES[self.seasons[at]]
+        return {
+            'temperature': self.tenths[at] / 10,
+            'humidity': float(self.humidity[at]),
+            'description': f"typical {MONTHS[month - 1]} {season.lower()} climate",
+            'season': season,
+            'city': self.names[row] if row < len(self.names) else city,
+        }
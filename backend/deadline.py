@@ -0,0 +1,90 @@
+"""Request deadlines with per-stage sub-budgets.
+
+A chart request gets one overall ``Deadline``.  Each slow stage (weather
+lookup, recipe OCR, persistence) runs under ``deadline.stage(name)``, which is
+bounded by both the stage's own budget and whatever is left of the request.
+A stage that runs out returns its fallback instead of raising and is recorded
+in ``deadline.degraded``, which the response reports.
+
+    deadline = Deadline.from_env(request.deadline_seconds)
+    weather = await deadline.stage("weather").run(fetch(), fallback=lambda: default_weather(city))
+
+Work that must not stop halfway (a chart's dependent writes) uses ``settle``
+instead, which stops waiting when the time is up but never cancels the task.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+DEFAULT_DEADLINE = 10.0
+# Seconds each stage may use at most (it also never outlives the request).
+DEFAULT_BUDGETS = {
+    "weather": 2.0,
+    "ocr": 6.0,
+    "persistence": 2.0,
+}
+
+
+class Deadline:
+    """An absolute expiry on the monotonic clock plus the stages that degraded"""
+
+    def __init__(self, seconds: float, budgets: Optional[Dict[str, float]] = None,
+                 name: Optional[str] = None, _parent: Optional['Deadline'] = None):
+        self.expires_at = time.monotonic() + seconds
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.name = name
+        self.degraded: List[str] = _parent.degraded if _parent else []
+        if _parent:
+            self.expires_at = min(self.expires_at, _parent.expires_at)
+
+    @classmethod
+    def from_env(cls, seconds: Optional[float] = None) -> 'Deadline':
+        """Deadline from CHART_DEADLINE and CHART_<STAGE>_BUDGET; ``seconds`` may only shorten it"""
+        limit = float(os.environ.get('CHART_DEADLINE', DEFAULT_DEADLINE))
+        budgets = {stage: float(os.environ.get(f'CHART_{stage.upper()}_BUDGET', budget))
+                   for stage, budget in DEFAULT_BUDGETS.items()}
+        return cls(min(seconds, limit) if seconds else limit, budgets)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def stage(self, name: str) -> 'Deadline':
+        """Child deadline for one stage, sharing this request's degraded list"""
+        return Deadline(self.budgets.get(name, self.remaining()), self.budgets, name, self)
+
+    def degrade(self, stage: str):
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+
+    async def run(self, awaitable: Awaitable[T], fallback: Callable[[], T]) -> T:
+        """Await within the remaining time; on timeout mark the stage degraded and use ``fallback()``"""
+        stage = self.name or "request"
+        remaining = self.remaining()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            logging.warning(f"Stage '{stage}' ran out of time; using its fallback")
+            self.degrade(stage)
+            return fallback()
+
+    async def settle(self, task: 'asyncio.Future[T]') -> bool:
+        """Wait for ``task`` within the remaining time without ever cancelling it; False when it is
+        still running then, and the caller keeps a reference so it finishes in the background"""
+        try:
+            await asyncio.wait_for(asyncio.shield(task), self.remaining())
+        except asyncio.TimeoutError:
+            logging.warning(f"Stage '{self.name or 'request'}' ran out of time; finishing it in the background")
+            return False
+        return True
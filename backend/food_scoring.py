@@ -0,0 +1,178 @@
+"""Constitution-aware food ranking over precomputed NumPy matrices.
+
+Built once per dataset snapshot (``CatalogStore.register_index``): a
+foods × doshas effect matrix, climate and season compatibility matrices,
+per-allergen exclusion masks and per-role index arrays.  Ranking a patient is
+then one matrix-vector product for the constitution, two column lookups for
+weather and ``argpartition`` for the top-k of each meal role, so selection
+stays well under a millisecond for catalogs of tens of thousands of foods.
+
+The inputs are few and discrete (3 climates x 4 seasons x 7 constitutions x
+2^allergens), so ``plan`` memoizes each selection under one hashable key with
+the allergens as a bitmask.  The table lives on the scorer, which is rebuilt
+with every dataset snapshot, so it never outlives the catalog it was built from.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DOSHAS = ("Vata", "Pitta", "Kapha")
+EFFECTS = {"Increase": 1.0, "Neutral": 0.0, "Decrease": -1.0}
+
+CLIMATES = ("hot", "moderate", "cold")
+# Food climate_preference -> compatibility with each weather climate; 0 means excluded.
+CLIMATE_COMPATIBILITY = {
+    "hot": (1.0, 0.5, 0.0),
+    "neutral": (0.5, 1.0, 0.5),
+    "cold": (0.0, 0.5, 1.0),
+}
+
+# Live weather derives seasons from temperature, so Spring is a warm season;
+# the climatology table also names the Monsoon.
+SEASONS = ("summer", "monsoon", "winter")
+WEATHER_SEASONS = {"Summer": "summer", "Spring": "summer", "Monsoon": "monsoon", "Autumn": "monsoon",
+                   "Winter": "winter"}
+
+# Meal roles -> food categories, as used by the meal templates.
+ROLES = {
+    "grains": ("grains",),
+    "protein": ("legumes", "dairy"),
+    "vegetables": ("vegetables",),
+    "spices": ("spices", "herbs"),
+}
+
+DOSHA_WEIGHT = 1.0
+CLIMATE_WEIGHT = 0.5
+SEASON_WEIGHT = 0.25
+# Ties keep catalog order; far smaller than any gap between distinct scores
+# yet still representable next to them in float32 for catalogs up to ~100k foods.
+_TIE_BREAK = 1e-7
+
+
+def climate_for(temperature: float) -> str:
+    if temperature > 30:
+        return "hot"
+    if temperature < 15:
+        return "cold"
+    return "moderate"
+
+
+def constitution_weights(constitution) -> np.ndarray:
+    """Dosha weights for "Vata", dual types like "Vata-Pitta", or "Tridoshic"."""
+    name = getattr(constitution, 'value', constitution) or ""
+    parts = [part.strip().title() for part in str(name).split('-')]
+    weights = np.array([1.0 if dosha in parts else 0.0 for dosha in DOSHAS])
+    if not weights.any():
+        weights[:] = 1.0
+    return weights / weights.sum()
+
+
+class FoodScorer:
+    """Rank a snapshot's foods for a patient's constitution, weather and allergies."""
+
+    def __init__(self, foods, allergy_map):
+        self.keys: List[str] = list(foods)
+        count = len(self.keys)
+        # Stored dosha-major so a constitution is a (3,) @ (3, foods) product.
+        self.effects = np.zeros((len(DOSHAS), count), dtype=np.float32)
+        climate = np.zeros((len(CLIMATES), count))
+        season = np.zeros((len(SEASONS), count))
+        categories = []
+        for i, key in enumerate(self.keys):
+            food = foods[key]
+            dosha_effect = food.get('dosha_effect', {})
+            self.effects[:, i] = [EFFECTS.get(dosha_effect.get(dosha), 0.0) for dosha in DOSHAS]
+            climate[:, i] = CLIMATE_COMPATIBILITY.get(food.get('climate_preference'),
+                                                      CLIMATE_COMPATIBILITY["neutral"])
+            seasonal = food.get('seasonal', [])
+            season[:, i] = [1.0 if 'all' in seasonal or name in seasonal else 0.0 for name in SEASONS]
+            categories.append(food.get('category'))
+        categories = np.array(categories, dtype=object)
+
+        # Weather part of the score for every (climate, season); ties keep catalog order.
+        tie_break = np.arange(count) * _TIE_BREAK
+        self.weather_scores: Dict[tuple, np.ndarray] = {}
+        for c, climate_name in enumerate(CLIMATES):
+            for season_name in SEASONS + (None,):
+                vector = CLIMATE_WEIGHT * climate[c] - tie_break
+                if season_name:
+                    vector += SEASON_WEIGHT * season[SEASONS.index(season_name)]
+                vector[climate[c] == 0.0] = -np.inf
+                self.weather_scores[(climate_name, season_name)] = vector.astype(np.float32)
+
+        self.roles: Dict[str, np.ndarray] = {
+            role: np.flatnonzero(np.isin(categories, names)) for role, names in ROLES.items()
+        }
+        self.roles["all"] = np.arange(count)
+
+        # An allergen excludes foods listed under it in the allergy map or tagged with it.
+        position = {key.lower(): i for i, key in enumerate(self.keys)}
+        self.allergen_masks: Dict[str, np.ndarray] = {}
+        for allergen, listed in allergy_map.items():
+            mask = np.zeros(count, dtype=bool)
+            mask[[position[item.lower()] for item in listed if item.lower() in position]] = True
+            mask |= [allergen.lower() in foods[key].get('allergens', []) for key in self.keys]
+            self.allergen_masks[allergen.lower()] = mask
+        self.allergen_bits: Dict[str, int] = {allergen: 1 << bit for bit, allergen in enumerate(self.allergen_masks)}
+        # (climate, season, constitution, allergen bitmask, k) -> {role: keys}
+        self.plans: Dict[tuple, Dict[str, Tuple[str, ...]]] = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'FoodScorer':
+        return cls(snapshot.foods, snapshot.allergy_map)
+
+    def score(self, constitution, temperature: float, season: Optional[str] = None) -> np.ndarray:
+        """Score every food; climate-incompatible foods get -inf."""
+        weather = self.weather_scores[(climate_for(temperature), WEATHER_SEASONS.get(season))]
+        # Foods that decrease the patient's doshas score highest.
+        weights = (-DOSHA_WEIGHT * constitution_weights(constitution)).astype(np.float32)
+        scores = weights @ self.effects
+        scores += weather
+        return scores
+
+    def allowed(self, allergens: Iterable[str]) -> np.ndarray:
+        mask = np.ones(len(self.keys), dtype=bool)
+        for allergen in allergens:
+            excluded = self.allergen_masks.get(allergen.lower())
+            if excluded is not None:
+                mask &= ~excluded
+        return mask
+
+    def allergen_bitmask(self, allergens: Iterable[str]) -> int:
+        """Bitmask of the known allergens; unknown ones exclude nothing and are ignored."""
+        bits = 0
+        for allergen in allergens:
+            bits |= self.allergen_bits.get(allergen.lower(), 0)
+        return bits
+
+    def top_k(self, scores: np.ndarray, role: str, k: int) -> List[str]:
+        """Best ``k`` foods of a role, best first, skipping excluded foods."""
+        candidates = self.roles[role]
+        role_scores = scores if role == "all" else scores[candidates]
+        if 0 < k < len(candidates):
+            best = np.argpartition(-role_scores, k - 1)[:k]
+            candidates, role_scores = candidates[best], role_scores[best]
+        order = np.argsort(-role_scores)
+        return [self.keys[i] for i in candidates[order] if np.isfinite(scores[i])]
+
+    def select(self, constitution, temperature: float, season: Optional[str],
+               allergens: Iterable[str], k: int) -> Dict[str, List[str]]:
+        """Top ``k`` foods per meal role plus overall ("all")."""
+        scores = self.score(constitution, temperature, season)
+        allergens = list(allergens)
+        if allergens:
+            scores[~self.allowed(allergens)] = -np.inf
+        return {role: self.top_k(scores, role, k) for role in self.roles}
+
+    def plan(self, constitution, temperature: float, season: Optional[str],
+             allergens: Iterable[str], k: int) -> Dict[str, Tuple[str, ...]]:
+        """``select`` memoized per (climate, season, constitution, allergen bitmask, k); shared, do not mutate."""
+        bits = self.allergen_bitmask(allergens)
+        key = (climate_for(temperature), WEATHER_SEASONS.get(season),
+               getattr(constitution, 'value', constitution), bits, k)
+        plan = self.plans.get(key)
+        if plan is None:
+            known = [allergen for allergen, bit in self.allergen_bits.items() if bits & bit]
+            plan = {role: tuple(keys) for role, keys in self.select(constitution, temperature, season, known, k).items()}
+            self.plans[key] = plan
+        return plan
@@ -0,0 +1,186 @@
+"""Serve the production React bundle (frontend/build) from the FastAPI app.
+
+Assets are precompressed to ``.gz``/``.br`` siblings once (at startup, or ahead
+of time with ``python frontend_bundle.py ../frontend/build``) and a manifest of
+every file is built, so a request is one dict lookup.  Content-hashed files
+under ``static/`` are served as immutable; everything else revalidates by
+ETag.  Identity responses honour single byte ranges, and unknown paths that
+are not assets fall back to ``index.html`` for client-side routes.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+from http_cache import (PINNED_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, accepted_encodings, brotli,
+                        etag_matches)
+
+COMPRESSIBLE_SUFFIXES = {'.js', '.css', '.html', '.json', '.map', '.svg', '.txt', '.ico', '.xml'}
+MIN_COMPRESS_SIZE = 1024
+HASHED_ASSET = re.compile(r'\.[0-9a-f]{8}\.')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def precompress(build_dir: Path) -> int:
+    """Write missing or stale .gz/.br siblings for compressible files; returns files written."""
+    written = 0
+    for path in Path(build_dir).rglob('*'):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        if path.stat().st_size < MIN_COMPRESS_SIZE:
+            continue
+        data = None
+        targets = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            targets.append(('.br', lambda d: brotli.compress(d, quality=11)))
+        for suffix, compress in targets:
+            target = path.with_name(path.name + suffix)
+            if target.exists() and target.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            tmp = target.with_name(target.name + '.tmp')
+            tmp.write_bytes(compress(data))
+            os.replace(tmp, target)
+            written += 1
+    return written
+
+
+class _Asset:
+    __slots__ = ('path', 'size', 'media_type', 'etag', 'immutable', 'variants')
+
+    def __init__(self, path: Path, relative: str):
+        stat = path.stat()
+        self.path = path
+        self.size = stat.st_size
+        self.media_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.immutable = relative.startswith('static/') and bool(HASHED_ASSET.search(path.name))
+        # coding -> (path, size, etag)
+        self.variants: Dict[str, Tuple[Path, int, str]] = {}
+        for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            compressed = path.with_name(path.name + suffix)
+            if compressed.exists() and compressed.stat().st_size < self.size:
+                self.variants[coding] = (compressed, compressed.stat().st_size,
+                                         f'{self.etag[:-1]}-{coding}"')
+
+
+class FrontendBundle:
+    """ASGI app serving a built single-page application."""
+
+    def __init__(self, build_dir: Path, compress: bool = True):
+        self.build_dir = Path(build_dir).resolve()
+        if compress:
+            try:
+                written = precompress(self.build_dir)
+                if written:
+                    logging.info(f"Precompressed {written} frontend assets in {self.build_dir}")
+            except OSError as e:
+                logging.warning(f"Could not precompress frontend assets ({e}); serving identity only")
+        self.assets: Dict[str, _Asset] = {}
+        for path in self.build_dir.rglob('*'):
+            if path.is_file() and path.suffix not in ('.gz', '.br', '.tmp'):
+                relative = path.relative_to(self.build_dir).as_posix()
+                self.assets[relative] = _Asset(path, relative)
+        self.index = self.assets.get('index.html')
+
+    def _lookup(self, path: str) -> Optional[_Asset]:
+        relative = path.lstrip('/') or 'index.html'
+        asset = self.assets.get(relative)
+        if asset is None and not relative.startswith('static/') and '.' not in relative.rsplit('/', 1)[-1]:
+            # Client-side route such as /patients/PS001
+            asset = self.index
+        return asset
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        request = Request(scope, receive)
+        response = self.respond(request)
+        await response(scope, receive, send)
+
+    def respond(self, request: Request) -> Response:
+        if request.method not in ('GET', 'HEAD'):
+            return PlainTextResponse("Method Not Allowed", status_code=405, headers={'Allow': 'GET, HEAD'})
+        asset = self._lookup(request.url.path)
+        if asset is None:
+            return PlainTextResponse("Not Found", status_code=404)
+
+        headers = {
+            'Cache-Control': PINNED_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL,
+            'Vary': 'Accept-Encoding',
+            'Accept-Ranges': 'bytes',
+        }
+        range_header = request.headers.get('range')
+        if range_header and request.headers.get('if-range') not in (None, asset.etag):
+            range_header = None
+
+        # Ranges address the identity representation, so only compress full responses.
+        path, size, etag, coding = asset.path, asset.size, asset.etag, None
+        if not range_header:
+            codings = accepted_encodings(request.headers.get('accept-encoding'))
+            for candidate in ('br', 'gzip'):
+                if candidate in asset.variants and codings.get(candidate, codings.get('*', 0)) > 0:
+                    path, size, etag = asset.variants[candidate]
+                    coding = candidate
+                    break
+        headers['ETag'] = etag
+
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=headers)
+
+        if range_header:
+            byte_range = self._parse_range(range_header, asset.size)
+            if byte_range is None:
+                headers['Content-Range'] = f"bytes */{asset.size}"
+                return Response(status_code=416, headers=headers)
+            if byte_range != (0, asset.size - 1):
+                start, end = byte_range
+                with open(asset.path, 'rb') as f:
+                    f.seek(start)
+                    body = f.read(end - start + 1) if request.method == 'GET' else b''
+                headers['Content-Range'] = f"bytes {start}-{end}/{asset.size}"
+                headers['Content-Length'] = str(end - start + 1)
+                return Response(body, status_code=206, headers=headers, media_type=asset.media_type)
+
+        if coding:
+            headers['Content-Encoding'] = coding
+        return FileResponse(path, headers=headers, media_type=asset.media_type,
+                            method=request.method)
+
+    @staticmethod
+    def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+        """Inclusive (start, end) for a single byte range, or None if unsatisfiable.
+
+        Multi-range requests are answered with the whole file.
+        """
+        if ',' in header:
+            return 0, size - 1
+        match = _RANGE.match(header.strip())
+        if not match or size == 0:
+            return None
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return None
+        return start, end
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    build = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent / 'frontend' / 'build'
+    print(f"Precompressed {precompress(build)} files in {build}")
@@ -0,0 +1,129 @@
+"""Serialize-once payloads with precompressed variants and ETag handling.
+
+Static reference data (food items, allergy map, static patients) only changes
+with the dataset version, so each snapshot encodes it once, compresses it with
+gzip and brotli (when the ``brotli`` package is installed) and derives a strong
+ETag.  Request handlers just negotiate an encoding and compare ETags.
+"""
+import gzip
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Clients that pin the dataset version in the URL (?v=<version>) can cache
+# forever; everyone else revalidates with If-None-Match on each use.
+PINNED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def encode_json(data: Any) -> bytes:
+    """Compact UTF-8 JSON, matching what the frameworks would send."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    codings = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == etag:
+            return True
+    return False
+
+
+class Payload:
+    """One encoded response body and its compressed variants."""
+
+    __slots__ = ('identity', 'variants', 'etag', 'version', 'media_type', 'etags')
+
+    def __init__(self, body: bytes, version: str, media_type: str = 'application/json',
+                 compress: bool = True):
+        self.identity = body
+        self.version = version
+        self.media_type = media_type
+        self.etag = f'"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        # Strong validators must differ per content-coding.
+        self.variants: Dict[str, bytes] = {}
+        if compress:
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=11)
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etags = {None: self.etag}
+        self.etags.update({coding: f'{self.etag[:-1]}-{coding}"' for coding in self.variants})
+
+    @classmethod
+    def from_data(cls, data: Any, version: str) -> 'Payload':
+        return cls(encode_json(data), version)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Smallest variant the client accepts, falling back to identity."""
+        codings = accepted_encodings(accept_encoding)
+        for coding in ('br', 'gzip'):
+            body = self.variants.get(coding)
+            if body is not None and codings.get(coding, codings.get('*', 0)) > 0 \
+                    and len(body) < len(self.identity):
+                return body, coding
+        return self.identity, None
+
+    def headers(self, encoding: Optional[str], pinned: bool = False) -> Dict[str, str]:
+        headers = {
+            'ETag': self.etags[encoding],
+            'Cache-Control': PINNED_CACHE_CONTROL if pinned else REVALIDATE_CACHE_CONTROL,
+            'Vary': 'Accept-Encoding',
+        }
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return headers
+
+    def respond(self, accept_encoding: Optional[str], if_none_match: Optional[str],
+                pinned_version: Optional[str] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        """(status, body, headers) for a GET of this payload."""
+        pinned = pinned_version == self.version
+        body, encoding = self.negotiate(accept_encoding)
+        if any(etag_matches(if_none_match, etag) for etag in self.etags.values()):
+            headers = self.headers(encoding, pinned)
+            headers.pop('Content-Encoding', None)
+            return 304, b'', headers
+        return 200, body, self.headers(encoding, pinned)
+
+
+def extend_json_array(array_body: bytes, items: list) -> bytes:
+    """Append ``items`` to an already encoded JSON array without re-encoding it."""
+    if not items:
+        return array_body
+    tail = encode_json(items)
+    if array_body.strip() == b'[]':
+        return tail
+    return array_body.rstrip()[:-1] + b',' + tail[1:]
+
+
+def payload_index(producers: Dict[str, Callable[[Any], Any]]) -> Callable[[Any], Dict[str, Payload]]:
+    """Snapshot index builder: {name: Payload} encoded from ``producers``."""
+    def build(snapshot) -> Dict[str, Payload]:
+        return {name: Payload.from_data(produce(snapshot), snapshot.version)
+                for name, produce in producers.items()}
+    return build
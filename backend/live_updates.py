@@ -0,0 +1,187 @@
+"""In-process fan-out of appointment and patient changes to open dashboards.
+
+Dashboards load their snapshot once (``/appointments/today``, ``/patients``)
+and then hold one Server-Sent Events connection (``/api/live``) for deltas
+instead of re-polling the full lists.  Every change is published once to the
+``EventHub``, which copies it into each subscriber's bounded queue; nothing
+touches Mongo per client.
+
+Changes come from MongoDB change streams when the deployment supports them
+(replica sets), which also covers writes made by other server processes.
+Otherwise the write paths (``create_appointment``, ``create_patient``) publish
+directly, which covers this process only.  A write published that way while
+the stream is still opening is not published again when the stream reports
+it.
+
+Events carry increasing ids, and the hub keeps the last ``HISTORY`` of them
+so a reconnecting ``EventSource`` (``Last-Event-ID``) gets what it missed.  A
+client that falls too far behind, or asks for an id the hub no longer has, is
+sent ``resync`` and should reload its snapshot.
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Iterable, Optional, Set, Tuple
+
+QUEUE_SIZE = 256
+HISTORY = 1024
+HEARTBEAT_SECONDS = 15.0
+
+# Collections watched for change streams -> topic name
+WATCHED = {"appointments": "appointments", "patients": "patients"}
+
+
+class Event:
+    __slots__ = ("id", "topic", "kind", "data")
+
+    def __init__(self, id: int, topic: str, kind: str, data: Any):
+        self.id = id
+        self.topic = topic
+        self.kind = kind
+        self.data = data
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscription:
+    def __init__(self, topics: Set[str]):
+        self.topics = topics
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+
+class EventHub:
+    """Publish once, deliver to every subscriber of the topic."""
+
+    def __init__(self):
+        self.last_id = 0
+        self.history: Deque[Event] = deque(maxlen=HISTORY)
+        self.subscribers: Set[Subscription] = set()
+        # True while change streams feed the hub; write paths then stay quiet.
+        self.change_streams = False
+        # (kind, document id) of recent write-path events, which a stream that was opening at the
+        # time reports again
+        self._written: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def publish(self, topic: str, kind: str, data: Any) -> Event:
+        self.last_id += 1
+        event = Event(self.last_id, topic, kind, data)
+        self.history.append(event)
+        for subscription in self.subscribers:
+            if topic not in subscription.topics or subscription.overflowed:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+        return event
+
+    def record_write(self, topic: str, kind: str, data: Any):
+        """Publish from a write path unless change streams already report it."""
+        if not self.change_streams:
+            self.publish(topic, kind, data)
+            self._written[(kind, str(data.get("_id")))] = None
+            while len(self._written) > HISTORY:
+                self._written.popitem(last=False)
+
+    def missed(self, last_event_id: int, topics: Set[str]) -> Optional[list]:
+        """Events after ``last_event_id``, or None when they are no longer in history."""
+        if last_event_id == self.last_id:
+            return []
+        if last_event_id > self.last_id:
+            # Ids from before a server restart
+            return None
+        if not self.history or self.history[0].id > last_event_id + 1:
+            return None
+        return [event for event in self.history if event.id > last_event_id and event.topic in topics]
+
+    async def stream(self, topics: Iterable[str], last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+        """SSE frames for ``topics``: a ``ready`` event, then changes and heartbeats."""
+        subscription = Subscription(set(topics))
+        self.subscribers.add(subscription)
+        try:
+            if last_event_id is not None:
+                missed = self.missed(last_event_id, subscription.topics)
+                if missed is None:
+                    yield f"id: {self.last_id}\nevent: resync\ndata: {{}}\n\n"
+                else:
+                    for event in missed:
+                        yield event.encode()
+            yield f"id: {self.last_id}\nevent: ready\ndata: {json.dumps({'topics': sorted(subscription.topics)})}\n\n"
+            while True:
+                if subscription.overflowed:
+                    # Too far behind: drop the backlog and have the client reload its snapshot.
+                    subscription.queue = asyncio.Queue(QUEUE_SIZE)
+                    subscription.overflowed = False
+                    yield f"id: {self.last_id}\nevent: resync\ndata: {{}}\n\n"
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield event.encode()
+        finally:
+            self.subscribers.discard(subscription)
+
+    def start(self, db):
+        """Feed the hub from Mongo change streams when the server supports them."""
+        if self._watcher is None:
+            self._watcher = asyncio.ensure_future(self._watch(db))
+
+    async def stop(self):
+        if self._watcher:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._watcher = None
+
+    async def _watch(self, db):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]},
+                                "ns.coll": {"$in": list(WATCHED)}}}]
+        try:
+            async with db.watch(pipeline, full_document="updateLookup") as stream:
+                while stream.alive:
+                    # The first call opens the stream and fails on servers without change streams.
+                    change = await stream.try_next()
+                    if not self.change_streams:
+                        self.change_streams = True
+                        logging.info("Live updates fed by MongoDB change streams")
+                    if change is not None:
+                        self._publish_change(change)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Standalone servers have no change streams; the write paths publish instead.
+            logging.info(f"Live updates fed by write paths (no change streams: {e})")
+        finally:
+            self.change_streams = False
+
+    def _publish_change(self, change: dict):
+        topic = WATCHED[change["ns"]["coll"]]
+        operation = change["operationType"]
+        action = {"insert": "created", "delete": "deleted"}.get(operation, "updated")
+        document = change.get("fullDocument") or {"_id": change["documentKey"]["_id"]}
+        document["_id"] = str(document["_id"])
+        kind = f"{topic[:-1]}.{action}"
+        if (kind, document["_id"]) in self._written:
+            # Already published by its write path before the stream was confirmed
+            del self._written[(kind, document["_id"])]
+            return
+        self.publish(topic, kind, document)
+
+
+def sse_topics(topics: Optional[str]) -> Set[str]:
+    requested = {t.strip() for t in (topics or "").split(",") if t.strip()}
+    return requested & set(WATCHED.values()) or set(WATCHED.values())
+
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
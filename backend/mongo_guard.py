@@ -0,0 +1,370 @@
+"""Fast-failing MongoDB access behind a circuit breaker.
+
+The motor client is created with short server selection and connect timeouts,
+so an unreachable Mongo costs a request seconds rather than the driver's
+default 30.  On top of that every collection call goes through a
+``CircuitBreaker``: after ``failure_threshold`` consecutive connection
+failures it opens, and calls fail at once with ``CircuitOpenError`` (a
+``ConnectionFailure``, so the handlers' existing fallbacks apply) until
+``reset_timeout`` has passed.  Then one trial call is let through; its outcome
+closes the breaker or opens it for another period.  A background probe pings
+Mongo every period, so the breaker follows it without traffic too.
+
+Single-document writes (``insert_one``, ``update_one``, ``replace_one``) made
+while Mongo is unreachable are appended to a local ``SpillQueue`` file instead
+of failing, and replayed in order once the breaker closes.  Replay is
+at-least-once: an insert keeps the ``_id`` it was given when spilled, so a
+duplicate key on replay means it had been applied already.  Each write replay
+applies is passed to the ``replay_listeners``.  Other writes (``bulk_write``,
+``delete_*``) are not spilled; their callers already treat them as best
+effort (report rollups, the chart food archive).
+
+``ReadCache`` keeps the last result of a read for serving while Mongo is
+unavailable.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, PyMongoError
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# Collection methods that talk to the server
+GUARDED = frozenset({'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+                     'delete_one', 'delete_many', 'count_documents', 'distinct', 'bulk_write',
+                     'create_index', 'find_one_and_update'})
+SPILLED = frozenset({'insert_one', 'update_one', 'replace_one'})
+CURSORS = frozenset({'find', 'aggregate'})
+
+
+class CircuitOpenError(ConnectionFailure):
+    """Raised instead of calling Mongo while the breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go to Mongo now; the first call after the reset timeout is the trial."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> bool:
+        """Close the breaker; True when it was not closed before."""
+        reopened = self.state != CLOSED
+        self.state = CLOSED
+        self.failures = 0
+        return reopened
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logging.warning(f"Mongo circuit breaker open after {self.failures} connection failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def abandon(self):
+        """A call ended without an answer (cancelled); a trial call then leaves the breaker open."""
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {'state': self.state, 'failures': self.failures, 'retry_in_seconds': round(retry_in, 1)}
+
+
+class SpillQueue:
+    """Writes waiting for Mongo, one JSON line each, shared by the worker processes through a file lock."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+
+    @contextmanager
+    def _locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def append(self, collection: str, op: str, args: Tuple, kwargs: Dict[str, Any]):
+        """Queue one write, on disk before this returns; blocking, so async callers run it in a thread."""
+        line = json_util.dumps({'collection': collection, 'op': op, 'args': list(args), 'kwargs': kwargs})
+        with self._locked(), open(self.path, 'a', encoding='utf-8') as spill:
+            spill.write(line + '\n')
+            spill.flush()
+            os.fsync(spill.fileno())
+
+    def pending(self) -> bool:
+        return self.path.exists() and self.path.stat().st_size > 0
+
+    def depth(self) -> int:
+        """Writes queued by every worker; reads the whole file, so async callers run it in a thread."""
+        try:
+            with open(self.path, 'rb') as spill:
+                return sum(chunk.count(b'\n') for chunk in iter(lambda: spill.read(1 << 20), b''))
+        except FileNotFoundError:
+            return 0
+
+    def take(self) -> Tuple[Optional[Path], List[Dict[str, Any]]]:
+        """Claim every spilled write for replay; the claim file is kept until ``release``."""
+        claim = self.path.with_name(f"{self.path.name}.{os.getpid()}.draining")
+        with self._locked():
+            if not self.pending():
+                return None, []
+            os.replace(self.path, claim)
+        with open(claim, encoding='utf-8') as spill:
+            return claim, [json_util.loads(line) for line in spill if line.strip()]
+
+    def release(self, claim: Path, unapplied: List[Dict[str, Any]]):
+        """Drop a claim, queueing ``unapplied`` ahead of anything spilled since it was taken."""
+        with self._locked():
+            if unapplied:
+                queued = self.path.read_text(encoding='utf-8') if self.path.exists() else ''
+                tmp = self.path.with_name(self.path.name + '.tmp')
+                tmp.write_text(''.join(json_util.dumps(entry) + '\n' for entry in unapplied) + queued,
+                               encoding='utf-8')
+                os.replace(tmp, self.path)
+            claim.unlink(missing_ok=True)
+
+    def recover(self):
+        """Requeue claims left behind by worker processes that died mid-replay."""
+        for claim in self.path.parent.glob(f"{self.path.name}.*.draining"):
+            pid = int(claim.name.split('.')[-2])
+            if pid != os.getpid() and _alive(pid):
+                continue
+            with open(claim, encoding='utf-8') as spill:
+                self.release(claim, [json_util.loads(line) for line in spill if line.strip()])
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SpilledWrite:
+    """Result of a write that was spilled rather than sent, shaped like pymongo's write results."""
+    acknowledged = False
+    matched_count = modified_count = 0
+    upserted_id = None
+
+    def __init__(self, inserted_id=None):
+        self.inserted_id = inserted_id
+
+
+class ReadCache:
+    """The last result of each read, least recently used dropped first."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def put(self, key: Hashable, value: Any):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self.entries:
+            return default
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+
+class MongoGuard:
+    """The breaker and spill queue around one motor database; handlers use ``guard.database``."""
+
+    def __init__(self, database, breaker: CircuitBreaker, spill: SpillQueue):
+        self.raw = database
+        self.breaker = breaker
+        self.spill = spill
+        self.database = GuardedDatabase(self)
+        # Called with each spilled write once replay has applied it
+        self.replay_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._monitor: Optional[asyncio.Task] = None
+        self._drain: Optional[asyncio.Task] = None
+
+    async def call(self, method, *args, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError("MongoDB unavailable (circuit breaker open)")
+        try:
+            result = await method(*args, **kwargs)
+        except ConnectionFailure:
+            self.breaker.record_failure()
+            raise
+        except PyMongoError:
+            # The server answered, so it is reachable
+            self._succeeded()
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        self._succeeded()
+        return result
+
+    async def write(self, collection: str, op: str, method, args: Tuple, kwargs: Dict[str, Any]):
+        if op == 'insert_one':
+            # The id is fixed before the first attempt (on a copy; the caller's document is left alone)
+            # so a replayed insert keeps it
+            args = ({'_id': ObjectId(), **args[0]},) + tuple(args[1:])
+        try:
+            return await self.call(method, *args, **kwargs)
+        except ConnectionFailure as e:
+            # File locking and fsync stay off the event loop
+            await asyncio.to_thread(self.spill.append, collection, op, args, kwargs)
+            logging.warning(f"Spilled {op} on {collection} until MongoDB is reachable: {e}")
+            return SpilledWrite(args[0].get('_id') if op == 'insert_one' else None)
+
+    def _succeeded(self):
+        if self.breaker.record_success():
+            logging.info("Mongo circuit breaker closed")
+        if self.spill.pending() and (self._drain is None or self._drain.done()):
+            self._drain = asyncio.ensure_future(self.drain())
+
+    async def drain(self) -> int:
+        """Replay spilled writes in order; those not applied when Mongo drops again stay queued."""
+        claim, entries = await asyncio.to_thread(self.spill.take)
+        if claim is None:
+            return 0
+        replayed = 0
+        try:
+            for entry in entries:
+                method = getattr(self.raw[entry['collection']], entry['op'])
+                try:
+                    await self.call(method, *entry['args'], **entry['kwargs'])
+                except DuplicateKeyError:
+                    pass
+                except PyMongoError as e:
+                    if isinstance(e, ConnectionFailure):
+                        raise
+                    logging.error(f"Dropping spilled {entry['op']} on {entry['collection']}: {e}")
+                else:
+                    self._replayed(entry)
+                replayed += 1
+        except ConnectionFailure:
+            pass
+        finally:
+            await asyncio.to_thread(self.spill.release, claim, entries[replayed:])
+        if replayed:
+            logging.info(f"Replayed {replayed} spilled MongoDB writes")
+        return replayed
+
+    def _replayed(self, entry: Dict[str, Any]):
+        for listener in self.replay_listeners:
+            try:
+                listener(entry)
+            except Exception as e:
+                logging.error(f"Spill replay listener failed: {e}")
+
+    def start(self):
+        self.spill.recover()
+        self._monitor = asyncio.create_task(self._probe())
+
+    async def stop(self):
+        for task in (self._monitor, self._drain):
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def _probe(self):
+        """Ping Mongo every reset period, so the breaker (and readiness) follows it without traffic.
+
+        A successful ping also drains what earlier runs spilled.
+        """
+        while True:
+            try:
+                await self.call(self.raw.command, 'ping')
+            except PyMongoError:
+                pass
+            await asyncio.sleep(self.breaker.reset_timeout)
+
+    async def status(self) -> Dict[str, Any]:
+        # The spill file is shared with the other workers and grows through an outage:
+        # count it off the event loop
+        return {**self.breaker.snapshot(), 'spilled_writes': await asyncio.to_thread(self.spill.depth)}
+
+
+class GuardedDatabase:
+    """A motor database whose collections go through the guard; ``watch`` and ``command`` pass through."""
+
+    def __init__(self, guard: MongoGuard):
+        self._guard = guard
+
+    def watch(self, *args, **kwargs):
+        return self._guard.raw.watch(*args, **kwargs)
+
+    def command(self, *args, **kwargs):
+        return self._guard.call(self._guard.raw.command, *args, **kwargs)
+
+    def __getitem__(self, name: str) -> "GuardedCollection":
+        return GuardedCollection(self._guard, self._guard.raw[name])
+
+    def __getattr__(self, name: str) -> "GuardedCollection":
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+
+class GuardedCollection:
+    def __init__(self, guard: MongoGuard, collection):
+        self._guard = guard
+        self._collection = collection
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name in CURSORS:
+            return lambda *args, **kwargs: GuardedCursor(self._guard, attr(*args, **kwargs))
+        if name in SPILLED:
+            return lambda *args, **kwargs: self._guard.write(self._collection.name, name, attr, args, kwargs)
+        if name in GUARDED:
+            return lambda *args, **kwargs: self._guard.call(attr, *args, **kwargs)
+        return attr
+
+
+class GuardedCursor:
+    """A find/aggregate cursor whose ``to_list`` goes through the guard; builder calls chain as usual."""
+
+    def __init__(self, guard: MongoGuard, cursor):
+        self._guard = guard
+        self._cursor = cursor
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._cursor else result
+        return chained
+
+    async def to_list(self, length: Optional[int] = None):
+        return await self._guard.call(self._cursor.to_list, length=length)
@@ -0,0 +1,293 @@
+"""OCR engines: persistent Tesseract workers with pytesseract as the fallback.
+
+``pytesseract.image_to_string`` starts a ``tesseract`` process per image,
+writes temp files and reloads the language model every time.  The worker
+pool instead keeps ``OCR_WORKERS`` long-lived processes, each holding an
+initialised Tesseract API (via the optional ``tesserocr`` binding) with the
+model loaded.  Preprocessed images go to a worker over its stdin pipe as raw
+8-bit pixels and the text comes back on stdout, so per-image latency is
+recognition time.  Workers are recycled after ``OCR_WORKER_MAX_JOBS`` images
+to bound memory growth.  A worker that crashes or times out is killed and
+replaced, and that image fails with ``OCRWorkerError`` rather than being
+recognized a second time: an image that hung one Tesseract would only tie up
+another one.
+
+Without ``tesserocr`` (or with ``OCR_ENGINE=pytesseract``) the original
+pytesseract path is used, and the pool switches to it for good if its
+workers cannot load Tesseract at all.
+
+Callers run ``recognize`` on the engine's own ``executor``, sized to what the
+engine can recognize at once, so OCR neither queues behind nor starves the
+event loop's default thread pool.
+
+Workers run this file as a script (``python ocr_engine.py --worker``) and
+only need the standard library and ``tesserocr``.
+"""
+import importlib.util
+import logging
+import os
+import queue
+import select
+import struct
+import subprocess
+import sys
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+# Tesseract settings the preprocessed pages (ocr_preprocess.py) are tuned for:
+# one uniform block of text restricted to recipe characters.
+TESSERACT_LANG = 'eng'
+TESSERACT_OEM = 3   # default engine (LSTM when available)
+TESSERACT_PSM = 6   # single uniform block of text
+TESSERACT_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 .,()-'
+TESSERACT_CONFIG = (f'--oem {TESSERACT_OEM} --psm {TESSERACT_PSM} '
+                    f'-c tessedit_char_whitelist={TESSERACT_WHITELIST}')
+# Preprocessing rescales text to the glyph size of a 300 DPI scan.
+SOURCE_DPI = 300
+
+DEFAULT_MAX_JOBS = 200
+DEFAULT_TIMEOUT = 30.0
+STARTUP_TIMEOUT = 30.0
+
+# Frames: request <height, width> + pixels; reply <status, length> + UTF-8 text.
+_REQUEST = struct.Struct('<II')
+_REPLY = struct.Struct('<BI')
+_OK, _ERROR = 0, 1
+
+
+class OCRWorkerError(RuntimeError):
+    pass
+
+
+class OCREngine(ABC):
+    """Turn a preprocessed 8-bit grayscale page (2-D numpy array) into text."""
+
+    name = "base"
+    # Images that can be recognized at the same time
+    capacity = os.cpu_count() or 1
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Threads for OCR jobs, one per image the engine can recognize at once"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.capacity, thread_name_prefix=f'ocr-{self.name}')
+        return self._executor
+
+    def start(self):
+        pass
+
+    @abstractmethod
+    def recognize(self, image) -> str:
+        """Text of one page; blocking, so async callers run it on ``executor``"""
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PytesseractEngine(OCREngine):
+    """One ``tesseract`` process per image (the original behaviour)."""
+
+    name = "pytesseract"
+
+    def recognize(self, image) -> str:
+        import pytesseract
+        from PIL import Image
+        return pytesseract.image_to_string(Image.fromarray(image), config=TESSERACT_CONFIG, lang=TESSERACT_LANG)
+
+
+class _Worker:
+    """Parent-side handle for one worker process."""
+
+    def __init__(self, command: List[str]):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, bufsize=0)
+        self.jobs = 0
+        self.ready = False
+
+    def _read_exact(self, size: int, timeout: float) -> bytes:
+        stdout = self.process.stdout
+        chunks, remaining = [], size
+        while remaining:
+            readable, _, _ = select.select([stdout], [], [], timeout)
+            if not readable:
+                raise TimeoutError(f"OCR worker {self.process.pid} did not answer within {timeout}s")
+            chunk = os.read(stdout.fileno(), remaining)
+            if not chunk:
+                raise OCRWorkerError(f"OCR worker {self.process.pid} exited ({self.process.poll()})")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+
+    def _read_reply(self, timeout: float) -> str:
+        status, length = _REPLY.unpack(self._read_exact(_REPLY.size, timeout))
+        text = self._read_exact(length, timeout).decode('utf-8') if length else ''
+        if status != _OK:
+            raise OCRWorkerError(text or "OCR worker failed")
+        return text
+
+    def wait_ready(self, timeout: float):
+        if not self.ready:
+            self._read_reply(timeout)
+            self.ready = True
+
+    def recognize(self, image, timeout: float) -> str:
+        self.wait_ready(STARTUP_TIMEOUT)
+        height, width = image.shape
+        self.process.stdin.write(_REQUEST.pack(height, width) + image.tobytes())
+        self.jobs += 1
+        return self._read_reply(timeout)
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+
+class TesseractWorkerPool(OCREngine):
+    """Long-lived Tesseract worker processes, recycled after ``max_jobs`` images."""
+
+    name = "workers"
+
+    def __init__(self, size: int, max_jobs: int = DEFAULT_MAX_JOBS, timeout: float = DEFAULT_TIMEOUT,
+                 fallback: Optional[OCREngine] = None, tessdata: Optional[str] = None):
+        self.size = max(1, size)
+        self.capacity = self.size
+        self.max_jobs = max(1, max_jobs)
+        self.timeout = timeout
+        self.fallback = fallback or PytesseractEngine()
+        self.command = [sys.executable, str(Path(__file__).resolve()), '--worker']
+        if tessdata:
+            self.command += ['--tessdata', tessdata]
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = 0
+        self._closed = False
+        self.disabled = False
+        self.recycled = 0
+
+    def start(self):
+        """Spawn the workers; they load the model in parallel while the server starts."""
+        with self._lock:
+            while self._started < self.size:
+                self._idle.put(_Worker(self.command))
+                self._started += 1
+
+    def _checkout(self) -> _Worker:
+        if self._started < self.size:
+            self.start()
+        return self._idle.get()
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.close()
+        return _Worker(self.command)
+
+    def recognize(self, image) -> str:
+        if self.disabled or self._closed:
+            return self.fallback.recognize(image)
+        worker = self._checkout()
+        try:
+            return worker.recognize(image, self.timeout)
+        except (OSError, TimeoutError, OCRWorkerError) as e:
+            worker.process.kill()
+            if not worker.ready:
+                # The worker could not even load Tesseract: stop trying.
+                logging.error(f"OCR workers unavailable ({e}); falling back to {self.fallback.name}")
+                self.disabled = True
+                return self.fallback.recognize(image)
+            logging.warning(f"OCR worker {worker.process.pid} failed ({e}); replacing it")
+            worker = self._replace(worker)
+            raise OCRWorkerError(f"OCR failed: {e}") from e
+        finally:
+            if worker.jobs >= self.max_jobs:
+                worker = self._replace(worker)
+                self.recycled += 1
+            self._idle.put(worker)
+
+    def close(self):
+        super().close()
+        self._closed = True
+        with self._lock:
+            while self._started:
+                self._idle.get().close()
+                self._started -= 1
+
+
+def create_engine(kind: Optional[str] = None) -> OCREngine:
+    """Engine from OCR_ENGINE: ``auto`` (workers when tesserocr is installed), ``workers`` or ``pytesseract``."""
+    kind = (kind or os.environ.get('OCR_ENGINE', 'auto')).lower()
+    if kind == 'pytesseract':
+        return PytesseractEngine()
+    if kind not in ('auto', 'workers'):
+        raise ValueError(f"Unknown OCR engine: {kind}")
+    if importlib.util.find_spec('tesserocr') is None:
+        if kind == 'workers':
+            logging.warning("OCR_ENGINE=workers needs the tesserocr package; using pytesseract")
+        return PytesseractEngine()
+    return TesseractWorkerPool(
+        size=int(os.environ.get('OCR_WORKERS', min(4, os.cpu_count() or 1))),
+        max_jobs=int(os.environ.get('OCR_WORKER_MAX_JOBS', DEFAULT_MAX_JOBS)),
+        timeout=float(os.environ.get('OCR_TIMEOUT', DEFAULT_TIMEOUT)),
+        tessdata=os.environ.get('TESSDATA_PREFIX'),
+    )
+
+
+def _write_reply(stream, status: int, text: str):
+    data = text.encode('utf-8')
+    stream.write(_REPLY.pack(status, len(data)) + data)
+    stream.flush()
+
+
+def _read_request(stream):
+    header = stream.read(_REQUEST.size)
+    if len(header) < _REQUEST.size:
+        return None
+    height, width = _REQUEST.unpack(header)
+    pixels = stream.read(height * width)
+    if len(pixels) < height * width:
+        return None
+    return height, width, pixels
+
+
+def worker_main(tessdata: Optional[str] = None):
+    """Worker loop: load Tesseract once, then answer requests until stdin closes."""
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    try:
+        import tesserocr
+        options = {'lang': TESSERACT_LANG, 'psm': TESSERACT_PSM, 'oem': TESSERACT_OEM}
+        if tessdata:
+            options['path'] = tessdata.rstrip('/') + '/'
+        api = tesserocr.PyTessBaseAPI(**options)
+        api.SetVariable('tessedit_char_whitelist', TESSERACT_WHITELIST)
+    except Exception as e:  # reported to the parent, which falls back
+        _write_reply(stdout, _ERROR, f"{type(e).__name__}: {e}")
+        return 1
+    _write_reply(stdout, _OK, api.Version())
+
+    while True:
+        request = _read_request(stdin)
+        if request is None:
+            break
+        height, width, pixels = request
+        try:
+            api.SetImageBytes(pixels, width, height, 1, width)
+            api.SetSourceResolution(SOURCE_DPI)
+            _write_reply(stdout, _OK, api.GetUTF8Text())
+        except Exception as e:
+            _write_reply(stdout, _ERROR, f"{type(e).__name__}: {e}")
+    api.End()
+    return 0
+
+
+if __name__ == '__main__':
+    if '--worker' in sys.argv:
+        tessdata = sys.argv[sys.argv.index('--tessdata') + 1] if '--tessdata' in sys.argv else None
+        sys.exit(worker_main(tessdata))
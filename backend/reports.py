@@ -0,0 +1,224 @@
+"""Clinic reports from Mongo aggregations over incrementally maintained rollups.
+
+Saving a diet chart also ``$inc``s two small rollup documents in
+``report_rollups``: one per (patient, day) holding the chart count and the
+calorie sum/min/max, and one per (doctor, ISO week) holding the chart count.
+Calorie trends and charts-per-doctor reports then aggregate at most a few
+hundred rollups per patient-year instead of the charts themselves, over
+indexed fields, and only the aggregated numbers go over the wire.
+``rebuild_rollups`` recomputes the rollups from ``patient_diet_charts`` with a
+``$merge`` pipeline, for backfilling charts saved before rollups existed.
+
+Constitution, condition and allergen distributions cover the registered
+patients: the static dataset's counts are computed once per snapshot
+(``patient_stats``) and database patients are counted with one ``$facet``
+aggregation.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+ROLLUPS = 'report_rollups'
+# Charts saved without a doctor are reported under this id.
+UNASSIGNED = 'unassigned'
+MAX_REPORT_DAYS = 366 * 3
+
+
+def day_key(created_at: datetime) -> str:
+    return created_at.astimezone(timezone.utc).strftime('%Y-%m-%d')
+
+
+def week_key(created_at: datetime) -> str:
+    """ISO week, formatted like Mongo's ``%G-W%V``."""
+    year, week, _ = created_at.astimezone(timezone.utc).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def since(days: int, now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) - timedelta(days=max(1, min(days, MAX_REPORT_DAYS)) - 1)
+
+
+async def ensure_indexes(db):
+    """Indexes the report queries and the per-patient chart listing rely on."""
+    await db[ROLLUPS].create_index([('kind', ASCENDING), ('patient_id', ASCENDING), ('day', ASCENDING)])
+    await db[ROLLUPS].create_index([('kind', ASCENDING), ('day', ASCENDING)])
+    await db[ROLLUPS].create_index([('kind', ASCENDING), ('week', ASCENDING), ('doctor_id', ASCENDING)])
+    await db.patient_diet_charts.create_index([('patient_id', ASCENDING), ('created_at', ASCENDING)])
+    await db.patient_diet_charts.create_index([('doctor_id', ASCENDING), ('created_at', ASCENDING)])
+    await db.patients.create_index([('PatientID', ASCENDING)])
+
+
+def rollup_updates(patient_id: str, doctor_id: Optional[str], calories: int,
+                   created_at: datetime) -> List[UpdateOne]:
+    """Upserts folding one saved chart into its patient-day and doctor-week rollups."""
+    day, week, doctor_id = day_key(created_at), week_key(created_at), doctor_id or UNASSIGNED
+    return [
+        UpdateOne(
+            {'_id': f"patient_day|{patient_id}|{day}"},
+            {'$setOnInsert': {'kind': 'patient_day', 'patient_id': patient_id, 'day': day},
+             '$inc': {'charts': 1, 'calories_sum': calories},
+             '$min': {'calories_min': calories},
+             '$max': {'calories_max': calories}},
+            upsert=True
+        ),
+        UpdateOne(
+            {'_id': f"doctor_week|{doctor_id}|{week}"},
+            {'$setOnInsert': {'kind': 'doctor_week', 'doctor_id': doctor_id, 'week': week},
+             '$inc': {'charts': 1}},
+            upsert=True
+        ),
+    ]
+
+
+async def record_chart(db, patient_id: str, doctor_id: Optional[str], calories: int, created_at: datetime):
+    await db[ROLLUPS].bulk_write(rollup_updates(patient_id, doctor_id, calories, created_at), ordered=False)
+
+
+async def rebuild_rollups(db) -> Dict[str, int]:
+    """Recompute every rollup from ``patient_diet_charts`` (admin backfill; not concurrent-safe with saves)."""
+    charts = [
+        {'$project': {
+            'patient_id': 1,
+            'doctor_id': {'$ifNull': ['$doctor_id', UNASSIGNED]},
+            # Compactly stored charts keep their total beside the chart reference
+            'calories': {'$ifNull': ['$total_daily_calories', '$chart_data.total_daily_calories']},
+            'created': {'$dateFromString': {'dateString': '$created_at'}},
+        }},
+    ]
+    day = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created'}}
+    week = {'$dateToString': {'format': '%G-W%V', 'date': '$created'}}
+    merge = {'$merge': {'into': ROLLUPS, 'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+
+    await db[ROLLUPS].delete_many({'kind': {'$in': ['patient_day', 'doctor_week']}})
+    await db.patient_diet_charts.aggregate(charts + [
+        {'$group': {
+            '_id': {'$concat': ['patient_day|', '$patient_id', '|', day]},
+            'kind': {'$first': {'$literal': 'patient_day'}},
+            'patient_id': {'$first': '$patient_id'},
+            'day': {'$first': day},
+            'charts': {'$sum': 1},
+            'calories_sum': {'$sum': '$calories'},
+            'calories_min': {'$min': '$calories'},
+            'calories_max': {'$max': '$calories'},
+        }},
+        merge,
+    ]).to_list(length=None)
+    await db.patient_diet_charts.aggregate(charts + [
+        {'$group': {
+            '_id': {'$concat': ['doctor_week|', '$doctor_id', '|', week]},
+            'kind': {'$first': {'$literal': 'doctor_week'}},
+            'doctor_id': {'$first': '$doctor_id'},
+            'week': {'$first': week},
+            'charts': {'$sum': 1},
+        }},
+        merge,
+    ]).to_list(length=None)
+    return {
+        'patient_days': await db[ROLLUPS].count_documents({'kind': 'patient_day'}),
+        'doctor_weeks': await db[ROLLUPS].count_documents({'kind': 'doctor_week'}),
+    }
+
+
+async def calorie_trends(db, days: int = 365, patient_id: Optional[str] = None,
+                         bucket: str = 'day') -> List[Dict[str, Any]]:
+    """Per patient: charts and average/min/max daily calories per day or month."""
+    match = {'kind': 'patient_day', 'day': {'$gte': day_key(since(days))}}
+    if patient_id:
+        match['patient_id'] = patient_id
+    period = '$day' if bucket == 'day' else {'$substrCP': ['$day', 0, 7]}
+    pipeline = [
+        {'$match': match},
+        {'$group': {
+            '_id': {'patient_id': '$patient_id', 'period': period},
+            'charts': {'$sum': '$charts'},
+            'calories_sum': {'$sum': '$calories_sum'},
+            'calories_min': {'$min': '$calories_min'},
+            'calories_max': {'$max': '$calories_max'},
+        }},
+        {'$sort': {'_id.patient_id': 1, '_id.period': 1}},
+        {'$group': {
+            '_id': '$_id.patient_id',
+            'charts': {'$sum': '$charts'},
+            'calories_sum': {'$sum': '$calories_sum'},
+            'points': {'$push': {
+                'period': '$_id.period',
+                'charts': '$charts',
+                'avg_calories': {'$round': [{'$divide': ['$calories_sum', '$charts']}, 0]},
+                'min_calories': '$calories_min',
+                'max_calories': '$calories_max',
+            }},
+        }},
+        {'$sort': {'_id': 1}},
+        {'$project': {
+            '_id': 0,
+            'patient_id': '$_id',
+            'charts': 1,
+            'avg_calories': {'$round': [{'$divide': ['$calories_sum', '$charts']}, 0]},
+            'points': 1,
+        }},
+    ]
+    return await db[ROLLUPS].aggregate(pipeline).to_list(length=None)
+
+
+async def charts_per_doctor(db, weeks: int = 52) -> List[Dict[str, Any]]:
+    """Per doctor: charts per ISO week, oldest first, and the total."""
+    pipeline = [
+        {'$match': {'kind': 'doctor_week', 'week': {'$gte': week_key(since(weeks * 7))}}},
+        {'$sort': {'doctor_id': 1, 'week': 1}},
+        {'$group': {
+            '_id': '$doctor_id',
+            'charts': {'$sum': '$charts'},
+            'weeks': {'$push': {'week': '$week', 'charts': '$charts'}},
+        }},
+        {'$sort': {'charts': -1, '_id': 1}},
+        {'$project': {'_id': 0, 'doctor_id': '$_id', 'charts': 1, 'weeks': 1}},
+    ]
+    return await db[ROLLUPS].aggregate(pipeline).to_list(length=None)
+
+
+def patient_stats(patients: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Constitution, condition and allergen counts for a list of patient records."""
+    patients = list(patients)
+    allergens = Counter()
+    for patient in patients:
+        allergens.update({str(a).lower() for a in patient.get('Allergies') or []})
+    return {
+        'patients': len(patients),
+        'constitution': Counter(p.get('Constitution') or 'Not assessed' for p in patients),
+        'condition': Counter(p.get('Condition') or 'Unknown' for p in patients),
+        'allergens': allergens,
+    }
+
+
+async def distribution(db, static_stats: Dict[str, Any], static_ids: Iterable[str]) -> Dict[str, Any]:
+    """Constitution/condition distribution and allergen prevalence over static and database patients."""
+    count = {'$sum': 1}
+    pipeline = [
+        {'$match': {'PatientID': {'$exists': True, '$nin': list(static_ids)}}},
+        {'$facet': {
+            'patients': [{'$count': 'count'}],
+            'constitution': [{'$group': {'_id': {'$ifNull': ['$Constitution', 'Not assessed']}, 'count': count}}],
+            'condition': [{'$group': {'_id': {'$ifNull': ['$Condition', 'Unknown']}, 'count': count}}],
+            'allergens': [
+                {'$project': {'allergens': {'$setUnion': [{'$map': {
+                    'input': {'$ifNull': ['$Allergies', []]}, 'in': {'$toLower': '$$this'}}}]}}},
+                {'$unwind': '$allergens'},
+                {'$group': {'_id': '$allergens', 'count': count}},
+            ],
+        }},
+    ]
+    facets = (await db.patients.aggregate(pipeline).to_list(length=None) or [{}])[0]
+
+    total = static_stats['patients'] + sum(row['count'] for row in facets.get('patients', []))
+    report = {'patients': total}
+    for field in ('constitution', 'condition', 'allergens'):
+        counts = Counter(static_stats[field])
+        for row in facets.get(field, []):
+            counts[row['_id']] += row['count']
+        report[field] = [
+            {'name': name, 'count': n, 'percent': round(100 * n / total, 1) if total else 0.0}
+            for name, n in counts.most_common()
+        ]
+    return report
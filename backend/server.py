@@ -1,82 +1,147 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Header, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 import requests
 import json
 import base64
+import hmac
 import tempfile
 from pathlib import Path
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Type, TypeVar, get_args, get_origin
 import uuid
 from datetime import datetime, timezone
 from enum import Enum
 import re
-import pytesseract
 from PIL import Image
 import io
-import cv2
 import numpy as np
+from catalog import CatalogStore, CatalogSnapshot
+from http_cache import Payload, extend_json_array, payload_index
+from frontend_bundle import FrontendBundle
+from portion_solver import NutrientMatrix, meal_targets
+from food_scoring import FoodScorer
+from smart_swaps import SwapGraph
+from ocr_preprocess import OCRPreprocessor, PreprocessConfig
+from ocr_engine import create_engine
+from deadline import Deadline
+from climatology import Climatology
+import reports
+import chart_versions
+import chart_storage
+from live_updates import EventHub, parse_event_id, sse_topics
+from mongo_guard import CircuitBreaker, MongoGuard, ReadCache, SpillQueue
+from pymongo.errors import ConnectionFailure
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection.  Short timeouts and a circuit breaker (see mongo_guard.py)
+# let handlers fall back within seconds when Mongo is unreachable; writes made
+# meanwhile are spilled to a local file and replayed once it is back.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Load datasets
-with open(ROOT_DIR / 'datasets' / 'food_dataset.json', 'r') as f:
-    FOOD_DATABASE = json.load(f)
-
-with open(ROOT_DIR / 'datasets' / 'patients.json', 'r') as f:
-    PATIENT_DATABASE = json.load(f)
-
-with open(ROOT_DIR / 'datasets' / 'allergy_map.json', 'r') as f:
-    ALLERGY_MAP = json.load(f)
-
-def load_patients_data():
-    """Load patients data from the static dataset"""
-    return PATIENT_DATABASE
-
-# Create recipe database for common Indian dishes
-RECIPE_DATABASE = {
-    # South Indian dishes
-    "sambar": ["toor_dal", "tomato", "onion", "drumstick", "tamarind", "turmeric", "curry_leaves", "mustard_seeds", "coconut_oil", "salt", "coriander_seeds", "red_chili", "asafoetida"],
-    "sambar rice": ["rice", "toor_dal", "tomato", "onion", "drumstick", "tamarind", "turmeric", "curry_leaves", "mustard_seeds", "coconut_oil", "salt", "ghee"],
-    "dosa": ["rice", "urad_dal", "fenugreek_seeds", "salt", "coconut_oil"],
-    "idly": ["rice", "urad_dal", "fenugreek_seeds", "salt"],
-    "idli": ["rice", "urad_dal", "fenugreek_seeds", "salt"],
-    "curd rice": ["rice", "curd", "salt", "curry_leaves", "mustard_seeds", "coconut_oil"],
-    "rasam": ["toor_dal", "tomato", "tamarind", "turmeric", "red_chili", "coriander_seeds", "cumin_seeds", "curry_leaves", "mustard_seeds", "asafoetida", "ghee"],
-    "dal rice": ["rice", "toor_dal", "turmeric", "salt", "ghee", "cumin_seeds"],
-    "khichdi": ["rice", "moong_dal", "turmeric", "salt", "ghee", "cumin_seeds"],
-    "upma": ["semolina", "onion", "curry_leaves", "mustard_seeds", "coconut_oil", "salt"],
-    "pongal": ["rice", "moong_dal", "ghee", "cumin_seeds", "curry_leaves", "salt"],
-    
-    # North Indian dishes
-    "chicken biryani": ["rice", "chicken", "onion", "tomato", "ginger", "garlic", "turmeric", "red_chili", "garam_masala", "coriander_seeds", "cumin_seeds", "ghee", "salt"],
-    "biryani": ["rice", "chicken", "onion", "tomato", "ginger", "garlic", "turmeric", "red_chili", "garam_masala", "coriander_seeds", "cumin_seeds", "ghee", "salt"],
-    "paneer butter masala": ["paneer", "tomato", "onion", "butter", "ginger", "garlic", "turmeric", "red_chili", "garam_masala", "coriander_seeds", "cumin_seeds", "salt"],
-    "butter masala": ["paneer", "tomato", "onion", "butter", "ginger", "garlic", "turmeric", "red_chili", "garam_masala", "coriander_seeds", "cumin_seeds", "salt"],
-    "chapati": ["wheat", "salt", "coconut_oil"],
-    "roti": ["wheat", "salt", "coconut_oil"],
-    "paneer puff": ["wheat", "paneer", "onion", "ginger", "turmeric", "red_chili", "coriander_seeds", "cumin_seeds", "salt", "coconut_oil"],
-    "puff": ["wheat", "paneer", "onion", "ginger", "turmeric", "red_chili", "coriander_seeds", "cumin_seeds", "salt", "coconut_oil"],
-    "dal": ["toor_dal", "turmeric", "salt", "ghee", "cumin_seeds"],
-    "masala": ["tomato", "onion", "ginger", "garlic", "turmeric", "red_chili", "garam_masala", "coriander_seeds", "cumin_seeds"]
-}
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000')),
+    connectTimeoutMS=int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '2000')),
+    socketTimeoutMS=int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '20000'))
+)
+MONGO = MongoGuard(
+    client[os.environ['DB_NAME']],
+    CircuitBreaker(int(os.environ.get('MONGO_BREAKER_FAILURES', '3')),
+                   float(os.environ.get('MONGO_BREAKER_RESET_SECONDS', '10'))),
+    SpillQueue(os.environ.get('MONGO_SPILL_PATH', ROOT_DIR / 'mongo_spill.jsonl'))
+)
+db = MONGO.database
+# Last successful reads, served while Mongo is unreachable
+READ_CACHE = ReadCache()
+
+# Load datasets: foods, allergy map and the recipe database for common Indian
+# dishes come from the compiled, memory-mapped catalog (see catalog.py), and
+# patients from patients.json.  Handlers read ``CATALOG.current`` once per
+# request so a hot reload never mixes two dataset versions in one response.
+CATALOG = CatalogStore(ROOT_DIR / 'datasets')
+DATASET_WATCH_INTERVAL = float(os.environ.get('DATASET_WATCH_INTERVAL', '5'))
+# Admin endpoints stay closed unless this is set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Appointment and patient changes pushed to open dashboards (see live_updates.py)
+LIVE_UPDATES = EventHub()
+
+# Live events for inserts spilled while Mongo was unreachable, published when replay stores them
+REPLAYED_EVENTS = {('patients', 'insert_one'): 'patient.created',
+                   ('appointments', 'insert_one'): 'appointment.created'}
+
+def publish_replayed(entry: Dict[str, Any]):
+    kind = REPLAYED_EVENTS.get((entry['collection'], entry['op']))
+    if kind:
+        document = entry['args'][0]
+        LIVE_UPDATES.record_write(entry['collection'], kind, {**document, '_id': str(document['_id'])})
+
+MONGO.replay_listeners.append(publish_replayed)
+
+def request_snapshot(request: Request) -> CatalogSnapshot:
+    """``CATALOG.current`` for a request, recorded so X-Dataset-Version names the version it served"""
+    snapshot = CATALOG.current
+    request.state.dataset_version = snapshot.version
+    return snapshot
+
+# The static patient list is serialized and compressed once per dataset version
+CATALOG.register_index('payloads', payload_index({
+    'patients': lambda snapshot: snapshot.patients,
+}))
+CATALOG.register_index('static_patient_ids',
+                       lambda snapshot: frozenset(p['PatientID'] for p in snapshot.patients))
+CATALOG.register_index('nutrients', NutrientMatrix.from_snapshot)
+CATALOG.register_index('scoring', FoodScorer.from_snapshot)
+CATALOG.register_index('swaps', SwapGraph.from_snapshot)
+CATALOG.register_index('patient_stats', lambda snapshot: reports.patient_stats(snapshot.patients))
+CATALOG.register_index('food_names', chart_storage.food_names)
+
+def require_admin(x_admin_token: Optional[str]):
+    """403 unless ADMIN_TOKEN is configured and the request sent it as X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest((x_admin_token or '').encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def payload_response(payload: Payload, request: Request) -> Response:
+    """Serve a precomputed payload with ETag / If-None-Match handling"""
+    status, body, headers = payload.respond(
+        request.headers.get('accept-encoding'),
+        request.headers.get('if-none-match'),
+        request.query_params.get('v')
+    )
+    return Response(content=body, status_code=status, headers=headers, media_type=payload.media_type)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    CATALOG.start_watcher(DATASET_WATCH_INTERVAL)
+    recipe_parser.ocr_engine.start()
+    try:
+        await reports.ensure_indexes(db)
+        await chart_versions.ensure_indexes(db)
+    except Exception as e:
+        logging.error(f"Could not create report and chart version indexes: {e}")
+    MONGO.start()
+    LIVE_UPDATES.start(db)
     yield
-    # Shutdown
+    # Shutdown, after the chart writes still running in the background
+    await asyncio.gather(*BACKGROUND_WRITES, return_exceptions=True)
+    await LIVE_UPDATES.stop()
+    await MONGO.stop()
+    CATALOG.stop_watcher()
+    recipe_parser.ocr_engine.close()
     client.close()
 
 # Create the main app without a prefix
@@ -132,6 +197,12 @@ class RecipeInput(BaseModel):
     recipe_text: Optional[str] = None
     recipe_image_base64: Optional[str] = None
 
+class BatchRecipeItem(RecipeInput):
+    id: str
+
+class BatchRecipeRequest(BaseModel):
+    recipes: List[BatchRecipeItem]
+
 class MealRecipeInput(BaseModel):
     breakfast: Optional[RecipeInput] = None
     lunch: Optional[RecipeInput] = None
@@ -180,6 +251,11 @@ class EnhancedDietChart(BaseModel):
     recommendations: List[str]
     smart_swaps_applied: List[str] = []
     portion_adjustments: Dict[str, str] = {}
+    dataset_version: Optional[str] = None
+    degraded_stages: List[str] = []
+    # Regenerated charts: 2, 3, ... and the chart they were regenerated from
+    version: int = 1
+    parent_id: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class PatientDietChart(BaseModel):
@@ -188,6 +264,76 @@ class PatientDietChart(BaseModel):
     chart_data: EnhancedDietChart
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     doctor_notes: Optional[str] = ""
+    doctor_id: Optional[str] = None
+
+# Charts are computed as plain data from catalog records and our own
+# arithmetic (chart_storage.food_item / meal), so by default they become models
+# without validation (``trusted_model``), which could only re-check what we just
+# produced.  STRICT_MODELS=1 (for test runs) validates them strictly instead, so
+# a value pydantic would otherwise have to coerce (a float for an int, a string
+# for an enum) fails where it was produced.  Both take about 40 µs per chart
+# (tests/chart_assembly_benchmark.py): pydantic-core validation is already cheap.
+STRICT_MODELS = os.environ.get('STRICT_MODELS', '').lower() in ('1', 'true', 'yes')
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+def chart_model(model: Type[ModelT], values: Dict[str, Any]) -> ModelT:
+    """An internal chart model, with everything nested in it, from data we produced ourselves"""
+    if STRICT_MODELS:
+        return model.model_validate(values, strict=True)
+    return trusted_model(model, values)
+
+@lru_cache(maxsize=None)
+def construction_plan(model: Type[BaseModel]) -> Optional[tuple]:
+    """(field names, fields with defaults, nested model fields as (name, model, is_list)) for building
+    ``model`` without validation, or None when it needs ``model_construct`` (aliases, private
+    attributes, post-init hooks, extra fields)"""
+    fields = model.model_fields
+    if (model.__pydantic_post_init__ or model.__private_attributes__ or model.model_config.get('extra') == 'allow'
+            or any(field.alias or field.validation_alias for field in fields.values())):
+        return None
+    nested = []
+    for name, field in fields.items():
+        annotation, many = field.annotation, get_origin(field.annotation) is list
+        if many:
+            annotation = get_args(annotation)[0]
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            nested.append((name, annotation, many))
+    defaults = [(name, field) for name, field in fields.items() if not field.is_required()]
+    return fields.keys(), defaults, nested
+
+def trusted_model(model: Type[ModelT], values: Dict[str, Any]) -> ModelT:
+    """``model`` from ``values`` without validation, as ``model_construct`` would build it: nested
+    dicts become the models their fields declare, model instances are kept as they are.  Sets the
+    instance state directly, since ``model_construct`` spends longer resolving aliases and default
+    factories per field than pydantic-core takes to validate the whole chart."""
+    plan = construction_plan(model)
+    if plan is None:
+        return model.model_construct(**values)
+    names, defaults, nested = plan
+    # Food items and meals come with exactly their fields
+    fields = dict(values) if values.keys() == names else {name: values[name] for name in names if name in values}
+    for name, submodel, many in nested:
+        value = fields.get(name)
+        if many and isinstance(value, list):
+            fields[name] = [trusted_model(submodel, item) if isinstance(item, dict) else item for item in value]
+        elif isinstance(value, dict):
+            fields[name] = trusted_model(submodel, value)
+    fields_set = set(fields)
+    for name, field in defaults:
+        if name not in fields:
+            fields[name] = field.default_factory() if field.default_factory else field.get_default()
+    instance = model.__new__(model)
+    setattr_ = object.__setattr__
+    setattr_(instance, '__dict__', fields)
+    setattr_(instance, '__pydantic_fields_set__', fields_set)
+    setattr_(instance, '__pydantic_extra__', None)
+    setattr_(instance, '__pydantic_private__', None)
+    return instance
+
+def meal_data(meal: Dict[str, Any]) -> Dict[str, Any]:
+    """``chart_storage.meal()`` output with the ``MealType`` the model declares"""
+    meal['meal_type'] = MealType(meal['meal_type'])
+    return meal
 
 class Appointment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -204,6 +350,42 @@ class EnhancedDietRequest(BaseModel):
     diet_preferences: DietPreferences
     city_name: str
     meal_recipes: Optional[MealRecipeInput] = None
+    doctor_id: Optional[str] = None
+    # Shortens the server's CHART_DEADLINE for this request
+    deadline_seconds: Optional[float] = Field(None, gt=0)
+
+class MealPlanRequest(EnhancedDietRequest):
+    days: int = Field(7, ge=1, le=28)
+
+class ChartRegenerateRequest(BaseModel):
+    """Inputs changed since the stored chart; fields left out keep their stored values"""
+    city_name: Optional[str] = None
+    refresh_weather: bool = False
+    allergies: Optional[List[str]] = None
+    dislikes: Optional[List[str]] = None
+    calorie_target: Optional[int] = None
+    activity_level: Optional[str] = None
+    deadline_seconds: Optional[float] = Field(None, gt=0)
+    
+    @validator('allergies', 'dislikes', pre=True)
+    def list_not_null(cls, value):
+        # Leave the field out to keep the stored list, send [] to clear it
+        if value is None:
+            raise ValueError("must be a list; leave it out to keep the stored value")
+        return value
+    
+    def apply(self, request: EnhancedDietRequest) -> EnhancedDietRequest:
+        changed = self.dict(exclude_unset=True)
+        preferences = {key: changed[key] for key in ("allergies", "dislikes", "calorie_target") if key in changed}
+        profile = {key: changed[key] for key in ("activity_level",) if changed.get(key)}
+        return request.copy(update={
+            "city_name": changed.get("city_name") or request.city_name,
+            "patient_profile": request.patient_profile.copy(update=profile),
+            "diet_preferences": request.diet_preferences.copy(update=preferences)
+        })
+    
+    def changes(self) -> Dict[str, Any]:
+        return self.dict(exclude_unset=True, exclude={"deadline_seconds"})
 
 # Enhanced Services
 class PortionCalculator:
@@ -238,80 +420,115 @@ class PortionCalculator:
         adjusted_portion = int(base_portion * activity_multiplier.get(activity_level, 1.0))
         
         return adjusted_portion, f"{adjusted_portion}g"
+    
+    @staticmethod
+    def fit_to_target(meal_portions: Dict[str, List[tuple]], calorie_target: int,
+                      snapshot: Optional[CatalogSnapshot] = None) -> Dict[str, List[int]]:
+        """Rescale each meal's (food_key, grams) portions to its share of the daily calorie target"""
+        snapshot = snapshot or CATALOG.current
+        served = [meal_type for meal_type, portions in meal_portions.items() if portions]
+        targets = meal_targets(calorie_target, served)
+        solved, out_of_bounds = snapshot.index('nutrients').solve_with_bounds([
+            ([key for key, _ in meal_portions[meal_type]], [grams for _, grams in meal_portions[meal_type]],
+             targets[meal_type])
+            for meal_type in served
+        ])
+        # Common for meals of a few foods (about half of them), so not worth a warning each
+        for meal_type, outside in zip(served, out_of_bounds):
+            if outside:
+                logging.debug(f"No portions of {[key for key, _ in meal_portions[meal_type]]} keep {meal_type} "
+                                f"within the macro bounds; scaled for calories only")
+        fitted = {meal_type: [] for meal_type in meal_portions}
+        fitted.update(zip(served, solved))
+        return fitted
 
 class SmartSwapEngine:
     @staticmethod
-    def find_swaps(food_key: str, allergens: List[str], dislikes: List[str]) -> List[str]:
+    def find_swap_options(food_key: str, allergens: List[str], dislikes: List[str],
+                          snapshot: Optional[CatalogSnapshot] = None) -> List[tuple]:
+        """(key, name) of up to three same-category alternatives, most similar first, free of
+        the patient's allergens and dislikes (see smart_swaps.py)"""
+        snapshot = snapshot or CATALOG.current
+        graph = snapshot.index('swaps')
+        return graph.swaps(food_key, graph.allergen_bitmask(allergens), graph.disliked(dislikes))
+    
+    @staticmethod
+    def find_swaps(food_key: str, allergens: List[str], dislikes: List[str],
+                   snapshot: Optional[CatalogSnapshot] = None) -> List[str]:
         """Find suitable food swaps based on allergies, dislikes, and general alternatives"""
-        if not FOOD_DATABASE.get(food_key):
-            return []
-        
-        food = FOOD_DATABASE[food_key]
-        swaps = []
-        
-        # Check if food has allergens
-        has_allergen = False
-        for allergen in allergens:
-            allergen_lower = allergen.lower()
-            if allergen_lower in ALLERGY_MAP:
-                allergen_foods = [item.lower() for item in ALLERGY_MAP[allergen_lower]]
-                if food_key.lower() in allergen_foods or any(a in food.get('allergens', []) for a in [allergen_lower]):
-                    has_allergen = True
-                    break
-        
-        # Check if food is disliked
-        is_disliked = food_key.lower() in [d.lower() for d in dislikes]
-        
-        # Find similar foods in same category for alternatives
-        same_category_foods = [k for k, v in FOOD_DATABASE.items() 
-                             if v.get('category') == food.get('category') and k != food_key]
-        
-        # If food has allergens or is disliked, find safe alternatives
-        if has_allergen or is_disliked:
-            for alternative in same_category_foods:
-                alt_food = FOOD_DATABASE[alternative]
-                # Check if alternative doesn't have allergens
-                alt_has_allergen = False
-                for allergen in allergens:
-                    allergen_lower = allergen.lower()
-                    if allergen_lower in ALLERGY_MAP:
-                        allergen_foods = [item.lower() for item in ALLERGY_MAP[allergen_lower]]
-                        if alternative.lower() in allergen_foods or any(a in alt_food.get('allergens', []) for a in [allergen_lower]):
-                            alt_has_allergen = True
-                            break
-                
-                if not alt_has_allergen and alternative.lower() not in [d.lower() for d in dislikes]:
-                    swaps.append(alt_food['name'])
-        else:
-            # Proactive swaps: Always suggest alternatives for variety
-            for alternative in same_category_foods[:3]:  # Limit to 3 alternatives
-                alt_food = FOOD_DATABASE[alternative]
-                # Check if alternative doesn't have allergens
-                alt_has_allergen = False
-                for allergen in allergens:
-                    allergen_lower = allergen.lower()
-                    if allergen_lower in ALLERGY_MAP:
-                        allergen_foods = [item.lower() for item in ALLERGY_MAP[allergen_lower]]
-                        if alternative.lower() in allergen_foods or any(a in alt_food.get('allergens', []) for a in [allergen_lower]):
-                            alt_has_allergen = True
-                            break
-                
-                if not alt_has_allergen and alternative.lower() not in [d.lower() for d in dislikes]:
-                    swaps.append(alt_food['name'])
-        
-        return swaps[:3]
+        return [name for _, name in SmartSwapEngine.find_swap_options(food_key, allergens, dislikes, snapshot)]
 
 class EnhancedRecipeParser:
+    # Dish and ingredient patterns, compiled once for every parser
+    INGREDIENT_PATTERNS = [(re.compile(pattern), ingredient_list) for pattern, ingredient_list in {
+        # South Indian dishes
+        r'\b(?:sambar|sambhar)\b': ['toor_dal', 'tomato', 'onion', 'drumstick', 'tamarind', 'turmeric', 'curry_leaves', 'mustard_seeds', 'coconut_oil', 'salt'],
+        r'\b(?:sambar\s*rice|sambhar\s*rice)\b': ['rice', 'toor_dal', 'tomato', 'onion', 'drumstick', 'tamarind', 'turmeric', 'curry_leaves', 'mustard_seeds', 'coconut_oil', 'salt', 'ghee'],
+        r'\b(?:curd\s*rice|dahi\s*chawal)\b': ['rice', 'curd', 'salt', 'curry_leaves', 'mustard_seeds', 'coconut_oil'],
+        r'\b(?:dal\s*rice|daal\s*chawal)\b': ['rice', 'toor_dal', 'turmeric', 'salt', 'ghee', 'cumin_seeds'],
+        r'\bdosa\b': ['rice', 'urad_dal', 'fenugreek_seeds', 'salt', 'coconut_oil'],
+        r'\bidl[yi]\b': ['rice', 'urad_dal', 'fenugreek_seeds', 'salt'],
+        r'\brasam\b': ['toor_dal', 'tomato', 'tamarind', 'turmeric', 'red_chili', 'coriander_seeds', 'cumin_seeds', 'curry_leaves', 'mustard_seeds', 'asafoetida', 'ghee'],
+        r'\bkhichdi\b': ['rice', 'moong_dal', 'turmeric', 'salt', 'ghee', 'cumin_seeds'],
+        r'\bupma\b': ['semolina', 'onion', 'curry_leaves', 'mustard_seeds', 'coconut_oil', 'salt'],
+        r'\bpongal\b': ['rice', 'moong_dal', 'ghee', 'cumin_seeds', 'curry_leaves', 'salt'],
+        
+        # North Indian dishes
+        r'\b(?:chicken\s*biryani|biryani)\b': ['rice', 'chicken', 'onion', 'tomato', 'ginger', 'garlic', 'turmeric', 'red_chili', 'garam_masala', 'coriander_seeds', 'cumin_seeds', 'ghee', 'salt'],
+        r'\b(?:chicken\s*curry|murgh\s*curry)\b': ['chicken', 'onion', 'tomato', 'ginger', 'garlic', 'turmeric', 'red_chili', 'garam_masala', 'coriander_seeds', 'cumin_seeds', 'coconut_oil', 'salt'],
+        r'\b(?:paneer\s*butter\s*masala|butter\s*masala)\b': ['paneer', 'tomato', 'onion', 'butter', 'ginger', 'garlic', 'turmeric', 'red_chili', 'garam_masala', 'coriander_seeds', 'cumin_seeds', 'salt'],
+        r'\b(?:paneer\s*puff|puff)\b': ['wheat', 'paneer', 'onion', 'ginger', 'turmeric', 'red_chili', 'coriander_seeds', 'cumin_seeds', 'salt', 'coconut_oil'],
+        r'\b(?:chapati|roti)\b': ['wheat', 'salt', 'coconut_oil'],
+        
+        # Individual ingredient patterns (enhanced)
+        r'\b(?:dal|dhal|daal)\b': ['toor_dal', 'moong_dal'],
+        r'\b(?:rice|chawal|bhat|anna|basmati)\b': ['rice'],
+        r'\b(?:chicken|murgh|poultry)\b': ['chicken'],
+        r'\b(?:paneer|cottage\s*cheese)\b': ['paneer'],
+        r'\b(?:wheat|atta|flour)\b': ['wheat'],
+        r'\b(?:chapati|roti|bread)\b': ['chapati'],
+        r'\b(?:butter|makhan)\b': ['butter'],
+        r'\b(?:strawberry|strawberries)\b': ['strawberry'],
+        r'\b(?:coconut|nariyal)\b': ['coconut'],
+        r'\b(?:tomato|tamatar)\b': ['tomato'],
+        r'\b(?:onion|pyaaz|kanda)\b': ['onion'],
+        r'\b(?:curd|dahi|yogurt|yoghurt)\b': ['curd'],
+        r'\b(?:ghee|clarified butter)\b': ['ghee'],
+        r'\b(?:oil|tel)\b': ['coconut_oil'],
+        r'\b(?:spice|masala|masalas)\b': ['turmeric', 'red_chili', 'coriander_seeds'],
+        r'\b(?:curry\s*leaves|kadi\s*patta)\b': ['curry_leaves'],
+        r'\b(?:mustard|rai|sarson)\b': ['mustard_seeds'],
+        r'\b(?:turmeric|haldi)\b': ['turmeric'],
+        r'\b(?:tamarind|imli)\b': ['tamarind'],
+        r'\b(?:fenugreek|methi)\b': ['fenugreek_seeds'],
+        r'\b(?:coriander|dhania)\b': ['coriander_seeds'],
+        r'\b(?:cumin|jeera)\b': ['cumin_seeds'],
+        r'\b(?:chili|chilli|mirch|pepper)\b': ['red_chili'],
+        r'\b(?:hing|asafoetida)\b': ['asafoetida'],
+        r'\b(?:drumstick|moringa)\b': ['drumstick'],
+        r'\b(?:semolina|suji|rava)\b': ['semolina'],
+        r'\b(?:urad|black gram)\b': ['urad_dal'],
+        r'\b(?:moong|green gram|mung)\b': ['moong_dal'],
+        r'\b(?:toor|arhar|pigeon pea)\b': ['toor_dal']
+    }.items()]
+    
+    # Used when OCR fails or runs out of time
+    ERROR_FALLBACK_INGREDIENTS = ["rice", "toor_dal", "ghee", "turmeric", "salt"]
+    
     def __init__(self):
         self.ocr_api_key = os.environ.get('OCR_API_KEY')
-        # Configure tesseract if needed
-        # pytesseract.pytesseract.tesseract_cmd = r'/usr/bin/tesseract'  # Adjust path if needed
+        self.preprocessor = OCRPreprocessor(PreprocessConfig.from_env())
+        # Persistent Tesseract workers when tesserocr is installed, else pytesseract (see ocr_engine.py)
+        self.ocr_engine = create_engine()
     
-    def parse_recipe_text(self, recipe_text: str) -> List[str]:
+    def parse_recipe_text(self, recipe_text: str, snapshot: Optional[CatalogSnapshot] = None) -> List[str]:
         """Enhanced ingredient extraction from recipe text"""
         if not recipe_text:
             return []
         
+        snapshot = snapshot or CATALOG.current
+        RECIPE_DATABASE, resolver = snapshot.recipes, snapshot.resolver
+        
         ingredients = set()
         recipe_lower = recipe_text.lower()
         
@@ -323,36 +540,18 @@ class EnhancedRecipeParser:
                 ingredients.update(dish_ingredients)
                 logging.info(f"Found dish '{dish_name}' with ingredients: {dish_ingredients}")
         
-        # Enhanced individual food item matching with multiple variations
-        for food_key, food_data in FOOD_DATABASE.items():
-            food_name = food_data['name'].lower()
-            
-            # Create multiple variations for matching
-            food_variations = [
-                food_key.lower(),
-                food_name,
-                food_name.replace(' ', ''),
-                food_key.replace('_', ' ').lower(),
-                food_key.replace('_', '').lower()
-            ]
-            
-            # Add common alternate names and better matching
-            if food_key == 'rice':
-                food_variations.extend(['chawal', 'bhat', 'anna', 'basmati', 'steamed rice'])
-            elif food_key == 'chicken':
-                food_variations.extend(['murgh', 'poultry', 'fowl', 'hen', 'broiler'])
-            elif food_key == 'toor_dal':
-                food_variations.extend(['dal', 'dhal', 'pigeon pea', 'arhar', 'tuvar'])
-            elif food_key == 'curd':
-                food_variations.extend(['yogurt', 'yoghurt', 'dahi'])
-            elif food_key == 'coconut_oil':
-                food_variations.extend(['oil', 'coconut oil'])
-            elif food_key == 'paneer':
-                food_variations.extend(['cottage cheese', 'fresh cheese'])
-            elif food_key == 'wheat':
-                food_variations.extend(['atta', 'flour', 'bread', 'roti', 'chapati'])
-            elif food_key == 'butter':
-                food_variations.extend(['makhan', 'white butter', 'unsalted butter'])
+        # Enhanced individual food item matching with the resolver's
+        # precomputed spelling variations of each key and display name
+        recipe_words = recipe_lower.split()
+        for food_key, food_variations in resolver.spellings.items():
+            # Regional aliases (datasets/food_aliases.json) match whole words
+            alias_pattern = resolver.alias_patterns.get(food_key)
+            if alias_pattern:
+                match = alias_pattern.search(recipe_lower)
+                if match:
+                    ingredients.add(food_key)
+                    logging.info(f"Found ingredient '{food_key}' via alias '{match.group(0)}'")
+                    continue
             
             # Check for matches with partial word matching
             for variation in food_variations:
@@ -363,100 +562,42 @@ class EnhancedRecipeParser:
                         logging.info(f"Found ingredient '{food_key}' via exact match '{variation}'")
                         break
                     # Partial word boundary match for compound words
-                    elif len(variation) > 4 and any(word.startswith(variation[:4]) for word in recipe_lower.split()):
+                    elif len(variation) > 4 and any(word.startswith(variation[:4]) for word in recipe_words):
                         ingredients.add(food_key)
                         logging.info(f"Found ingredient '{food_key}' via partial match '{variation}'")
                         break
         
         # Enhanced pattern matching for common ingredients and combinations
-        ingredient_patterns = {
-            # South Indian dishes
-            r'\b(?:sambar|sambhar)\b': ['toor_dal', 'tomato', 'onion', 'drumstick', 'tamarind', 'turmeric', 'curry_leaves', 'mustard_seeds', 'coconut_oil', 'salt'],
-            r'\b(?:sambar\s*rice|sambhar\s*rice)\b': ['rice', 'toor_dal', 'tomato', 'onion', 'drumstick', 'tamarind', 'turmeric', 'curry_leaves', 'mustard_seeds', 'coconut_oil', 'salt', 'ghee'],
-            r'\b(?:curd\s*rice|dahi\s*chawal)\b': ['rice', 'curd', 'salt', 'curry_leaves', 'mustard_seeds', 'coconut_oil'],
-            r'\b(?:dal\s*rice|daal\s*chawal)\b': ['rice', 'toor_dal', 'turmeric', 'salt', 'ghee', 'cumin_seeds'],
-            r'\bdosa\b': ['rice', 'urad_dal', 'fenugreek_seeds', 'salt', 'coconut_oil'],
-            r'\bidl[yi]\b': ['rice', 'urad_dal', 'fenugreek_seeds', 'salt'],
-            r'\brasam\b': ['toor_dal', 'tomato', 'tamarind', 'turmeric', 'red_chili', 'coriander_seeds', 'cumin_seeds', 'curry_leaves', 'mustard_seeds', 'asafoetida', 'ghee'],
-            r'\bkhichdi\b': ['rice', 'moong_dal', 'turmeric', 'salt', 'ghee', 'cumin_seeds'],
-            r'\bupma\b': ['semolina', 'onion', 'curry_leaves', 'mustard_seeds', 'coconut_oil', 'salt'],
-            r'\bpongal\b': ['rice', 'moong_dal', 'ghee', 'cumin_seeds', 'curry_leaves', 'salt'],
-            
-            # North Indian dishes
-            r'\b(?:chicken\s*biryani|biryani)\b': ['rice', 'chicken', 'onion', 'tomato', 'ginger', 'garlic', 'turmeric', 'red_chili', 'garam_masala', 'coriander_seeds', 'cumin_seeds', 'ghee', 'salt'],
-            r'\b(?:chicken\s*curry|murgh\s*curry)\b': ['chicken', 'onion', 'tomato', 'ginger', 'garlic', 'turmeric', 'red_chili', 'garam_masala', 'coriander_seeds', 'cumin_seeds', 'coconut_oil', 'salt'],
-            r'\b(?:paneer\s*butter\s*masala|butter\s*masala)\b': ['paneer', 'tomato', 'onion', 'butter', 'ginger', 'garlic', 'turmeric', 'red_chili', 'garam_masala', 'coriander_seeds', 'cumin_seeds', 'salt'],
-            r'\b(?:paneer\s*puff|puff)\b': ['wheat', 'paneer', 'onion', 'ginger', 'turmeric', 'red_chili', 'coriander_seeds', 'cumin_seeds', 'salt', 'coconut_oil'],
-            r'\b(?:chapati|roti)\b': ['wheat', 'salt', 'coconut_oil'],
-            
-            # Individual ingredient patterns (enhanced)
-            r'\b(?:dal|dhal|daal)\b': ['toor_dal', 'moong_dal'],
-            r'\b(?:rice|chawal|bhat|anna|basmati)\b': ['rice'],
-            r'\b(?:chicken|murgh|poultry)\b': ['chicken'],
-            r'\b(?:paneer|cottage\s*cheese)\b': ['paneer'],
-            r'\b(?:wheat|atta|flour)\b': ['wheat'],
-            r'\b(?:chapati|roti|bread)\b': ['chapati'],
-            r'\b(?:butter|makhan)\b': ['butter'],
-            r'\b(?:strawberry|strawberries)\b': ['strawberry'],
-            r'\b(?:coconut|nariyal)\b': ['coconut'],
-            r'\b(?:tomato|tamatar)\b': ['tomato'],
-            r'\b(?:onion|pyaaz|kanda)\b': ['onion'],
-            r'\b(?:curd|dahi|yogurt|yoghurt)\b': ['curd'],
-            r'\b(?:ghee|clarified butter)\b': ['ghee'],
-            r'\b(?:oil|tel)\b': ['coconut_oil'],
-            r'\b(?:spice|masala|masalas)\b': ['turmeric', 'red_chili', 'coriander_seeds'],
-            r'\b(?:curry\s*leaves|kadi\s*patta)\b': ['curry_leaves'],
-            r'\b(?:mustard|rai|sarson)\b': ['mustard_seeds'],
-            r'\b(?:turmeric|haldi)\b': ['turmeric'],
-            r'\b(?:tamarind|imli)\b': ['tamarind'],
-            r'\b(?:fenugreek|methi)\b': ['fenugreek_seeds'],
-            r'\b(?:coriander|dhania)\b': ['coriander_seeds'],
-            r'\b(?:cumin|jeera)\b': ['cumin_seeds'],
-            r'\b(?:chili|chilli|mirch|pepper)\b': ['red_chili'],
-            r'\b(?:hing|asafoetida)\b': ['asafoetida'],
-            r'\b(?:drumstick|moringa)\b': ['drumstick'],
-            r'\b(?:semolina|suji|rava)\b': ['semolina'],
-            r'\b(?:urad|black gram)\b': ['urad_dal'],
-            r'\b(?:moong|green gram|mung)\b': ['moong_dal'],
-            r'\b(?:toor|arhar|pigeon pea)\b': ['toor_dal']
-        }
-        
-        for pattern, ingredient_list in ingredient_patterns.items():
-            if re.search(pattern, recipe_lower):
+        for pattern, ingredient_list in self.INGREDIENT_PATTERNS:
+            if pattern.search(recipe_lower):
                 ingredients.update(ingredient_list)
-                logging.info(f"Pattern '{pattern}' matched, added: {ingredient_list}")
+                logging.info(f"Pattern '{pattern.pattern}' matched, added: {ingredient_list}")
         
-        # Split text into words and check each word
+        # Split text into words and resolve each word
         words = re.findall(r'\b\w+\b', recipe_lower)
         for word in words:
             if len(word) > 3:  # Avoid very short words
-                for food_key, food_data in FOOD_DATABASE.items():
-                    if word == food_key.lower() or word == food_data['name'].lower():
-                        ingredients.add(food_key)
-                        break
+                food_key = resolver.resolve(word)
+                if food_key:
+                    ingredients.add(food_key)
         
         result = list(ingredients)
         logging.info(f"Final parsed ingredients from '{recipe_text}': {result}")
         return result
     
-    def preprocess_image(self, image_array):
-        """Preprocess image for better OCR results"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-        
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        
-        # Apply threshold to get better contrast
-        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Morphological operations to clean up the image
-        kernel = np.ones((2, 2), np.uint8)
-        cleaned = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        
-        return cleaned
+    def preprocess_image(self, image_array, dpi: Optional[float] = None):
+        """Preprocess image for better OCR results (see ocr_preprocess.py)"""
+        result = self.preprocessor.run(image_array, dpi)
+        logging.info("OCR preprocessing stages: " +
+                     ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in result.timings.items()))
+        return result.image
+    
+    async def parse_recipe_image(self, image_base64: str, snapshot: Optional[CatalogSnapshot] = None) -> List[str]:
+        """Enhanced OCR parsing using Tesseract, on the OCR engine's own threads"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.ocr_engine.executor, self.parse_recipe_image_sync, image_base64, snapshot)
     
-    async def parse_recipe_image(self, image_base64: str) -> List[str]:
+    def parse_recipe_image_sync(self, image_base64: str, snapshot: Optional[CatalogSnapshot] = None) -> List[str]:
         """Enhanced OCR parsing using Tesseract"""
         try:
             logging.info("Starting OCR parsing with Tesseract")
@@ -464,29 +605,24 @@ class EnhancedRecipeParser:
             # Decode base64 image
             image_data = base64.b64decode(image_base64)
             image = Image.open(io.BytesIO(image_data))
+            dpi = image.info.get('dpi', (None,))[0]
             
-            # Convert PIL image to OpenCV format
+            # Convert PIL image to an RGB or grayscale array
+            if image.mode not in ('L', 'RGB'):
+                image = image.convert('RGB')
             image_array = np.array(image)
-            if len(image_array.shape) == 3:
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
             
             # Preprocess image for better OCR
-            processed_image = self.preprocess_image(image_array)
-            
-            # Convert back to PIL for tesseract
-            processed_pil = Image.fromarray(processed_image)
-            
-            # Configure tesseract for better accuracy
-            custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 .,()-'
+            processed_image = self.preprocess_image(image_array, dpi)
             
             # Extract text using tesseract
-            extracted_text = pytesseract.image_to_string(processed_pil, config=custom_config, lang='eng')
+            extracted_text = self.ocr_engine.recognize(processed_image)
             
             logging.info(f"OCR extracted text: '{extracted_text}'")
             
             # Parse the extracted text using the enhanced text parser
             if extracted_text.strip():
-                ingredients = self.parse_recipe_text(extracted_text)
+                ingredients = self.parse_recipe_text(extracted_text, snapshot)
                 if ingredients:
                     logging.info(f"OCR parsed ingredients: {ingredients}")
                     return ingredients
@@ -504,23 +640,32 @@ class EnhancedRecipeParser:
         except Exception as e:
             logging.error(f"OCR parsing error: {e}")
             # Return fallback ingredients
-            fallback_ingredients = ["rice", "toor_dal", "ghee", "turmeric", "salt"]
+            fallback_ingredients = list(self.ERROR_FALLBACK_INGREDIENTS)
             logging.info(f"OCR error fallback ingredients: {fallback_ingredients}")
             return fallback_ingredients
 
+# Typical weather per city and month (see climatology.py).  "hybrid" uses live
+# weather when an API key is set and falls back to these; "climatology" never
+# calls the weather API.
+CLIMATOLOGY = Climatology.load(ROOT_DIR / 'datasets' / 'climatology.json')
+WEATHER_MODE = os.environ.get('WEATHER_MODE', 'hybrid')
+
 class EnhancedWeatherService:
     def __init__(self):
         self.api_key = os.environ.get('OPENWEATHER_API_KEY')
-        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.base_url = os.environ.get('OPENWEATHER_URL', "http://api.openweathermap.org/data/2.5/weather")
+        self.live = bool(self.api_key) and WEATHER_MODE != 'climatology'
     
-    async def get_weather_data(self, city: str) -> WeatherData:
+    async def get_weather_data(self, city: str, timeout: Optional[float] = None) -> WeatherData:
+        if not self.live:
+            return self.default_weather(city)
         try:
             params = {
                 'q': city,
                 'appid': self.api_key,
                 'units': 'metric'
             }
-            response = requests.get(self.base_url, params=params)
+            response = await asyncio.to_thread(requests.get, self.base_url, params=params, timeout=timeout)
             response.raise_for_status()
             data = response.json()
             
@@ -547,13 +692,12 @@ class EnhancedWeatherService:
             )
         except Exception as e:
             logging.error(f"Weather API error: {e}")
-            return WeatherData(
-                temperature=25.0,
-                humidity=60,
-                description="moderate climate",
-                season="Spring",
-                city=city
-            )
+            return self.default_weather(city)
+    
+    @staticmethod
+    def default_weather(city: str) -> WeatherData:
+        """Typical weather for the city this month, used when live weather is off or unavailable"""
+        return WeatherData(**CLIMATOLOGY.weather(city))
 
 class GeoAyurvedicEngine:
     def __init__(self):
@@ -562,7 +706,8 @@ class GeoAyurvedicEngine:
         self.swap_engine = SmartSwapEngine()
         self.recipe_parser = EnhancedRecipeParser()
     
-    def select_foods_for_climate_dosha(self, weather: WeatherData, constitution: str, allergens: List[str], recipe_ingredients: List[str] = None) -> Dict[str, List[str]]:
+    def select_foods_for_climate_dosha(self, weather: WeatherData, constitution: str, allergens: List[str], recipe_ingredients: List[str] = None,
+                                       snapshot: Optional[CatalogSnapshot] = None) -> Dict[str, List[str]]:
         """Enhanced food selection based on climate, dosha, and recipe ingredients"""
         selected_foods = {"breakfast": [], "lunch": [], "snack": [], "dinner": []}
         
@@ -584,46 +729,9 @@ class GeoAyurvedicEngine:
             
             return selected_foods
         
-        # Climate-based selection
-        if weather.temperature > 30:
-            climate_pref = "hot"
-        elif weather.temperature < 15:
-            climate_pref = "cold"
-        else:
-            climate_pref = "moderate"
-        
-        # Filter foods by climate preference and constitution
-        suitable_foods = []
-        for food_key, food_data in FOOD_DATABASE.items():
-            # Check climate suitability
-            if climate_pref == "hot" and food_data.get('climate_preference') in ['hot', 'neutral']:
-                suitable_foods.append(food_key)
-            elif climate_pref == "cold" and food_data.get('climate_preference') in ['cold', 'neutral']:
-                suitable_foods.append(food_key)
-            elif climate_pref == "moderate":
-                suitable_foods.append(food_key)
-        
-        # Filter out allergens
-        safe_foods = []
-        for food_key in suitable_foods:
-            food_data = FOOD_DATABASE[food_key]
-            has_allergen = False
-            for allergen in allergens:
-                allergen_lower = allergen.lower()
-                if allergen_lower in ALLERGY_MAP:
-                    allergen_foods = [item.lower() for item in ALLERGY_MAP[allergen_lower]]
-                    if food_key.lower() in allergen_foods or any(a in food_data.get('allergens', []) for a in [allergen_lower]):
-                        has_allergen = True
-                        break
-            
-            if not has_allergen:
-                safe_foods.append(food_key)
-        
-        # Distribute foods across meals
-        grain_foods = [f for f in safe_foods if FOOD_DATABASE[f].get('category') == 'grains']
-        protein_foods = [f for f in safe_foods if FOOD_DATABASE[f].get('category') in ['legumes', 'dairy']]
-        vegetable_foods = [f for f in safe_foods if FOOD_DATABASE[f].get('category') == 'vegetables']
-        spice_foods = [f for f in safe_foods if FOOD_DATABASE[f].get('category') in ['spices', 'herbs']]
+        pool = self.safe_food_pool(weather, allergens, snapshot, constitution, limit=4)
+        grain_foods, protein_foods = pool["grains"], pool["protein"]
+        vegetable_foods, spice_foods, safe_foods = pool["vegetables"], pool["spices"], pool["all"]
         
         # Assign foods to meals
         selected_foods["breakfast"] = (grain_foods[:1] + protein_foods[:1])[:2] or safe_foods[:2]
@@ -633,12 +741,145 @@ class GeoAyurvedicEngine:
         
         return selected_foods
     
-    async def generate_enhanced_diet_chart(self, request: EnhancedDietRequest) -> EnhancedDietChart:
-        """Generate enhanced diet chart with all features"""
-        # Get weather data
-        weather = await self.weather_service.get_weather_data(request.city_name)
+    def safe_food_pool(self, weather: WeatherData, allergens: List[str],
+                       snapshot: Optional[CatalogSnapshot] = None, constitution: Optional[str] = None,
+                       limit: Optional[int] = None) -> Dict[str, List[str]]:
+        """Climate-suitable, allergen-free foods grouped by meal role, best for the constitution first"""
+        snapshot = snapshot or CATALOG.current
+        scorer = snapshot.index('scoring')
+        # Precomputed per (climate, season, constitution, allergen set) for this dataset version
+        plan = scorer.plan(constitution, weather.temperature, weather.season, allergens,
+                           limit or len(scorer.keys))
+        return {role: list(keys) for role, keys in plan.items()}
+    
+    async def generate_enhanced_diet_chart(self, request: EnhancedDietRequest, deadline: Optional[Deadline] = None,
+                                           snapshot: Optional[CatalogSnapshot] = None) -> tuple:
+        """Generate enhanced diet chart with all features; returns the chart and its stored form"""
+        context = await self.prepare_chart_context(request, deadline, snapshot)
+        portions = self.plan_portions(context, self.select_meal_foods(context))
+        return self.assemble_chart(context, portions, regenerable=True)
+    
+    def select_meal_foods(self, context: 'ChartContext') -> Dict[str, List[str]]:
+        """Select foods - use meal-specific ingredients or general selection"""
+        selected_food_keys = {}
+        general_selection = None
+        for meal_type in ["breakfast", "lunch", "snack", "dinner"]:
+            if context.meal_recipe_ingredients[meal_type]:
+                # Use meal-specific ingredients
+                selected_food_keys[meal_type] = context.meal_recipe_ingredients[meal_type]
+            else:
+                # Use general climate-based selection, computed once for all meals without a recipe
+                if general_selection is None:
+                    general_selection = self.select_foods_for_climate_dosha(
+                        context.weather, context.request.patient_profile.constitution, context.all_allergens, [],
+                        context.snapshot
+                    )
+                selected_food_keys[meal_type] = general_selection.get(meal_type, [])
+        return selected_food_keys
+    
+    async def regenerate_chart(self, parent: Dict[str, Any], changes: 'ChartRegenerateRequest',
+                               deadline: Deadline, snapshot: Optional[CatalogSnapshot] = None) -> tuple:
+        """Rebuild a stored chart with changed inputs, recomputing only the stages and meals they affect"""
+        inputs = parent["inputs"]
+        previous = EnhancedDietRequest(**inputs["request"])
+        request = changes.apply(previous)
+        profile, preferences = request.patient_profile, request.diet_preferences
+        snapshot = snapshot or CATALOG.current
+        # A reloaded catalog may have changed any food, so nothing stored is reused
+        catalog_changed = snapshot.version != parent.get("dataset_version")
+        
+        # Weather: the stored conditions unless a refresh was asked for or the city changed
+        stored_weather = WeatherData(**parent["weather_context"])
+        weather = stored_weather
+        if changes.refresh_weather or request.city_name != previous.city_name:
+            weather_stage = deadline.stage("weather")
+            weather = await weather_stage.run(
+                self.weather_service.get_weather_data(request.city_name, timeout=weather_stage.remaining()),
+                lambda: stored_weather if request.city_name == previous.city_name
+                else self.weather_service.default_weather(request.city_name)
+            )
+        weather_changed = (weather.temperature, weather.season) != (stored_weather.temperature, stored_weather.season)
+        
+        all_allergens = list(set(profile.allergies + preferences.allergies))
+        previous_allergens = set(previous.patient_profile.allergies + previous.diet_preferences.allergies)
+        allergens_changed = set(all_allergens) != previous_allergens
+        context = ChartContext(request, snapshot, weather, inputs["meal_recipe_ingredients"], all_allergens, deadline)
+        
+        # Selection (recipe ingredients are reused as parsed) and portions, when their inputs changed
+        stored_portions, stored_swaps = chart_storage.stored_portions(parent)
+        portions = stored_portions
+        if catalog_changed or weather_changed or allergens_changed:
+            selected = {meal_type: [key for key in keys if key in snapshot.foods]
+                        for meal_type, keys in self.select_meal_foods(context).items()}
+        else:
+            selected = {meal_type: [key for key, _, _ in meal_portions] for meal_type, meal_portions in portions.items()}
+        portion_inputs_changed = (
+            profile.activity_level != previous.patient_profile.activity_level
+            or preferences.calorie_target != previous.diet_preferences.calorie_target
+        )
+        if catalog_changed or portion_inputs_changed or any(
+            selected[meal_type] != [key for key, _, _ in meal_portions] for meal_type, meal_portions in portions.items()
+        ):
+            portions = self.plan_portions(context, selected)
+        
+        # Swaps and meals, per meal; meals whose inputs are all unchanged are reused as stored
+        swaps_changed = catalog_changed or allergens_changed or preferences.dislikes != previous.diet_preferences.dislikes
+        meal_inputs_changed = catalog_changed or weather_changed or portion_inputs_changed
+        stored_meals = {chart_versions.meal_key(meal): meal for meal in parent["meals"]}
+        swaps, meals = {}, []
+        for meal_type, meal_portions in portions.items():
+            same_foods = [key for key, _, _ in meal_portions] == [key for key, _, _ in stored_portions[meal_type]]
+            swaps[meal_type] = (stored_swaps[meal_type] if same_foods and not swaps_changed
+                                else self.plan_swaps(context, meal_portions))
+            if (meal_inputs_changed or meal_portions != stored_portions[meal_type]
+                    or swaps[meal_type] != stored_swaps[meal_type]):
+                meals.append(self.build_meal(context, meal_type, meal_portions, swaps[meal_type]))
+            else:
+                meals.append(meal_data(chart_storage.rehydrate_meal(stored_meals[meal_type], snapshot.foods,
+                                                                    parent["patient"])))
         
-        # Parse meal-specific recipes if provided
+        diet_chart = self.finish_chart(context, meals, portions, swaps)
+        diet_chart.parent_id = parent["id"]
+        diet_chart.version = parent.get("version", 1) + 1
+        return diet_chart, self.stored_chart(context, diet_chart, portions, swaps, regenerable=True)
+    
+    async def generate_meal_plan(self, request: 'MealPlanRequest', deadline: Optional[Deadline] = None,
+                                 snapshot: Optional[CatalogSnapshot] = None):
+        """Yield (day, chart, stored chart) for a multi-day plan, one day at a time"""
+        # Weather, recipe parsing and the safe-food pool are computed once for the whole plan,
+        # within the request deadline
+        context = await self.prepare_chart_context(request, deadline, snapshot)
+        planner = MealPlanner(self.safe_food_pool(
+            context.weather, context.all_allergens, context.snapshot,
+            request.patient_profile.constitution, MealPlanner.POOL_SIZE
+        ))
+        
+        for day in range(1, request.days + 1):
+            rotation = planner.next_day()
+            selected_food_keys = {
+                meal_type: context.meal_recipe_ingredients[meal_type] or foods
+                for meal_type, foods in rotation.items()
+            }
+            diet_chart, stored = self.assemble_chart(context, self.plan_portions(context, selected_food_keys))
+            yield day, diet_chart, stored
+            # Let the event loop flush the finished day before building the next
+            await asyncio.sleep(0)
+    
+    async def prepare_chart_context(self, request: EnhancedDietRequest, deadline: Optional[Deadline] = None,
+                                    snapshot: Optional[CatalogSnapshot] = None) -> 'ChartContext':
+        """Fetch weather and parse meal recipes once per request, within the request deadline"""
+        # Pin one dataset version for the whole chart
+        snapshot = snapshot or CATALOG.current
+        deadline = deadline or Deadline.from_env(request.deadline_seconds)
+        
+        # Get weather data, falling back to climate defaults when it is slow
+        weather_stage = deadline.stage("weather")
+        weather_task = asyncio.ensure_future(weather_stage.run(
+            self.weather_service.get_weather_data(request.city_name, timeout=weather_stage.remaining()),
+            lambda: self.weather_service.default_weather(request.city_name)
+        ))
+        
+        # Parse meal-specific recipes if provided, while the weather request is in flight
         meal_recipe_ingredients = {
             "breakfast": [],
             "lunch": [],
@@ -646,123 +887,129 @@ class GeoAyurvedicEngine:
             "dinner": []
         }
         
-        if request.meal_recipes:
-            for meal_type in ["breakfast", "lunch", "snack", "dinner"]:
-                meal_recipe = getattr(request.meal_recipes, meal_type)
-                if meal_recipe:
-                    if meal_recipe.recipe_text:
-                        meal_recipe_ingredients[meal_type] = self.recipe_parser.parse_recipe_text(meal_recipe.recipe_text)
-                    elif meal_recipe.recipe_image_base64:
-                        meal_recipe_ingredients[meal_type] = await self.recipe_parser.parse_recipe_image(meal_recipe.recipe_image_base64)
+        try:
+            if request.meal_recipes:
+                # All images share one OCR budget; images past it get the fallback ingredients
+                ocr_stage = deadline.stage("ocr")
+                ocr_slots = asyncio.Semaphore(self.recipe_parser.ocr_engine.capacity)
+            
+                async def parse_image(image_base64: str) -> List[str]:
+                    async with ocr_slots:
+                        return await self.recipe_parser.parse_recipe_image(image_base64, snapshot)
+            
+                parses = {}
+                for meal_type in ["breakfast", "lunch", "snack", "dinner"]:
+                    meal_recipe = getattr(request.meal_recipes, meal_type)
+                    if meal_recipe:
+                        if meal_recipe.recipe_text:
+                            parses[meal_type] = asyncio.to_thread(
+                                self.recipe_parser.parse_recipe_text, meal_recipe.recipe_text, snapshot
+                            )
+                        elif meal_recipe.recipe_image_base64:
+                            parses[meal_type] = ocr_stage.run(
+                                parse_image(meal_recipe.recipe_image_base64),
+                                lambda: list(self.recipe_parser.ERROR_FALLBACK_INGREDIENTS)
+                            )
+            
+                # A four-image request takes about as long as its slowest image
+                for meal_type, ingredients in zip(parses, await asyncio.gather(*parses.values())):
+                    meal_recipe_ingredients[meal_type] = ingredients
+            
+            weather = await weather_task
+        finally:
+            # A failed recipe parse must not leave the weather lookup running unawaited
+            weather_task.cancel()
         
         # Combine patient allergies and preferences
         all_allergens = list(set(request.patient_profile.allergies + request.diet_preferences.allergies))
         
-        # Select foods - use meal-specific ingredients or general selection
-        selected_food_keys = {}
-        for meal_type in ["breakfast", "lunch", "snack", "dinner"]:
-            if meal_recipe_ingredients[meal_type]:
-                # Use meal-specific ingredients
-                selected_food_keys[meal_type] = meal_recipe_ingredients[meal_type]
-            else:
-                # Use general climate-based selection
-                general_selection = self.select_foods_for_climate_dosha(
-                    weather, request.patient_profile.constitution, all_allergens, []
-                )
-                selected_food_keys[meal_type] = general_selection.get(meal_type, [])
+        return ChartContext(request, snapshot, weather, meal_recipe_ingredients, all_allergens, deadline)
+    
+    def assemble_chart(self, context: 'ChartContext', portions: Dict[str, List[tuple]],
+                       regenerable: bool = False) -> tuple:
+        """Build swaps, meals and the chart for the planned portions; returns the chart and its stored form"""
+        swaps = {meal_type: self.plan_swaps(context, meal_portions) for meal_type, meal_portions in portions.items()}
+        meals = [self.build_meal(context, meal_type, portions[meal_type], swaps[meal_type]) for meal_type in portions]
+        diet_chart = self.finish_chart(context, meals, portions, swaps)
+        return diet_chart, self.stored_chart(context, diet_chart, portions, swaps, regenerable)
+    
+    def plan_portions(self, context: 'ChartContext', selected_food_keys: Dict[str, List[str]]) -> Dict[str, List[tuple]]:
+        """(food_key, base grams, fitted grams) for each selected food in the database, per meal"""
+        request, FOOD_DATABASE = context.request, context.snapshot.foods
+        
+        # Default portions from the age/gender/activity table
+        meal_portions = {
+            meal_type: [
+                (food_key, self.portion_calculator.calculate_portion(
+                    food_key, request.patient_profile.age,
+                    request.patient_profile.gender, request.patient_profile.activity_level
+                )[0])
+                for food_key in food_keys if food_key in FOOD_DATABASE
+            ]
+            for meal_type, food_keys in selected_food_keys.items()
+        }
         
-        # Create meals
-        meals = []
-        smart_swaps_applied = []
-        portion_adjustments = {}
+        # Scale portions to the doctor's calorie target when one is given
+        calorie_target = request.diet_preferences.calorie_target
+        if calorie_target:
+            fitted = self.portion_calculator.fit_to_target(meal_portions, calorie_target, context.snapshot)
+        else:
+            fitted = {meal_type: [grams for _, grams in portions] for meal_type, portions in meal_portions.items()}
         
-        for meal_type, food_keys in selected_food_keys.items():
-            meal_foods = []
-            meal_calories = 0
-            
-            for food_key in food_keys:
-                if food_key not in FOOD_DATABASE:
-                    continue
-                    
-                food_data = FOOD_DATABASE[food_key]
-                
-                # Calculate portion
-                portion_g, portion_str = self.portion_calculator.calculate_portion(
-                    food_key, request.patient_profile.age, 
-                    request.patient_profile.gender, request.patient_profile.activity_level
-                )
-                
-                # Calculate nutrition per portion
-                factor = portion_g / 100
-                calories = int(food_data['calories_per_100g'] * factor)
-                protein = round(food_data['protein'] * factor, 1)
-                carbs = round(food_data['carbs'] * factor, 1)
-                fat = round(food_data['fat'] * factor, 1)
-                fiber = round(food_data['fiber'] * factor, 1)
-                
-                # Find smart swaps (now more proactive)
-                swaps = self.swap_engine.find_swaps(food_key, all_allergens, request.diet_preferences.dislikes)
-                
-                enhanced_food = EnhancedFoodItem(
-                    name=food_data['name'],
-                    category=food_data['category'],
-                    quantity=portion_str,
-                    calories=calories,
-                    protein=protein,
-                    carbs=carbs,
-                    fat=fat,
-                    fiber=fiber,
-                    rasa=food_data['rasa'],
-                    guna=food_data['guna'],
-                    virya=food_data['virya'],
-                    vipaka=food_data['vipaka'],
-                    dosha_effect=food_data['dosha_effect'],
-                    allergens=food_data.get('allergens', []),
-                    smart_swaps=swaps,
-                    portion_info={
-                        "age_adjusted": True,
-                        "activity_level": request.patient_profile.activity_level,
-                        "base_portion": portion_g
-                    }
-                )
-                
-                meal_foods.append(enhanced_food)
-                meal_calories += calories
-                
-                if swaps:
-                    smart_swaps_applied.extend([f"{food_data['name']} → {swap}" for swap in swaps[:1]])
-                
-                portion_adjustments[food_data['name']] = f"Adjusted for {request.patient_profile.age}yr {request.patient_profile.gender}"
-            
-            # Calculate nutrient percentages for bars
-            total_protein_cal = sum(f.protein * 4 for f in meal_foods)
-            total_carb_cal = sum(f.carbs * 4 for f in meal_foods)
-            total_fat_cal = sum(f.fat * 9 for f in meal_foods)
-            total_cal = total_protein_cal + total_carb_cal + total_fat_cal
-            
-            nutrient_bars = {
-                "protein": round((total_protein_cal / total_cal * 100) if total_cal > 0 else 0, 1),
-                "carbs": round((total_carb_cal / total_cal * 100) if total_cal > 0 else 0, 1),
-                "fat": round((total_fat_cal / total_cal * 100) if total_cal > 0 else 0, 1)
-            }
-            
-            # Add meal type context for rationale
-            meal_context = ""
-            if meal_recipe_ingredients[meal_type]:
-                meal_context = f"Based on your {meal_type} recipe with {len(meal_recipe_ingredients[meal_type])} ingredients. "
-            
-            meal = Meal(
-                meal_type=MealType(meal_type.title()),
-                foods=meal_foods,
-                total_calories=meal_calories,
-                ayurvedic_rationale=f"{meal_context}Climate-adapted {meal_type} for {request.patient_profile.constitution} constitution in {weather.season.lower()} weather ({weather.temperature}°C)",
-                nutrient_bars=nutrient_bars
+        return {
+            meal_type: [(food_key, base_portion, portion_g)
+                        for (food_key, base_portion), portion_g in zip(portions, fitted[meal_type])]
+            for meal_type, portions in meal_portions.items()
+        }
+    
+    def plan_swaps(self, context: 'ChartContext', portions: List[tuple]) -> List[List[str]]:
+        """Smart swap food keys for each food of one meal"""
+        dislikes = context.request.diet_preferences.dislikes
+        return [
+            [swap_key for swap_key, _ in self.swap_engine.find_swap_options(
+                food_key, context.all_allergens, dislikes, context.snapshot
+            )]
+            for food_key, _, _ in portions
+        ]
+    
+    def build_meal(self, context: 'ChartContext', meal_type: str, portions: List[tuple],
+                   swaps: List[List[str]]) -> Dict[str, Any]:
+        """One meal (as ``Meal`` data) from its portions and swap keys"""
+        request, weather, FOOD_DATABASE = context.request, context.weather, context.snapshot.foods
+        target_adjusted = bool(request.diet_preferences.calorie_target)
+        
+        # Nutrition per portion and swap names, shared with rehydrating stored charts (chart_storage.py)
+        meal_foods = [
+            chart_storage.food_item(
+                FOOD_DATABASE[food_key], portion_g, base_portion,
+                [FOOD_DATABASE[swap_key]['name'] for swap_key in food_swaps],
+                request.patient_profile.activity_level, target_adjusted
             )
-            
-            meals.append(meal)
+            for (food_key, base_portion, portion_g), food_swaps in zip(portions, swaps)
+        ]
+        
+        # Add meal type context for rationale
+        meal_context = ""
+        if context.meal_recipe_ingredients[meal_type]:
+            meal_context = f"Based on your {meal_type} recipe with {len(context.meal_recipe_ingredients[meal_type])} ingredients. "
+        
+        return meal_data(chart_storage.meal(
+            meal_type, meal_foods,
+            f"{meal_context}Climate-adapted {meal_type} for {request.patient_profile.constitution} constitution in {weather.season.lower()} weather ({weather.temperature}°C)"
+        ))
+    
+    def finish_chart(self, context: 'ChartContext', meals: List[Dict[str, Any]], portions: Dict[str, List[tuple]],
+                     swaps: Dict[str, List[List[str]]]) -> EnhancedDietChart:
+        """Totals, swap and portion notes and recommendations around the built meals"""
+        request, snapshot, weather = context.request, context.snapshot, context.weather
+        meal_recipe_ingredients = context.meal_recipe_ingredients
+        calorie_target = request.diet_preferences.calorie_target
+        smart_swaps_applied, portion_adjustments = chart_storage.chart_notes(
+            snapshot.foods, portions, swaps, self.portion_note(request), calorie_target
+        )
         
         # Calculate total daily calories
-        total_calories = sum(meal.total_calories for meal in meals)
+        total_calories = sum(meal['total_calories'] for meal in meals)
         
         # Generate recommendations
         recommendations = [
@@ -777,22 +1024,241 @@ class GeoAyurvedicEngine:
             meal_count = sum(1 for ingredients in meal_recipe_ingredients.values() if ingredients)
             recommendations.append(f"Custom meal recipes used for {meal_count} meals with {total_recipe_ingredients} total ingredients")
         
+        if calorie_target:
+            recommendations.append(f"Portions scaled to {total_calories} of {calorie_target} kcal/day target")
+        
         if smart_swaps_applied:
             recommendations.append(f"Smart swaps suggested for {len(smart_swaps_applied)} items")
         
-        return EnhancedDietChart(
-            patient_id=request.patient_profile.patient_id,
-            meals=meals,
-            total_daily_calories=total_calories,
-            weather_context=weather,
-            ayurvedic_analysis=f"Personalized {request.patient_profile.constitution} diet plan adapted for {weather.city} climate conditions. Portion sizes optimized for {request.patient_profile.activity_level} activity level.",
-            recommendations=recommendations,
-            smart_swaps_applied=smart_swaps_applied,
-            portion_adjustments=portion_adjustments
-        )
+        return chart_model(EnhancedDietChart, {
+            "patient_id": request.patient_profile.patient_id,
+            "meals": meals,
+            "total_daily_calories": total_calories,
+            "weather_context": weather,
+            "ayurvedic_analysis": f"Personalized {request.patient_profile.constitution} diet plan adapted for {weather.city} climate conditions. Portion sizes optimized for {request.patient_profile.activity_level} activity level.",
+            "recommendations": recommendations,
+            "smart_swaps_applied": smart_swaps_applied,
+            "portion_adjustments": portion_adjustments,
+            "dataset_version": snapshot.version,
+            "degraded_stages": list(context.deadline.degraded)
+        })
+    
+    @staticmethod
+    def portion_note(request: EnhancedDietRequest) -> str:
+        return f"Adjusted for {request.patient_profile.age}yr {request.patient_profile.gender}"
+    
+    def stored_chart(self, context: 'ChartContext', diet_chart: EnhancedDietChart, portions: Dict[str, List[tuple]],
+                     swaps: Dict[str, List[List[str]]], regenerable: bool = False) -> Dict[str, Any]:
+        """The compact form of a chart saved to Mongo (see chart_storage.py); regenerable charts also keep
+        the request without recipe images and the parsed recipe ingredients"""
+        request = context.request
+        # Only the chart-level fields are stored as they are; the meals are kept as portions and swap keys
+        diet_chart_dict = diet_chart.dict(include=set(chart_storage.STORED_FIELDS))
+        diet_chart_dict['meals'] = [{'meal_type': meal.meal_type, 'ayurvedic_rationale': meal.ayurvedic_rationale}
+                                    for meal in diet_chart.meals]
+        diet_chart_dict['created_at'] = diet_chart_dict['created_at'].isoformat()
+        diet_chart_dict['weather_context'] = dict(diet_chart_dict['weather_context'])
+        extra = {}
+        if regenerable:
+            extra['inputs'] = {
+                "request": request.dict(include={"patient_profile", "diet_preferences", "city_name", "doctor_id"}),
+                "meal_recipe_ingredients": context.meal_recipe_ingredients
+            }
+        return chart_storage.compact(diet_chart_dict, portions, swaps, {
+            "portion_note": self.portion_note(request),
+            "activity_level": request.patient_profile.activity_level,
+            "calorie_target": request.diet_preferences.calorie_target
+        }, **extra)
+
+class ChartContext:
+    """Per-request inputs shared by every chart built for that request"""
+    
+    def __init__(self, request: EnhancedDietRequest, snapshot: CatalogSnapshot, weather: WeatherData,
+                 meal_recipe_ingredients: Dict[str, List[str]], all_allergens: List[str], deadline: Deadline):
+        self.request = request
+        self.snapshot = snapshot
+        self.weather = weather
+        self.meal_recipe_ingredients = meal_recipe_ingredients
+        self.all_allergens = all_allergens
+        self.deadline = deadline
+
+class MealPlanner:
+    """Rotates foods through meal slots so consecutive meals and days vary"""
+    
+    # Best-scoring foods per role to rotate through
+    POOL_SIZE = 32
+    
+    # (pool, count) slots per meal, mirroring select_foods_for_climate_dosha
+    MEAL_SLOTS = {
+        "breakfast": [("grains", 1), ("protein", 1)],
+        "lunch": [("grains", 1), ("protein", 1), ("vegetables", 2)],
+        "snack": [("protein", 1), ("spices", 1)],
+        "dinner": [("grains", 1), ("vegetables", 1), ("spices", 1)]
+    }
+    
+    def __init__(self, pool: Dict[str, List[str]]):
+        self.pool = pool
+        self.cursors = {name: 0 for name in pool}
+    
+    def _take(self, pool_name: str, count: int) -> List[str]:
+        items = self.pool[pool_name]
+        picks = []
+        for _ in range(min(count, len(items))):
+            picks.append(items[self.cursors[pool_name] % len(items)])
+            self.cursors[pool_name] += 1
+        return picks
+    
+    def next_day(self) -> Dict[str, List[str]]:
+        start = dict(self.cursors)
+        day = {}
+        for meal_type, slots in self.MEAL_SLOTS.items():
+            picks = [food for pool_name, count in slots for food in self._take(pool_name, count)]
+            day[meal_type] = picks or self._take("all", sum(count for _, count in slots))
+        # A pool used a whole number of times today would repeat today's layout tomorrow
+        for pool_name, cursor in self.cursors.items():
+            size = len(self.pool[pool_name])
+            if size > 1 and (cursor - start[pool_name]) % size == 0:
+                self.cursors[pool_name] += 1
+        return day
 
 # Initialize services
 geo_ayurvedic_engine = GeoAyurvedicEngine()
+recipe_parser = geo_ayurvedic_engine.recipe_parser
+
+# Concurrent OCR jobs for batch recipe parsing, by default what the OCR engine can run at once
+OCR_CONCURRENCY = int(os.environ.get('OCR_CONCURRENCY', recipe_parser.ocr_engine.capacity))
+MAX_BATCH_RECIPES = 1000
+
+def describe_ingredients(ingredients: List[str], snapshot: CatalogSnapshot) -> List[Dict[str, str]]:
+    """Name and category for each parsed ingredient that is in the food database"""
+    FOOD_DATABASE = snapshot.foods
+    return [
+        {
+            "key": ingredient,
+            "name": FOOD_DATABASE[ingredient]["name"],
+            "category": FOOD_DATABASE[ingredient]["category"]
+        }
+        for ingredient in ingredients if ingredient in FOOD_DATABASE
+    ]
+
+# Catalog food records of saved charts, by dataset version (see chart_storage.py)
+CHART_FOODS = chart_storage.FoodArchive()
+
+async def save_chart_foods(stored: Dict[str, Any]):
+    """Archive the catalog records a saved chart refers to, once per dataset version and food"""
+    snapshot = CATALOG.current
+    # A chart finished just before a reload is rehydrated from the newer catalog where the archive lacks a food
+    if stored['dataset_version'] == snapshot.version:
+        try:
+            await CHART_FOODS.remember(db, snapshot.version, snapshot.foods, chart_storage.food_keys(stored))
+        except ConnectionFailure as e:
+            # Unarchived foods are rehydrated from the current catalog
+            logging.warning(f"Could not archive chart foods: {e}")
+
+# Chart writes still running when their request's persistence budget ran out
+BACKGROUND_WRITES = set()
+
+async def persist(deadline: Deadline, writes) -> bool:
+    """Run a chart's dependent ``writes`` to completion, waiting at most the persistence budget.
+
+    They are never cancelled halfway (which would leave a chart without its
+    patient reference, or return an id that was never saved): writes still
+    running when the budget ends finish after the response.  Returns whether
+    they finished in time.
+    """
+    task = asyncio.ensure_future(writes)
+    if await deadline.stage("persistence").settle(task):
+        return True
+    BACKGROUND_WRITES.add(task)
+    task.add_done_callback(background_write_done)
+    return False
+
+def background_write_done(task: asyncio.Task):
+    BACKGROUND_WRITES.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Error finishing diet chart writes: {task.exception()}")
+
+async def save_chart(diet_chart: EnhancedDietChart, stored: Dict[str, Any], doctor_id: Optional[str]):
+    """Save a generated chart: the compact chart, the patient's reference to it, its catalog foods
+    and the report rollups"""
+    patient_diet_chart = chart_model(PatientDietChart, {
+        "patient_id": diet_chart.patient_id,
+        "chart_data": diet_chart,
+        "doctor_notes": "",
+        "doctor_id": doctor_id
+    })
+    patient_chart_dict = patient_diet_chart.dict(exclude={'chart_data'})
+    patient_chart_dict['created_at'] = patient_chart_dict['created_at'].isoformat()
+    patient_chart_dict['chart_id'] = diet_chart.id
+    patient_chart_dict['total_daily_calories'] = diet_chart.total_daily_calories
+    
+    await db.enhanced_diet_charts.insert_one(stored)
+    await db.patient_diet_charts.insert_one(patient_chart_dict)
+    await save_chart_foods(stored)
+    # Fold the chart into the report rollups; a failure only delays reports until a rebuild
+    try:
+        await reports.record_chart(db, patient_diet_chart.patient_id, patient_diet_chart.doctor_id,
+                                   diet_chart.total_daily_calories, patient_diet_chart.created_at)
+    except Exception as e:
+        logging.error(f"Error updating report rollups: {e}")
+
+async def rehydrate_charts(stored_charts: List[Dict[str, Any]],
+                           snapshot: Optional[CatalogSnapshot] = None) -> List[Dict[str, Any]]:
+    """API-shape charts for stored ones, from the catalog foods of each chart's dataset version"""
+    snapshot = snapshot or CATALOG.current
+    foods = await CHART_FOODS.lookup(db, snapshot, stored_charts)
+    return [chart_storage.rehydrate(stored, foods.get(stored.get('dataset_version'), snapshot.foods))
+            for stored in stored_charts]
+
+async def compact_legacy_chart(chart: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Rewrite a chart saved in the full form compactly when that is lossless; returns its compact form"""
+    snapshot = CATALOG.current
+    stored = chart_storage.compact_legacy(chart, snapshot.foods, snapshot.index('food_names'))
+    if stored is None:
+        return None
+    try:
+        # The compact form was checked against the current catalog records, so those are archived for it
+        await CHART_FOODS.remember(db, stored.get('dataset_version'), snapshot.foods, chart_storage.food_keys(stored))
+        await db.enhanced_diet_charts.update_one(
+            {'id': stored['id']},
+            {'$set': stored, '$unset': {'smart_swaps_applied': '', 'portion_adjustments': ''}},
+            upsert=True
+        )
+    except Exception as e:
+        logging.error(f"Error compacting diet chart {stored['id']}: {e}")
+        return None
+    return stored
+
+async def compact_legacy_patient_chart(chart: Dict[str, Any]):
+    """Move a patient's embedded chart into compact storage and reference it"""
+    stored = await compact_legacy_chart(chart['chart_data'])
+    if stored is None:
+        return
+    try:
+        await db.patient_diet_charts.update_one(
+            {'id': chart['id']},
+            {'$set': {'chart_id': stored['id'], 'total_daily_calories': stored['total_daily_calories']},
+             '$unset': {'chart_data': ''}}
+        )
+    except Exception as e:
+        logging.error(f"Error compacting patient diet chart {chart['id']}: {e}")
+
+async def load_stored_chart(chart_id: str) -> Optional[Dict[str, Any]]:
+    """A stored chart version by id, compacted first if it was saved in the full form"""
+    stored = await chart_versions.load(db, chart_id)
+    if stored is not None and stored.get('schema') not in chart_storage.COMPACT_SCHEMAS:
+        stored = await compact_legacy_chart(stored) or stored
+    return stored
+
+async def read_through(key, read):
+    """``await read()``, remembered under ``key``; while Mongo is unreachable the last result (or [])"""
+    try:
+        value = await read()
+    except ConnectionFailure as e:
+        logging.warning(f"MongoDB unavailable, serving cached {key[0]}: {e}")
+        return READ_CACHE.get(key, [])
+    READ_CACHE.put(key, value)
+    return value
 
 # API Routes
 @api_router.get("/")
@@ -800,8 +1266,10 @@ async def root():
     return {"message": "AyushAahar API - Intelligent Ayurvedic Diet Chart Generator"}
 
 @api_router.get("/patients")
-async def get_patients():
+async def get_patients(request: Request):
     """Get all patients from dataset and database"""
+    snapshot = request_snapshot(request)
+    static_payload = snapshot.index('payloads')['patients']
     try:
         # Get patients from database
         db_patients = await db.patients.find().to_list(length=None)
@@ -814,57 +1282,131 @@ async def get_patients():
             if 'PatientID' in patient:
                 valid_db_patients.append(patient)
         
-        # Get static patients
-        static_patients = PATIENT_DATABASE.copy()
-        
-        # Combine both lists, avoiding duplicates based on PatientID
-        all_patients = static_patients.copy()
-        static_patient_ids = {p['PatientID'] for p in static_patients}
-        
-        # Add database patients that don't exist in static data
-        for db_patient in valid_db_patients:
-            if db_patient['PatientID'] not in static_patient_ids:
-                all_patients.append(db_patient)
-        
-        return all_patients
-        
+        # Add database patients that don't exist in static data, avoiding
+        # duplicates based on PatientID
+        static_patient_ids = snapshot.index('static_patient_ids')
+        new_patients = [p for p in valid_db_patients if p['PatientID'] not in static_patient_ids]
+        READ_CACHE.put(('patients',), new_patients)
     except Exception as e:
         logging.error(f"Error fetching all patients: {e}")
-        # Fallback to static data if database fails
-        return PATIENT_DATABASE
+        # Fallback to static data plus the patients last read from the database
+        new_patients = READ_CACHE.get(('patients',), [])
+    
+    if not new_patients:
+        return payload_response(static_payload, request)
+    
+    # Splice the database patients onto the pre-encoded static list
+    combined = Payload(extend_json_array(static_payload.identity, new_patients),
+                       snapshot.version, compress=False)
+    return payload_response(combined, request)
 
 @api_router.post("/generate-enhanced-diet-chart")
-async def generate_enhanced_diet_chart(request: EnhancedDietRequest):
-    """Generate enhanced diet chart with all features"""
+async def generate_enhanced_diet_chart(request: EnhancedDietRequest, http_request: Request):
+    """Generate enhanced diet chart with all features, within the request deadline"""
     try:
-        diet_chart = await geo_ayurvedic_engine.generate_enhanced_diet_chart(request)
-        
-        # Save to database
-        diet_chart_dict = diet_chart.dict()
-        diet_chart_dict['created_at'] = diet_chart_dict['created_at'].isoformat()
-        diet_chart_dict['weather_context'] = dict(diet_chart_dict['weather_context'])
+        deadline = Deadline.from_env(request.deadline_seconds)
+        diet_chart, stored = await geo_ayurvedic_engine.generate_enhanced_diet_chart(
+            request, deadline, request_snapshot(http_request))
         
-        await db.enhanced_diet_charts.insert_one(diet_chart_dict)
+        # Save to database: the chart once, in compact form, with the inputs later regenerations reuse,
+        # and the patient's reference to it
+        stored.update(chart_versions.root_fields(diet_chart.id))
+        await persist(deadline, save_chart(diet_chart, stored, request.doctor_id))
+        diet_chart.degraded_stages = list(deadline.degraded)
         
-        # Also save to patient's diet charts collection
-        patient_diet_chart = PatientDietChart(
-            patient_id=request.patient_profile.patient_id,
-            chart_data=diet_chart,
-            doctor_notes=""
-        )
+        return diet_chart
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
+    except Exception as e:
+        logging.error(f"Error generating enhanced diet chart: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/diet-charts/{chart_id}/regenerate")
+async def regenerate_diet_chart(chart_id: str, changes: ChartRegenerateRequest, request: Request):
+    """Regenerate a saved chart with changed inputs, saving only what changed as a new version"""
+    parent = await load_stored_chart(chart_id)
+    if parent is None:
+        raise HTTPException(status_code=404, detail="Diet chart not found")
+    if 'inputs' not in parent or parent.get('schema') not in chart_storage.COMPACT_SCHEMAS:
+        raise HTTPException(status_code=409, detail="Diet chart was saved without regeneration inputs")
+    try:
+        deadline = Deadline.from_env(changes.deadline_seconds)
+        diet_chart, stored = await geo_ayurvedic_engine.regenerate_chart(parent, changes, deadline,
+                                                                         request_snapshot(request))
+        delta = chart_versions.make_delta(parent, stored, changes.changes())
         
-        patient_chart_dict = patient_diet_chart.dict()
-        patient_chart_dict['created_at'] = patient_chart_dict['created_at'].isoformat()
-        patient_chart_dict['chart_data']['created_at'] = patient_chart_dict['chart_data']['created_at'].isoformat()
-        patient_chart_dict['chart_data']['weather_context'] = dict(patient_chart_dict['chart_data']['weather_context'])
+        async def save_version():
+            await db[chart_versions.VERSIONS].insert_one(delta)
+            await save_chart_foods(stored)
         
-        await db.patient_diet_charts.insert_one(patient_chart_dict)
+        await persist(deadline, save_version())
+        diet_chart.degraded_stages = list(deadline.degraded)
         
         return diet_chart
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
     except Exception as e:
-        logging.error(f"Error generating enhanced diet chart: {e}")
+        logging.error(f"Error regenerating diet chart {chart_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/diet-charts/{chart_id}")
+async def get_diet_chart(chart_id: str, request: Request):
+    """Any saved chart or regenerated version, in full"""
+    stored = await load_stored_chart(chart_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Diet chart not found")
+    return EnhancedDietChart(**(await rehydrate_charts([stored], request_snapshot(request)))[0])
+
+@api_router.post("/generate-meal-plan")
+async def generate_meal_plan(request: MealPlanRequest, http_request: Request):
+    """Stream a multi-day meal plan as Server-Sent Events, one event per day"""
+    plan_id = str(uuid.uuid4())
+    # Taken now: the headers go out before the first day is generated
+    snapshot = request_snapshot(http_request)
+    
+    async def save_day(day: int, diet_chart: EnhancedDietChart, stored: Dict[str, Any]):
+        # Each day is saved like a single chart, so it is listed with the patient's charts and in
+        # reports; the persistence budget applies per day
+        stored['plan_id'] = plan_id
+        stored['day'] = day
+        try:
+            await persist(Deadline.from_env(request.deadline_seconds),
+                          save_chart(diet_chart, stored, request.doctor_id))
+        except Exception as e:
+            logging.error(f"Error saving meal plan {plan_id} day {day}: {e}")
+    
+    async def events():
+        # Days are saved while the next ones are generated and streamed; done waits for the saves
+        saves = []
+        try:
+            deadline = Deadline.from_env(request.deadline_seconds)
+            async for day, diet_chart, stored in geo_ayurvedic_engine.generate_meal_plan(request, deadline, snapshot):
+                payload = {"plan_id": plan_id, "day": day, "chart": jsonable_encoder(diet_chart)}
+                yield f"event: day\ndata: {json.dumps(payload)}\n\n"
+                saves.append(asyncio.ensure_future(save_day(day, diet_chart, stored)))
+            
+            if saves:
+                # wait, not gather: a client leaving now must not cancel the saves
+                await asyncio.wait(saves)
+            yield f"event: done\ndata: {json.dumps({'plan_id': plan_id, 'days': request.days})}\n\n"
+        except Exception as e:
+            logging.error(f"Error generating meal plan: {e}")
+            yield f"event: error\ndata: {json.dumps({'plan_id': plan_id, 'detail': str(e)})}\n\n"
+        finally:
+            # Saves still running when the plan fails or the client goes away finish in the background
+            for task in saves:
+                if not task.done():
+                    BACKGROUND_WRITES.add(task)
+                    task.add_done_callback(background_write_done)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.post("/patients")
 async def create_patient(patient_data: dict):
     """Create a new patient"""
@@ -875,39 +1417,52 @@ async def create_patient(patient_data: dict):
             if field not in patient_data:
                 raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
         
-        # Check if patient ID already exists
-        existing_patient = await db.patients.find_one({"PatientID": patient_data['PatientID']})
+        # Check if patient ID already exists; while Mongo is unreachable the ID is taken as given
+        try:
+            existing_patient = await db.patients.find_one({"PatientID": patient_data['PatientID']})
+        except ConnectionFailure:
+            existing_patient = None
         if existing_patient:
             # Generate new ID if conflict
             import random
             patient_data['PatientID'] = f"{patient_data['PatientID'][:-3]}{random.randint(100, 999)}"
         
-        # Insert patient into database
+        # Insert patient into database (queued locally while it is unreachable)
         result = await db.patients.insert_one(patient_data)
         
-        # Return the created patient
+        # Return the created patient; dashboards hear about it once it is stored (see publish_replayed)
         patient_data['_id'] = str(result.inserted_id)
-        return {"message": "Patient created successfully", "patient": patient_data}
+        if result.acknowledged:
+            LIVE_UPDATES.record_write("patients", "patient.created", patient_data)
+        return {"message": "Patient created successfully", "patient": patient_data, "queued": not result.acknowledged}
         
     except HTTPException:
         # Re-raise HTTPExceptions as-is (don't convert to 500)
         raise
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
     except Exception as e:
         logging.error(f"Error creating patient: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/patients/{patient_id}")
-async def get_patient_by_id(patient_id: str):
+async def get_patient_by_id(patient_id: str, request: Request):
     """Get a specific patient by ID"""
     try:
-        # First try to find in database
-        patient = await db.patients.find_one({"PatientID": patient_id})
+        # First try to find in database, or the last copy read from it while it is unreachable
+        try:
+            patient = await db.patients.find_one({"PatientID": patient_id})
+        except ConnectionFailure as e:
+            logging.warning(f"MongoDB unavailable, serving cached patient {patient_id}: {e}")
+            patient = READ_CACHE.get(('patient', patient_id))
         if patient:
             patient['_id'] = str(patient['_id'])
+            READ_CACHE.put(('patient', patient_id), patient)
             return patient
         
         # If not found in database, check static data
-        patients_data = load_patients_data()
+        patients_data = request_snapshot(request).patients
         for patient in patients_data:
             if patient['PatientID'] == patient_id:
                 return patient
@@ -916,23 +1471,49 @@ async def get_patient_by_id(patient_id: str):
         
     except HTTPException:
         raise
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
     except Exception as e:
         logging.error(f"Error fetching patient {patient_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def read_patient_diet_charts(patient_id: str, snapshot: CatalogSnapshot) -> List[Dict[str, Any]]:
+    """A patient's charts, newest first, rehydrated from compact storage"""
+    charts = await db.patient_diet_charts.find({"patient_id": patient_id}).sort("created_at", -1).to_list(length=None)
+    
+    # Charts are stored once, compactly; rebuild them with one query
+    chart_ids = [chart['chart_id'] for chart in charts if 'chart_id' in chart]
+    stored = await db.enhanced_diet_charts.find({"id": {"$in": chart_ids}}, {"_id": 0}).to_list(length=None)
+    rehydrated = {chart_data['id']: chart_data for chart_data in await rehydrate_charts(stored, snapshot)}
+    
+    # Convert back from database format
+    legacy = []
+    for chart in charts:
+        chart['_id'] = str(chart['_id'])
+        if 'chart_id' in chart:
+            chart['chart_data'] = rehydrated.get(chart.pop('chart_id'))
+            chart.pop('total_daily_calories', None)
+        elif chart.get('chart_data'):
+            legacy.append(chart)
+        if isinstance(chart.get('created_at'), str):
+            chart['created_at'] = chart['created_at']
+    
+    # Charts saved before compact storage are compacted on first read
+    for chart in legacy:
+        await compact_legacy_patient_chart(chart)
+    
+    return charts
+
 @api_router.get("/patients/{patient_id}/diet-charts")
-async def get_patient_diet_charts(patient_id: str):
+async def get_patient_diet_charts(patient_id: str, request: Request):
     """Get all diet charts for a specific patient"""
+    snapshot = request_snapshot(request)
     try:
-        charts = await db.patient_diet_charts.find({"patient_id": patient_id}).sort("created_at", -1).to_list(length=None)
-        
-        # Convert back from database format
-        for chart in charts:
-            chart['_id'] = str(chart['_id'])
-            if isinstance(chart.get('created_at'), str):
-                chart['created_at'] = chart['created_at']
-        
-        return charts
+        return await read_through(('diet_charts', patient_id), lambda: read_patient_diet_charts(patient_id, snapshot))
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
     except Exception as e:
         logging.error(f"Error fetching patient diet charts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -946,8 +1527,13 @@ async def create_appointment(appointment: Appointment):
         
         result = await db.appointments.insert_one(appointment_dict)
         appointment_dict['_id'] = str(result.inserted_id)
+        if result.acknowledged:
+            LIVE_UPDATES.record_write("appointments", "appointment.created", appointment_dict)
         
         return appointment_dict
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
     except Exception as e:
         logging.error(f"Error creating appointment: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -955,13 +1541,17 @@ async def create_appointment(appointment: Appointment):
 @api_router.get("/appointments")
 async def get_appointments():
     """Get all appointments"""
-    try:
+    async def read():
         appointments = await db.appointments.find().sort("appointment_date", 1).to_list(length=None)
-        
         for appointment in appointments:
             appointment['_id'] = str(appointment['_id'])
-        
         return appointments
+    
+    try:
+        return await read_through(('appointments',), read)
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
     except Exception as e:
         logging.error(f"Error fetching appointments: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -973,40 +1563,46 @@ async def get_todays_appointments():
         from datetime import date
         today = "2025-09-22"  # Set to September 22, 2025 as requested
         
-        appointments = await db.appointments.find({"appointment_date": today}).sort("appointment_time", 1).to_list(length=None)
-        
-        for appointment in appointments:
-            appointment['_id'] = str(appointment['_id'])
+        async def read():
+            appointments = await db.appointments.find({"appointment_date": today}).sort("appointment_time", 1).to_list(length=None)
+            for appointment in appointments:
+                appointment['_id'] = str(appointment['_id'])
+            return appointments
         
-        return appointments
+        return await read_through(('appointments', today), read)
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
     except Exception as e:
         logging.error(f"Error fetching today's appointments: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/live")
+async def live_updates(topics: Optional[str] = None, last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events with appointment and patient changes, after the client loaded its snapshot"""
+    return StreamingResponse(
+        LIVE_UPDATES.stream(sse_topics(topics), parse_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.post("/parse-recipe")
-async def parse_recipe(recipe_text: str = Form(None), recipe_image: UploadFile = File(None)):
+async def parse_recipe(request: Request, recipe_text: str = Form(None), recipe_image: UploadFile = File(None)):
     """Enhanced recipe parsing with OCR support"""
     try:
-        recipe_parser = EnhancedRecipeParser()
+        snapshot = request_snapshot(request)
         ingredients = []
         
         if recipe_text:
-            ingredients = recipe_parser.parse_recipe_text(recipe_text)
+            ingredients = recipe_parser.parse_recipe_text(recipe_text, snapshot)
         elif recipe_image:
             # Read image and convert to base64
             image_content = await recipe_image.read()
             image_base64 = base64.b64encode(image_content).decode()
-            ingredients = await recipe_parser.parse_recipe_image(image_base64)
+            ingredients = await recipe_parser.parse_recipe_image(image_base64, snapshot)
         
         # Get food details for ingredients
-        ingredient_details = []
-        for ingredient in ingredients:
-            if ingredient in FOOD_DATABASE:
-                ingredient_details.append({
-                    "key": ingredient,
-                    "name": FOOD_DATABASE[ingredient]["name"],
-                    "category": FOOD_DATABASE[ingredient]["category"]
-                })
+        ingredient_details = describe_ingredients(ingredients, snapshot)
         
         return {
             "ingredients": ingredients,
@@ -1018,23 +1614,79 @@ async def parse_recipe(recipe_text: str = Form(None), recipe_image: UploadFile =
         logging.error(f"Error parsing recipe: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/parse-recipes/batch")
+async def parse_recipes_batch(batch: BatchRecipeRequest, request: Request):
+    """Parse many recipe texts and images in one request, keyed by input id"""
+    if len(batch.recipes) > MAX_BATCH_RECIPES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_RECIPES} recipes per batch")
+    ids = [item.id for item in batch.recipes]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Recipe ids must be unique")
+    
+    snapshot = request_snapshot(request)
+    texts = {item.id: item.recipe_text for item in batch.recipes if item.recipe_text}
+    images = {item.id: item.recipe_image_base64 for item in batch.recipes
+              if item.recipe_image_base64 and item.id not in texts}
+    
+    def parse_texts():
+        return {recipe_id: recipe_parser.parse_recipe_text(text, snapshot) for recipe_id, text in texts.items()}
+    
+    ocr_slots = asyncio.Semaphore(OCR_CONCURRENCY)
+    
+    async def parse_image(recipe_id: str, image_base64: str):
+        async with ocr_slots:
+            return recipe_id, await recipe_parser.parse_recipe_image(image_base64, snapshot)
+    
+    # Texts go through the shared parser in one worker thread while images run OCR concurrently
+    try:
+        parsed_texts, *parsed_images = await asyncio.gather(
+            asyncio.to_thread(parse_texts),
+            *(parse_image(recipe_id, image) for recipe_id, image in images.items())
+        )
+    except Exception as e:
+        logging.error(f"Error parsing recipe batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    parsed = {**parsed_texts, **dict(parsed_images)}
+    results = {}
+    for recipe_id in ids:
+        if recipe_id not in parsed:
+            results[recipe_id] = {"success": False, "error": "recipe_text or recipe_image_base64 is required"}
+            continue
+        ingredient_details = describe_ingredients(parsed[recipe_id], snapshot)
+        results[recipe_id] = {
+            "ingredients": parsed[recipe_id],
+            "ingredient_details": ingredient_details,
+            "success": True,
+            "total_found": len(ingredient_details)
+        }
+    
+    return {
+        "results": results,
+        "total": len(ids),
+        "parsed": sum(1 for result in results.values() if result["success"]),
+        "dataset_version": snapshot.version
+    }
+
 @api_router.get("/smart-swaps/{food_key}")
-async def get_smart_swaps(food_key: str, allergens: List[str] = [], dislikes: List[str] = []):
+async def get_smart_swaps(food_key: str, request: Request, allergens: List[str] = [], dislikes: List[str] = []):
     """Get smart swap suggestions for a food item"""
     try:
         swap_engine = SmartSwapEngine()
-        swaps = swap_engine.find_swaps(food_key, allergens, dislikes)
-        
-        swap_details = []
-        for swap_name in swaps:
-            # Find the food key for this swap name
-            swap_key = next((k for k, v in FOOD_DATABASE.items() if v['name'] == swap_name), None)
-            if swap_key:
-                swap_details.append({
-                    "name": swap_name,
-                    "key": swap_key,
-                    "reason": "Allergen-free alternative" if allergens else "Alternative option"
-                })
+        snapshot = request_snapshot(request)
+        FOOD_DATABASE = snapshot.foods
+        # Accept display names and regional aliases as well as keys
+        food_key = snapshot.resolver.resolve(food_key) or food_key
+        swaps = swap_engine.find_swap_options(food_key, allergens, dislikes, snapshot)
+        
+        swap_details = [
+            {
+                "name": swap_name,
+                "key": swap_key,
+                "reason": "Allergen-free alternative" if allergens else "Alternative option"
+            }
+            for swap_key, swap_name in swaps
+        ]
         
         return {
             "original_food": FOOD_DATABASE.get(food_key, {}).get('name', 'Unknown'),
@@ -1045,6 +1697,86 @@ async def get_smart_swaps(food_key: str, allergens: List[str] = [], dislikes: Li
         logging.error(f"Error getting smart swaps: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/admin/datasets")
+async def get_dataset_version(request: Request):
+    """Report the active dataset snapshot"""
+    snapshot = request_snapshot(request)
+    return {
+        "version": snapshot.version,
+        "catalog_version": snapshot.catalog.version,
+        "compiled": snapshot.catalog.compiled,
+        "loaded_at": datetime.fromtimestamp(snapshot.loaded_at, timezone.utc).isoformat(),
+        "foods": len(snapshot.foods),
+        "patients": len(snapshot.patients)
+    }
+
+@api_router.post("/admin/datasets/reload")
+async def reload_datasets(x_admin_token: Optional[str] = Header(None)):
+    """Rebuild the dataset snapshot off the request path and publish it atomically"""
+    require_admin(x_admin_token)
+    previous = CATALOG.current.version
+    reloaded = await asyncio.to_thread(CATALOG.reload, True)
+    return {"reloaded": reloaded, "previous_version": previous, "version": CATALOG.current.version}
+
+@api_router.get("/reports/calorie-trends")
+async def get_calorie_trends(days: int = 365, patient_id: Optional[str] = None, bucket: str = "day"):
+    """Daily (or monthly) chart calories per patient, from the report rollups"""
+    if bucket not in ("day", "month"):
+        raise HTTPException(status_code=400, detail="bucket must be 'day' or 'month'")
+    try:
+        return {"days": days, "bucket": bucket, "patients": await reports.calorie_trends(db, days, patient_id, bucket)}
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
+    except Exception as e:
+        logging.error(f"Error building calorie trends report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/reports/charts-per-doctor")
+async def get_charts_per_doctor(weeks: int = 52):
+    """Charts generated per doctor per ISO week, from the report rollups"""
+    try:
+        return {"weeks": weeks, "doctors": await reports.charts_per_doctor(db, weeks)}
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
+    except Exception as e:
+        logging.error(f"Error building charts per doctor report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/reports/distribution")
+async def get_patient_distribution(request: Request):
+    """Constitution and condition distribution and allergen prevalence across all patients"""
+    snapshot = request_snapshot(request)
+    try:
+        return await reports.distribution(db, snapshot.index('patient_stats'), snapshot.index('static_patient_ids'))
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
+    except Exception as e:
+        logging.error(f"Error building patient distribution report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/reports/rebuild")
+async def rebuild_report_rollups(x_admin_token: Optional[str] = Header(None)):
+    """Recompute the report rollups from every saved chart"""
+    require_admin(x_admin_token)
+    try:
+        return await reports.rebuild_rollups(db)
+    except ConnectionFailure:
+        # Answered 503 by mongo_unavailable
+        raise
+    except Exception as e:
+        logging.error(f"Error rebuilding report rollups: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/ready")
+async def readiness():
+    """Readiness for load balancers: 503 while the MongoDB circuit breaker is not closed"""
+    status = await MONGO.status()
+    ready = status['state'] == 'closed'
+    return JSONResponse({"ready": ready, "mongo": status}, status_code=200 if ready else 503)
+
 @api_router.get("/weather/{location}")
 async def get_weather(location: str):
     try:
@@ -1057,12 +1789,33 @@ async def get_weather(location: str):
 # Include the router in the main app
 app.include_router(api_router)
 
+# Optionally serve the production frontend bundle from this process; mounted
+# last so it only sees paths no API route claimed.
+SERVE_FRONTEND = os.environ.get('SERVE_FRONTEND', '').lower() in ('1', 'true', 'yes')
+FRONTEND_BUILD_DIR = Path(os.environ.get('FRONTEND_BUILD_DIR', ROOT_DIR.parent / 'frontend' / 'build'))
+if SERVE_FRONTEND and (FRONTEND_BUILD_DIR / 'index.html').exists():
+    app.mount("/", FrontendBundle(FRONTEND_BUILD_DIR), name="frontend")
+
+@app.exception_handler(ConnectionFailure)
+async def mongo_unavailable(request: Request, exc: ConnectionFailure):
+    """Reads without a static or cached fallback answer 503 while MongoDB is unreachable"""
+    return JSONResponse({"detail": f"Database unavailable: {exc}"}, status_code=503)
+
+@app.middleware("http")
+async def add_dataset_version_header(request: Request, call_next):
+    """Expose the dataset version a request was served from, for debugging"""
+    response = await call_next(request)
+    # Recorded by the handler when it took its snapshot (request_snapshot); the current version otherwise
+    response.headers['X-Dataset-Version'] = getattr(request.state, 'dataset_version', None) or CATALOG.current.version
+    return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Dataset-Version"],
 )
 
 # Configure logging
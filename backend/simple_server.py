@@ -1,8 +1,14 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
-import json
+import hmac
 import os
+import signal
+import threading
+import time
 from pathlib import Path
+from catalog import CatalogStore
+from search_index import FoodSearchIndex
+from http_cache import payload_index
 
 app = Flask(__name__)
 CORS(app)
@@ -10,17 +16,44 @@ CORS(app)
 # Get the directory of the current script
 ROOT_DIR = Path(__file__).parent
 
-# Load datasets
-def load_json_data(filename):
-    try:
-        with open(ROOT_DIR / 'datasets' / filename, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+# Load datasets.  Foods and allergies come from the compiled, memory-mapped
+# catalog (catalog.py); handlers read CATALOG.current once per request so a
+# hot reload swaps versions between requests, never within one.
+CATALOG = CatalogStore(ROOT_DIR / 'datasets')
+DATASET_WATCH_INTERVAL = float(os.environ.get('DATASET_WATCH_INTERVAL', '5'))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+MAX_SEARCH_LIMIT = 100
+# Parent process of a serve_production worker, which relays reloads to its siblings
+SUPERVISOR_PID = None
+# Workers that exit sooner than this after starting are restarted with a growing delay
+MIN_WORKER_LIFETIME = 10.0
+MAX_RESPAWN_DELAY = 30.0
+# Derived indexes serve_production builds before forking, so workers share one copy
+# instead of each building its own on first use
+PRELOAD_INDEXES = [name.strip() for name in os.environ.get('PRELOAD_INDEXES', '').split(',') if name.strip()]
+
+CATALOG.register_index('search', FoodSearchIndex.from_snapshot)
+# Static reference payloads, serialized and compressed once per dataset version
+CATALOG.register_index('payloads', payload_index({
+    'patients': lambda snapshot: snapshot.patients,
+    'food-items': lambda snapshot: dict(snapshot.foods),
+    'allergies': lambda snapshot: dict(snapshot.allergy_map),
+}))
 
-FOOD_DATABASE = load_json_data('food_dataset.json')
-PATIENT_DATABASE = load_json_data('patients.json')
-ALLERGY_MAP = load_json_data('allergy_map.json')
+def cached_payload(name):
+    """Serve a precomputed payload with ETag / If-None-Match handling"""
+    payload = CATALOG.current.index('payloads')[name]
+    status, body, headers = payload.respond(
+        request.headers.get('Accept-Encoding'),
+        request.headers.get('If-None-Match'),
+        request.args.get('v')
+    )
+    return Response(body, status=status, headers=headers, mimetype=payload.media_type)
+
+@app.after_request
+def add_dataset_version_header(response):
+    response.headers['X-Dataset-Version'] = CATALOG.current.version
+    return response
 
 @app.route('/')
 def home():
@@ -30,6 +63,7 @@ def home():
         "endpoints": [
             "/patients",
             "/food-items", 
+            "/food-items/search",
             "/allergies",
             "/health"
         ]
@@ -37,14 +71,33 @@ def home():
 
 @app.route('/health')
 def health_check():
-    return jsonify({"status": "healthy", "service": "AyushAahar Backend"})
+    return jsonify({"status": "healthy", "service": "AyushAahar Backend",
+                    "dataset_version": CATALOG.current.version})
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_datasets():
+    # Closed unless ADMIN_TOKEN is configured
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled (ADMIN_TOKEN is not set)"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Invalid admin token"}), 403
+    previous = CATALOG.current.version
+    reloaded = CATALOG.reload(force=True)
+    # Under serve_production this request reached one worker; the parent passes a SIGHUP on to
+    # the others, which reload if the datasets changed
+    if SUPERVISOR_PID is not None:
+        os.kill(SUPERVISOR_PID, signal.SIGHUP)
+    return jsonify({"reloaded": reloaded, "previous_version": previous,
+                    "version": CATALOG.current.version,
+                    "workers_signalled": SUPERVISOR_PID is not None})
 
 @app.route('/patients', methods=['GET'])
 def get_patients():
-    return jsonify(PATIENT_DATABASE)
+    return cached_payload('patients')
 
 @app.route('/patients/<patient_id>', methods=['GET'])
 def get_patient(patient_id):
+    PATIENT_DATABASE = CATALOG.current.patients
     if isinstance(PATIENT_DATABASE, list):
         patient = next((p for p in PATIENT_DATABASE if p.get('PatientID') == patient_id), None)
     else:
@@ -57,55 +110,154 @@ def get_patient(patient_id):
 
 @app.route('/food-items', methods=['GET'])
 def get_food_items():
-    return jsonify(FOOD_DATABASE)
+    return cached_payload('food-items')
 
 @app.route('/food-items/search', methods=['GET'])
 def search_food_items():
-    query = request.args.get('q', '').lower()
-    if not query:
-        return jsonify(FOOD_DATABASE)
-    
-    # Simple search through food items
-    results = {}
-    for category, items in FOOD_DATABASE.items():
-        if isinstance(items, list):
-            filtered_items = [item for item in items if query in str(item).lower()]
-            if filtered_items:
-                results[category] = filtered_items
-        elif isinstance(items, dict):
-            filtered_items = {k: v for k, v in items.items() if query in k.lower()}
-            if filtered_items:
-                results[category] = filtered_items
-    
-    return jsonify(results)
+    """Ranked type-ahead search: ?q=&limit=&offset=&category=grains,spices"""
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), MAX_SEARCH_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    categories = {c.strip() for c in request.args.get('category', '').split(',') if c.strip()}
+
+    index = CATALOG.current.index('search')
+    return jsonify(index.search(request.args.get('q', ''), limit, offset, categories or None))
 
 @app.route('/allergies', methods=['GET'])
 def get_allergies():
-    return jsonify(ALLERGY_MAP)
+    return cached_payload('allergies')
 
 @app.route('/allergies/<allergy_type>', methods=['GET'])
 def get_allergy_foods(allergy_type):
-    allergy_data = ALLERGY_MAP.get(allergy_type)
+    allergy_data = CATALOG.current.allergy_map.get(allergy_type)
     if allergy_data:
         return jsonify(allergy_data)
     return jsonify({"error": "Allergy type not found"}), 404
 
 @app.route('/nutrition/<food_item>', methods=['GET'])
 def get_nutrition_info(food_item):
-    # Search for nutrition info in the food database
-    for category, items in FOOD_DATABASE.items():
-        if isinstance(items, dict):
-            for item_name, item_data in items.items():
-                if item_name.lower() == food_item.lower():
-                    return jsonify(item_data)
-                if isinstance(item_data, dict) and item_data.get('name', '').lower() == food_item.lower():
-                    return jsonify(item_data)
+    # Resolve keys, display names, spelling variants and regional aliases
+    snapshot = CATALOG.current
+    food_key = snapshot.resolver.resolve(food_item)
+    if food_key:
+        return jsonify(snapshot.foods[food_key])
     
     return jsonify({"error": "Food item not found"}), 404
 
+def preload(indexes=()):
+    """Open the current snapshot and build ``indexes`` once so forked workers share them copy-on-write.
+
+    The catalog itself is memory-mapped and needs no decoding: workers share its pages
+    through the page cache, and everything else is built lazily on first use.
+    """
+    snapshot = CATALOG.current
+    for name in indexes:
+        snapshot.index(name)
+    return snapshot
+
+def serve_production(host='0.0.0.0', port=5000, workers=None, threaded=True):
+    """Pre-fork server: preload once, then fork workers sharing one listening socket.
+
+    SIGHUP to the parent makes every worker reload changed datasets.
+    """
+    import gc
+    import socket
+    from werkzeug.serving import make_server
+
+    workers = workers or os.cpu_count() or 1
+    preload(PRELOAD_INDEXES)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    def run_worker():
+        CATALOG.start_watcher(DATASET_WATCH_INTERVAL)
+        server = make_server(host, port, app, threaded=threaded, fd=sock.fileno())
+        signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda *_: threading.Thread(target=CATALOG.reload, daemon=True).start())
+        server.serve_forever()
+
+    if workers == 1 or not hasattr(os, 'fork'):
+        run_worker()
+        return
+
+    # Keep the preloaded heap out of the collector so it is not dirtied
+    # page by page in every child.
+    gc.freeze()
+
+    children = {}
+    supervisor = os.getpid()
+
+    def spawn():
+        global SUPERVISOR_PID
+        pid = os.fork()
+        if pid == 0:
+            # Until run_worker installs its own, a SIGHUP must not reach the parent's relay
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            SUPERVISOR_PID = supervisor
+            try:
+                run_worker()
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    def signal_workers(signum, frame):
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def shutdown(signum, frame):
+        signal_workers(signal.SIGTERM, frame)
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGHUP, signal_workers)
+
+    for _ in range(workers):
+        spawn()
+    print(f"Serving on http://{host}:{port} with {workers} workers (threaded={threaded})")
+
+    # Workers that keep dying at startup are restarted after 1, 2, 4, ... seconds, not in a tight loop
+    quick_exits = 0
+    while True:
+        pid, status = os.wait()
+        started = children.pop(pid, None)
+        if started is None:
+            continue
+        quick_exits = quick_exits + 1 if time.monotonic() - started < MIN_WORKER_LIFETIME else 0
+        delay = min(2 ** (quick_exits - 1), MAX_RESPAWN_DELAY) if quick_exits else 0
+        print(f"Worker {pid} exited with status {status}, restarting" + (f" in {delay}s" if delay else ""))
+        time.sleep(delay)
+        spawn()
+
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AyushAahar lightweight read-only backend")
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('SIMPLE_SERVER_MODE') == 'production',
+                        help="pre-forked, threaded server with debug disabled")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SIMPLE_SERVER_WORKERS', '0')),
+                        help="worker processes in production mode (default: CPU count)")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '5000')))
+    args = parser.parse_args()
+
+    snapshot = CATALOG.current
+    FOOD_DATABASE, PATIENT_DATABASE, ALLERGY_MAP = snapshot.foods, snapshot.patients, snapshot.allergy_map
     print("Starting AyushAahar Backend Server...")
     print(f"Loading data from: {ROOT_DIR / 'datasets'}")
+    print(f"Dataset version: {snapshot.version} ({'compiled' if snapshot.catalog.compiled else 'json'} catalog)")
     print(f"Food items loaded: {len(FOOD_DATABASE)} categories")
     
     if isinstance(PATIENT_DATABASE, list):
@@ -115,4 +267,8 @@ if __name__ == '__main__':
     
     print(f"Allergy types loaded: {len(ALLERGY_MAP)} types")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if args.production:
+        serve_production(args.host, args.port, args.workers or None)
+    else:
+        CATALOG.start_watcher(DATASET_WATCH_INTERVAL)
+        app.run(debug=True, host=args.host, port=args.port)
\ No newline at end of file
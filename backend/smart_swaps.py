@@ -0,0 +1,95 @@
+"""Precomputed smart-swap graph.
+
+Built once per dataset snapshot (``CatalogStore.register_index``): for every
+food, the ``SWAP_CANDIDATES`` most similar foods of the same category, ranked
+by dosha effect and nutrition per 100 g, as lists of food indexes; plus every food's
+allergen bitmask (bits from the ``FoodScorer`` allergy masks).  A query walks
+one short list, skipping alternatives whose bitmask meets the patient's or
+that the patient dislikes, and returns keys and names without touching the
+food database.
+"""
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+import numpy as np
+
+# Alternatives kept per food; allergen and dislike filtering picks from these.
+SWAP_CANDIDATES = 16
+MAX_SWAPS = 3
+NUTRIENTS = ("calories_per_100g", "protein", "carbs", "fat", "fiber")
+DOSHA_WEIGHT = 1.0
+NUTRITION_WEIGHT = 0.5
+# Rows of the category distance matrix computed at once, bounding build memory.
+_CHUNK = 256
+
+
+class SwapGraph:
+    """Same-category alternatives for each food, most similar first."""
+
+    def __init__(self, foods, scorer, candidates: int = SWAP_CANDIDATES):
+        self.keys: List[str] = scorer.keys
+        self.names: List[str] = [foods[key]['name'] for key in self.keys]
+        self.position: Dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+        self.allergen_bits = scorer.allergen_bits
+        # Python ints: a query tests a handful of foods, where numpy scalars are slower.
+        self.masks: List[int] = [0] * len(self.keys)
+        for allergen, bit in self.allergen_bits.items():
+            for i in np.flatnonzero(scorer.allergen_masks[allergen]):
+                self.masks[i] |= bit
+
+        # Features: dosha effects and nutrients standardized across the catalog.
+        nutrition = np.array([[float(foods[key].get(n) or 0.0) for n in NUTRIENTS] for key in self.keys])
+        nutrition = (nutrition - nutrition.mean(axis=0)) / np.maximum(nutrition.std(axis=0), 1e-9)
+        features = np.hstack([np.sqrt(DOSHA_WEIGHT) * scorer.effects.T.astype(np.float64),
+                              np.sqrt(NUTRITION_WEIGHT) * nutrition])
+
+        self.alternatives: List[Tuple[int, ...]] = [()] * len(self.keys)
+        categories: Dict[str, List[int]] = {}
+        for i, key in enumerate(self.keys):
+            categories.setdefault(foods[key].get('category'), []).append(i)
+        for members in categories.values():
+            members = np.array(members)
+            block = features[members]
+            norms = (block ** 2).sum(axis=1)
+            for start in range(0, len(members), _CHUNK):
+                rows = block[start:start + _CHUNK]
+                distances = norms[start:start + _CHUNK, None] + norms[None, :] - 2 * rows @ block.T
+                distances[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+                keep = min(candidates, len(members) - 1)
+                if keep < len(members) - 1:
+                    nearest = np.argpartition(distances, keep, axis=1)[:, :keep + 1]
+                else:
+                    nearest = np.broadcast_to(np.arange(len(members)), distances.shape)
+                # Nearest first, ties in catalog order; the food itself (inf) sorts last and is dropped.
+                order = np.lexsort((nearest, np.take_along_axis(distances, nearest, axis=1)), axis=1)
+                ranked = members[np.take_along_axis(nearest, order, axis=1)[:, :keep]]
+                for row, alternatives in enumerate(ranked.tolist()):
+                    self.alternatives[members[start + row]] = tuple(alternatives)
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'SwapGraph':
+        return cls(snapshot.foods, snapshot.index('scoring'))
+
+    def allergen_bitmask(self, allergens: Iterable[str]) -> int:
+        bits = 0
+        for allergen in allergens:
+            bits |= self.allergen_bits.get(allergen.lower(), 0)
+        return bits
+
+    @staticmethod
+    def disliked(dislikes: Iterable[str]) -> FrozenSet[str]:
+        return frozenset(d.lower() for d in dislikes)
+
+    def swaps(self, food_key: str, allergen_bits: int = 0, disliked: FrozenSet[str] = frozenset(),
+              limit: int = MAX_SWAPS) -> List[Tuple[str, str]]:
+        """Up to ``limit`` (key, name) alternatives free of ``allergen_bits`` and not disliked."""
+        i = self.position.get(food_key)
+        if i is None:
+            return []
+        swaps = []
+        for j in self.alternatives[i]:
+            if self.masks[j] & allergen_bits or self.keys[j].lower() in disliked:
+                continue
+            swaps.append((self.keys[j], self.names[j]))
+            if len(swaps) == limit:
+                break
+        return swaps
@@ -0,0 +1,14 @@
+// Subscribe to appointment/patient changes pushed by the backend (/api/live).
+// Load the snapshot once, then apply these deltas; on "resync" reload the
+// snapshot. EventSource reconnects on its own and resumes from the last event.
+// Returns a function that closes the stream.
+export function subscribeLiveUpdates(api, topics, handlers) {
+  if (typeof EventSource === 'undefined') {
+    return () => {};
+  }
+  const source = new EventSource(`${api}/live?topics=${topics.join(',')}`);
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, (e) => handler(JSON.parse(e.data || '{}')));
+  });
+  return () => source.close();
+}
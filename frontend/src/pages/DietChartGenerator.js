@@ -214,6 +214,7 @@ const DietChartGenerator = () => {
           custom_preferences: formData.custom_preferences
         },
         city_name: formData.city_name,
+        doctor_id: user?.id,
         meal_recipes: {
           breakfast: mealRecipes.breakfast.text || mealRecipes.breakfast.image ? {
             recipe_text: mealRecipes.breakfast.text || null,
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../App';
 import axios from 'axios';
+import { subscribeLiveUpdates } from '../lib/liveUpdates';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Badge } from '../components/ui/badge';
@@ -24,6 +25,7 @@ import {
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const TODAY = '2025-09-22'; // Matches /appointments/today
 
 const DoctorDashboard = () => {
   const navigate = useNavigate();
@@ -41,7 +43,21 @@ const DoctorDashboard = () => {
     
     loadTodayAppointments();
     
-    return () => clearInterval(timer);
+    // New appointments are pushed by the backend instead of refetching the list
+    const unsubscribe = subscribeLiveUpdates(API, ['appointments'], {
+      'appointment.created': (appointment) => {
+        if (appointment.appointment_date !== TODAY) return;
+        setTodayAppointments((current) => current.some((a) => a.id === appointment.id)
+          ? current
+          : [...current, appointment].sort((a, b) => a.appointment_time.localeCompare(b.appointment_time)));
+      },
+      resync: () => loadTodayAppointments()
+    });
+    
+    return () => {
+      clearInterval(timer);
+      unsubscribe();
+    };
   }, []);
 
   const loadTodayAppointments = async () => {
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../App';
 import axios from 'axios';
+import { subscribeLiveUpdates } from '../lib/liveUpdates';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Input } from '../components/ui/input';
@@ -25,6 +26,28 @@ import {
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Transform backend data to match frontend expectations
+const transformPatient = (patient, index) => {
+  return {
+    id: patient.PatientID || `UNKNOWN_${index}`,
+    name: patient.Name || 'Unknown Patient',
+    age: patient.Age || 0,
+    gender: patient.Gender || 'Unknown',
+    prakriti: patient.Constitution || 'Not assessed',
+    vikriti: patient.Constitution || 'Not assessed', // Using same as prakriti for now
+    location: patient.City || 'Unknown',
+    phone: patient.Phone || '+91 9876543210', // Use actual phone if available
+    email: patient.Email || `${(patient.Name || 'patient').toLowerCase().replace(' ', '.')}@email.com`,
+    lastVisit: patient.LastVisit || '2025-09-22',
+    condition: patient.Condition || 'General consultation',
+    charts: patient.Charts || 0,
+    compliance: typeof patient.Compliance === 'string' ? 
+               parseInt(patient.Compliance.replace('%', '')) : 
+               patient.Compliance || 0,
+    status: patient.Status ? patient.Status.toLowerCase() : 'active'
+  };
+};
+
 const PatientManagement = () => {
   const navigate = useNavigate();
   const { user } = useAuth();
@@ -37,6 +60,16 @@ const PatientManagement = () => {
 
   useEffect(() => {
     loadPatients();
+    
+    // Newly created patients are pushed by the backend instead of refetching the list
+    return subscribeLiveUpdates(API, ['patients'], {
+      'patient.created': (patient) => {
+        setPatients((current) => current.some((p) => p.id === patient.PatientID)
+          ? current
+          : [...current, transformPatient(patient, current.length)]);
+      },
+      resync: () => loadPatients()
+    });
   }, []);
 
   const loadPatients = async () => {
@@ -66,28 +99,9 @@ const PatientManagement = () => {
         return;
       }
       
-      // Transform backend data to match frontend expectations
       const transformedPatients = response.data.map((patient, index) => {
         console.log(`Transforming patient ${index + 1}:`, patient);
-        
-        return {
-          id: patient.PatientID || `UNKNOWN_${index}`,
-          name: patient.Name || 'Unknown Patient',
-          age: patient.Age || 0,
-          gender: patient.Gender || 'Unknown',
-          prakriti: patient.Constitution || 'Not assessed',
-          vikriti: patient.Constitution || 'Not assessed', // Using same as prakriti for now
-          location: patient.City || 'Unknown',
-          phone: patient.Phone || '+91 9876543210', // Use actual phone if available
-          email: patient.Email || `${(patient.Name || 'patient').toLowerCase().replace(' ', '.')}@email.com`,
-          lastVisit: patient.LastVisit || '2025-09-22',
-          condition: patient.Condition || 'General consultation',
-          charts: patient.Charts || 0,
-          compliance: typeof patient.Compliance === 'string' ? 
-                     parseInt(patient.Compliance.replace('%', '')) : 
-                     patient.Compliance || 0,
-          status: patient.Status ? patient.Status.toLowerCase() : 'active'
-        };
+        return transformPatient(patient, index);
       });
       
       console.log('Transformed patients:', transformedPatients);
@@ -0,0 +1,129 @@
+"""
+Microbenchmark for diet chart assembly (backend/server.py).
+
+Plans portions for a mix of patients once, then times each step of
+``assemble_chart`` per chart: smart swaps, meal data, the chart models
+(``finish_chart``), the stored form and the ``PatientDietChart`` reference the
+generate endpoint builds.  Runs with the default trusted model construction
+and with ``STRICT_MODELS`` on (strict validation), then times ``chart_model``
+alone building each patient's chart from plain data in both modes.  Fails if
+strict validation rejects a chart or the two produce different charts.
+
+Imports the server module, so it needs the backend requirements installed;
+it does not connect to MongoDB.
+
+    cd tests
+    python chart_assembly_benchmark.py --charts 2000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'ayushaahar_benchmark')
+os.environ.setdefault('DATASET_WATCH_INTERVAL', '0')
+
+import server  # noqa: E402
+from deadline import Deadline  # noqa: E402
+
+PATIENTS = [("Vata", 28, "Male", "Mumbai", [], 2000), ("Pitta", 45, "Female", "Delhi", ["milk"], None),
+            ("Kapha", 12, "Other", "Srinagar", ["gluten", "nuts"], 1600)]
+STEPS = ("swaps", "meals", "models", "stored", "reference")
+# Fields that differ between any two charts built from the same inputs
+VOLATILE = {'id', 'created_at'}
+
+
+def contexts():
+    """(context, portions) per patient, planned once"""
+    engine = server.geo_ayurvedic_engine
+    snapshot = server.CATALOG.current
+    planned = []
+    for i, (constitution, age, gender, city, allergens, target) in enumerate(PATIENTS):
+        request = server.EnhancedDietRequest(
+            patient_profile={"patient_id": f"P{i:05d}", "name": "Benchmark Patient", "age": age, "gender": gender,
+                             "city": city, "constitution": constitution, "condition": "Healthy",
+                             "allergies": allergens},
+            diet_preferences={"allergies": [], "dislikes": [], "calorie_target": target},
+            city_name=city
+        )
+        context = server.ChartContext(request, snapshot, server.EnhancedWeatherService.default_weather(city),
+                                      {meal: [] for meal in ("breakfast", "lunch", "snack", "dinner")},
+                                      allergens, Deadline.from_env())
+        planned.append((context, engine.plan_portions(context, engine.select_meal_foods(context))))
+    return planned
+
+
+def assemble(context, portions, timings):
+    """``assemble_chart`` step by step, adding each step's seconds to ``timings``"""
+    engine = server.geo_ayurvedic_engine
+    start = time.perf_counter()
+    swaps = {meal_type: engine.plan_swaps(context, meal_portions) for meal_type, meal_portions in portions.items()}
+    lap = time.perf_counter()
+    timings["swaps"] += lap - start
+    meals = [engine.build_meal(context, meal_type, portions[meal_type], swaps[meal_type]) for meal_type in portions]
+    start, lap = lap, time.perf_counter()
+    timings["meals"] += lap - start
+    diet_chart = engine.finish_chart(context, meals, portions, swaps)
+    start, lap = lap, time.perf_counter()
+    timings["models"] += lap - start
+    engine.stored_chart(context, diet_chart, portions, swaps, regenerable=True)
+    start, lap = lap, time.perf_counter()
+    timings["stored"] += lap - start
+    server.chart_model(server.PatientDietChart, {"patient_id": diet_chart.patient_id, "chart_data": diet_chart,
+                                                 "doctor_notes": "", "doctor_id": None})
+    timings["reference"] += time.perf_counter() - lap
+    return diet_chart
+
+
+def construct(strict, planned, charts):
+    """Seconds per chart for ``chart_model`` to build a whole chart from plain data"""
+    server.STRICT_MODELS = strict
+    values = [assemble(context, portions, dict.fromkeys(STEPS, 0.0)).model_dump() for context, portions in planned]
+    start = time.perf_counter()
+    for i in range(charts):
+        server.chart_model(server.EnhancedDietChart, values[i % len(values)])
+    return (time.perf_counter() - start) / charts
+
+
+def run(strict, planned, charts):
+    """(seconds per step, the first chart of each patient as JSON)"""
+    server.STRICT_MODELS = strict
+    timings = dict.fromkeys(STEPS, 0.0)
+    outputs = []
+    for i in range(charts):
+        diet_chart = assemble(*planned[i % len(planned)], timings)
+        if i < len(planned):
+            outputs.append(diet_chart.model_dump(mode='json', exclude=VOLATILE))
+    return timings, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--charts", type=int, default=2000)
+    args = parser.parse_args()
+
+    planned = contexts()
+    run(False, planned, len(planned))  # warm the scoring and swap caches
+    results = {"trusted": run(False, planned, args.charts), "strict": run(True, planned, args.charts)}
+    models = {name: construct(strict, planned, args.charts) for name, strict in (("trusted", False), ("strict", True))}
+    charts = [outputs for _, outputs in results.values()]
+    mismatches = sum(a != b for a, b in zip(*charts))
+
+    print("🏁 Chart Assembly Benchmark")
+    print("=" * 70)
+    print(f"Charts per mode:        {args.charts}")
+    print(f"{'µs per chart':<14}" + "".join(f"{step:>10}" for step in STEPS) + f"{'total':>10}")
+    for name, (timings, _) in results.items():
+        print(f"{name:<14}" + "".join(f"{timings[step] / args.charts * 1e6:>10.1f}" for step in STEPS)
+              + f"{sum(timings.values()) / args.charts * 1e6:>10.1f}")
+    print(f"Chart models only:      " + ", ".join(f"{name} {seconds * 1e6:.1f} µs" for name, seconds in models.items()))
+    print(f"Output mismatches:      {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
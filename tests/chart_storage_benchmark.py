@@ -0,0 +1,135 @@
+"""
+Benchmark for compact diet chart storage (backend/chart_storage.py).
+
+Builds charts the way the server does (climate plan, smart swaps, portions)
+for a mix of patients, then compares the BSON bytes written per chart in the
+old full form (the chart in ``enhanced_diet_charts`` plus the copy embedded
+in ``patient_diet_charts``) with the compact form plus the chart reference,
+and times rehydration and the lossless check that compacts old documents.
+Also checks that charts stored with schema 2 (one string per food) still
+rehydrate to the same chart.
+
+    cd tests
+    python chart_storage_benchmark.py --charts 500
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import bson
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from catalog import CatalogStore  # noqa: E402
+from food_scoring import FoodScorer  # noqa: E402
+from smart_swaps import SwapGraph  # noqa: E402
+import chart_storage  # noqa: E402
+
+PATIENTS = [("Vata", 28, "Male", [], 2000), ("Pitta", 45, "Female", ["milk"], None),
+            ("Kapha", 12, "Other", ["gluten", "nuts"], 1600)]
+WEATHER = [(34.0, "Summer"), (22.0, "Autumn"), (8.0, "Winter")]
+MEAL_ROLES = {"breakfast": [("grains", 1), ("protein", 1)],
+              "lunch": [("grains", 1), ("protein", 1), ("vegetables", 2)],
+              "snack": [("protein", 1), ("spices", 1)],
+              "dinner": [("grains", 1), ("vegetables", 1), ("spices", 1)]}
+
+
+def build_chart(i, snapshot, scorer, graph):
+    """(full chart dict, compact chart dict) for the i-th patient/weather mix"""
+    constitution, age, gender, allergens, target = PATIENTS[i % len(PATIENTS)]
+    temperature, season = WEATHER[i % len(WEATHER)]
+    plan = scorer.plan(constitution, temperature, season, allergens, 4)
+    bits = graph.allergen_bitmask(allergens)
+    note = f"Adjusted for {age}yr {gender}"
+
+    portions, swaps, meals = {}, {}, []
+    for meal_type, roles in MEAL_ROLES.items():
+        keys = [key for role, count in roles for key in plan[role][:count]]
+        portions[meal_type] = [(key, 100, 100 if not target else 90 + j * 5) for j, key in enumerate(keys)]
+        swaps[meal_type] = [[swap for swap, _ in graph.swaps(key, bits)] for key in keys]
+        foods = [chart_storage.food_item(snapshot.foods[key], grams, base,
+                                         [snapshot.foods[s]['name'] for s in food_swaps], "moderate", bool(target))
+                 for (key, base, grams), food_swaps in zip(portions[meal_type], swaps[meal_type])]
+        meals.append(chart_storage.meal(meal_type, foods, f"Climate-adapted {meal_type} for {constitution} "
+                                                          f"constitution in {season.lower()} weather ({temperature}°C)"))
+    smart_swaps_applied, portion_adjustments = chart_storage.chart_notes(snapshot.foods, portions, swaps, note, target)
+    chart = {
+        'id': str(uuid.uuid4()), 'patient_id': f"P{i:05d}", 'meals': meals,
+        'total_daily_calories': sum(meal['total_calories'] for meal in meals),
+        'weather_context': {'temperature': temperature, 'humidity': 60.0, 'description': 'clear sky',
+                            'season': season, 'city': 'Mumbai'},
+        'ayurvedic_analysis': f"Personalized {constitution} diet plan adapted for Mumbai climate conditions.",
+        'recommendations': [f"Diet adapted for {season.lower()} season with {temperature}°C temperature",
+                            f"Portion sizes adjusted for {age}-year-old {gender}"]
+                           + ([f"Portions scaled to 1900 of {target} kcal/day target"] if target else []),
+        'smart_swaps_applied': smart_swaps_applied, 'portion_adjustments': portion_adjustments,
+        'dataset_version': snapshot.version, 'degraded_stages': [], 'version': 1, 'parent_id': None,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    }
+    stored = chart_storage.compact(chart, portions, swaps, {
+        'portion_note': note, 'activity_level': "moderate", 'calorie_target': target
+    }, version=1, parent_id=None, root_id=chart['id'])
+    return chart, stored
+
+
+def schema_2(stored):
+    """``stored`` as schema 2 saved it: one "key|base|grams|swaps" string per food"""
+    return {**stored, 'schema': 2, 'meals': [
+        {**stored_meal, 'foods': [f"{key}|{base}|{grams}|{','.join(swaps)}" for key, base, grams, swaps in
+                                  map(chart_storage.decode_food, stored_meal['foods'])]}
+        for stored_meal in stored['meals']
+    ]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--charts", type=int, default=500)
+    args = parser.parse_args()
+
+    snapshot = CatalogStore(BACKEND_DIR / 'datasets').current
+    scorer = FoodScorer(snapshot.foods, snapshot.allergy_map)
+    graph = SwapGraph(snapshot.foods, scorer)
+    names = chart_storage.food_names(snapshot)
+
+    full_bytes = compact_bytes = 0
+    rehydrate_times, legacy_times = [], []
+    mismatches = 0
+    for i in range(args.charts):
+        chart, stored = build_chart(i, snapshot, scorer, graph)
+        reference = {'id': str(uuid.uuid4()), 'patient_id': chart['patient_id'], 'created_at': chart['created_at'],
+                     'doctor_notes': "", 'doctor_id': None}
+        full_bytes += len(bson.encode(chart)) + len(bson.encode({**reference, 'chart_data': chart}))
+        compact_bytes += len(bson.encode(stored)) + len(bson.encode(
+            {**reference, 'chart_id': chart['id'], 'total_daily_calories': chart['total_daily_calories']}))
+
+        start = time.perf_counter()
+        rebuilt = chart_storage.rehydrate(stored, snapshot.foods)
+        rehydrate_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        legacy = chart_storage.compact_legacy(chart, snapshot.foods, names)
+        legacy_times.append(time.perf_counter() - start)
+        if (rebuilt != {**chart, 'version': 1, 'parent_id': None} or legacy is None
+                or chart_storage.rehydrate(schema_2(stored), snapshot.foods) != rebuilt):
+            mismatches += 1
+
+    rehydrate_times.sort()
+    legacy_times.sort()
+    print("🏁 Chart Storage Benchmark")
+    print("=" * 70)
+    print(f"Charts:                 {args.charts}")
+    print(f"Full form bytes/chart:  {full_bytes / args.charts:,.0f} (chart + embedded copy)")
+    print(f"Compact bytes/chart:    {compact_bytes / args.charts:,.0f} (chart + reference)")
+    print(f"Reduction:              {full_bytes / compact_bytes:.1f}x")
+    print(f"Rehydrate p50/p99 µs:   {rehydrate_times[len(rehydrate_times) // 2] * 1e6:.1f} / "
+          f"{rehydrate_times[int(len(rehydrate_times) * 0.99)] * 1e6:.1f}")
+    print(f"Compact old chart µs:   {legacy_times[len(legacy_times) // 2] * 1e6:.1f}")
+    print(f"Round-trip mismatches:  {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark for the offline climatology (backend/climatology.py).
+
+Times weather lookups for the cities of the static patients (plus an unknown
+city, which gets the all-city mean) across all twelve months, and prints the
+season each patient city gets per month.  Fails if a patient city is missing
+from datasets/climatology.json.
+
+    cd tests
+    python climatology_benchmark.py --lookups 100000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from climatology import Climatology  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    climatology = Climatology.load(BACKEND_DIR / 'datasets' / 'climatology.json')
+    load_ms = (time.perf_counter() - start) * 1000
+
+    with open(BACKEND_DIR / 'datasets' / 'patients.json', encoding='utf-8') as f:
+        cities = sorted({patient['City'] for patient in json.load(f)})
+    missing = [city for city in cities if city not in climatology]
+    queries = cities + ["Unknown Town"]
+
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        climatology.weather(queries[i % len(queries)], i % 12 + 1)
+    lookup_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+    print("🏁 Climatology Benchmark")
+    print("=" * 70)
+    print(f"Cities in table:        {len(climatology.names)}")
+    print(f"Load time:              {load_ms:.2f} ms")
+    print(f"Lookup:                 {lookup_us:.2f} µs ({args.lookups} lookups)")
+    print(f"Patient cities missing: {', '.join(missing) or 'none'}")
+    print()
+    print(f"{'City':<14}" + "".join(f"{month:>4}" for month in "JFMAMJJASOND"))
+    for city in queries:
+        seasons = [climatology.weather(city, month)['season'][:3] for month in range(1, 13)]
+        print(f"{city:<14}" + "".join(f"{season:>4}" for season in seasons))
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
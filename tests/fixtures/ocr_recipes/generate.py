@@ -0,0 +1,147 @@
+"""
+Regenerate the OCR fixture corpus: recipe cards rendered under different
+scan/photo conditions, plus manifest.json with the ingredients each card
+lists (food keys from backend/datasets/food_dataset.json).
+
+    cd tests/fixtures/ocr_recipes
+    python generate.py
+
+Rendering uses Pillow's bundled font and a fixed random seed, so the output
+is reproducible for a given Pillow version.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+HERE = Path(__file__).resolve().parent
+
+RECIPES = {
+    "masala_dosa": {
+        "lines": ["Masala Dosa", "Ingredients:", "2 cups rice", "1 cup urad dal", "1 tsp fenugreek seeds",
+                  "2 onion, sliced", "1 tsp mustard seeds", "Curry leaves", "Coconut oil for roasting"],
+        "ingredients": ["rice", "urad_dal", "fenugreek_seeds", "onion", "mustard_seeds", "curry_leaves",
+                        "coconut_oil"],
+    },
+    "sambar": {
+        "lines": ["Sambar", "1 cup toor dal", "2 tomato, chopped", "1 drumstick", "Tamarind pulp",
+                  "1/2 tsp turmeric", "Pinch of asafoetida", "Salt to taste"],
+        "ingredients": ["toor_dal", "tomato", "drumstick", "tamarind", "turmeric", "asafoetida", "salt"],
+    },
+    "khichdi": {
+        "lines": ["Moong Khichdi", "1/2 cup rice", "1/2 cup moong dal", "1 tbsp ghee", "1 tsp cumin seeds",
+                  "Ginger, grated", "Turmeric and salt"],
+        "ingredients": ["rice", "moong_dal", "ghee", "cumin_seeds", "ginger", "turmeric", "salt"],
+    },
+    "paneer_masala": {
+        "lines": ["Paneer Butter Masala", "200 g paneer", "2 tbsp butter", "3 tomato, pureed", "1 onion",
+                  "Ginger garlic paste", "1 tsp garam masala", "Red chili powder", "Coriander seeds"],
+        "ingredients": ["paneer", "butter", "tomato", "onion", "ginger", "garlic", "garam_masala", "red_chili",
+                        "coriander_seeds"],
+    },
+    "chicken_curry": {
+        "lines": ["Chicken Curry", "500 g chicken", "2 onion", "2 tomato", "Ginger and garlic",
+                  "1 tsp turmeric", "Red chili", "Coconut milk", "Salt"],
+        "ingredients": ["chicken", "onion", "tomato", "ginger", "garlic", "turmeric", "red_chili", "coconut",
+                        "salt"],
+    },
+    "chapati": {
+        "lines": ["Chapati", "2 cups wheat flour", "Water as needed", "Pinch of salt", "Ghee to brush"],
+        "ingredients": ["wheat", "salt", "ghee"],
+    },
+}
+
+
+def render(lines, font_size, size, margin, ink=0, paper=255, mode="L"):
+    font = ImageFont.load_default(size=font_size)
+    image = Image.new(mode, size, paper)
+    draw = ImageDraw.Draw(image)
+    x, y = margin
+    for line in lines:
+        draw.text((x, y), line, fill=ink, font=font)
+        y += int(font_size * 1.5)
+    return image
+
+
+def add_noise(image, rng, amount):
+    pixels = np.asarray(image).astype(np.int16)
+    noise = rng.normal(0, amount, pixels.shape)
+    return Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
+
+
+def uneven_lighting(image, strength):
+    pixels = np.asarray(image).astype(np.float32)
+    h, w = pixels.shape[:2]
+    gradient = np.linspace(1.0 - strength, 1.0, w)[None, :] * np.linspace(1.0, 1.0 - strength / 2, h)[:, None]
+    if pixels.ndim == 3:
+        gradient = gradient[:, :, None]
+    return Image.fromarray(np.clip(pixels * gradient, 0, 255).astype(np.uint8))
+
+
+def salt_and_pepper(image, rng, fraction):
+    pixels = np.asarray(image).copy()
+    mask = rng.random(pixels.shape[:2])
+    pixels[mask < fraction / 2] = 0
+    pixels[mask > 1 - fraction / 2] = 255
+    return Image.fromarray(pixels)
+
+
+def build(rng):
+    """{filename: (image, save kwargs, recipe, condition)}"""
+    r = RECIPES
+    return {
+        # Flatbed scan at 300 DPI: already clean and high contrast.
+        "clean_scan_300dpi.png": (
+            render(r["masala_dosa"]["lines"], 42, (1240, 900), (80, 60)),
+            {"dpi": (300, 300)}, "masala_dosa", "clean 300 DPI scan"),
+        # Clean but tiny: a thumbnail-sized card that needs upscaling.
+        "small_card.png": (
+            render(r["sambar"]["lines"], 13, (300, 220), (12, 10)),
+            {}, "sambar", "clean, low resolution"),
+        # Big page, small text block in one corner.
+        "large_margins.png": (
+            render(r["khichdi"]["lines"], 30, (2000, 2400), (1200, 1500)),
+            {"dpi": (200, 200)}, "khichdi", "small text block on a large page"),
+        # Phone photo: uneven lighting, sensor noise, slight blur.
+        "phone_photo.jpg": (
+            add_noise(uneven_lighting(render(r["paneer_masala"]["lines"], 36, (1100, 900), (90, 90), ink=40,
+                                             paper=225), 0.45), rng, 12).filter(ImageFilter.GaussianBlur(1.2)),
+            {"quality": 85}, "paneer_masala", "photo with uneven lighting and noise"),
+        # Faded print: low contrast grey on grey.
+        "low_contrast.png": (
+            render(r["chicken_curry"]["lines"], 32, (900, 720), (60, 50), ink=110, paper=175),
+            {}, "chicken_curry", "low contrast"),
+        # Old photocopy: salt-and-pepper speckle.
+        "speckled_copy.png": (
+            salt_and_pepper(render(r["chapati"]["lines"], 34, (820, 520), (60, 60)), rng, 0.04),
+            {}, "chapati", "salt-and-pepper speckle"),
+        # Colour recipe card (RGB) with dark brown ink on cream.
+        "colour_card.jpg": (
+            render(r["sambar"]["lines"], 30, (860, 640), (60, 50), ink=(70, 40, 20), paper=(250, 238, 205),
+                   mode="RGB"),
+            {"quality": 90}, "sambar", "colour card"),
+        # High-resolution phone photo of a small card: should be downscaled.
+        "hires_photo.jpg": (
+            add_noise(render(r["khichdi"]["lines"], 90, (2400, 1700), (200, 160), ink=30, paper=235), rng, 2.5),
+            {"quality": 80}, "khichdi", "high resolution photo"),
+    }
+
+
+def main():
+    rng = np.random.default_rng(20240501)
+    manifest = {}
+    for name, (image, save_kwargs, recipe, condition) in build(rng).items():
+        image.save(HERE / name, **save_kwargs)
+        manifest[name] = {
+            "recipe": recipe,
+            "condition": condition,
+            "text": "\n".join(RECIPES[recipe]["lines"]),
+            "ingredients": RECIPES[recipe]["ingredients"],
+        }
+    (HERE / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n")
+    print(f"Wrote {len(manifest)} fixtures to {HERE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark for constitution-aware food selection (backend/food_scoring.py).
+
+Replicates the food catalog up to each requested size, builds the scoring
+matrices once and times top-k selection per meal role for every
+constitution, mirroring what select_foods_for_climate_dosha does per request,
+and the memoized ``plan`` lookup the server uses once the table is warm.
+
+    cd tests
+    python food_scoring_benchmark.py --sizes 1000 10000 50000 --repeat 200
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from catalog import CatalogStore  # noqa: E402
+from food_scoring import FoodScorer  # noqa: E402
+from synthetic_catalog import replicate  # noqa: E402
+
+CONSTITUTIONS = ["Vata", "Pitta", "Kapha", "Vata-Pitta", "Pitta-Kapha", "Vata-Kapha", "Tridoshic"]
+WEATHER = [(34.0, "Summer"), (22.0, "Autumn"), (8.0, "Winter")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    snapshot = CatalogStore(BACKEND_DIR / 'datasets').current
+
+    print("🏁 Food Scoring Benchmark")
+    print("=" * 70)
+    print(f"{'foods':>8}{'build ms':>10}{'select µs':>12}{'p99 µs':>10}{'plan µs':>10}")
+
+    for size in args.sizes:
+        foods = replicate(snapshot.foods, size)
+        start = time.perf_counter()
+        scorer = FoodScorer(foods, snapshot.allergy_map)
+        build = time.perf_counter() - start
+
+        timings = []
+        for i in range(args.repeat):
+            constitution = CONSTITUTIONS[i % len(CONSTITUTIONS)]
+            temperature, season = WEATHER[i % len(WEATHER)]
+            allergens = ["milk"] if i % 2 else []
+            start = time.perf_counter()
+            scorer.select(constitution, temperature, season, allergens, args.k)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        # Warm the plan table, then time lookups over the same inputs
+        for i in range(2 * args.repeat):
+            scorer.plan(CONSTITUTIONS[i % len(CONSTITUTIONS)], *WEATHER[i % len(WEATHER)],
+                        ["milk"] if i % 2 else [], args.k)
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            scorer.plan(CONSTITUTIONS[i % len(CONSTITUTIONS)], *WEATHER[i % len(WEATHER)],
+                        ["milk"] if i % 2 else [], args.k)
+        plan = (time.perf_counter() - start) / args.repeat
+
+        print(f"{size:>8}{build * 1000:>10.1f}{timings[len(timings) // 2] * 1e6:>12.0f}"
+              f"{timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6:>10.0f}{plan * 1e6:>10.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+"""
+Load and soak test for server.py: how many concurrent clinicians one box supports.
+
+Starts a stub OpenWeather server, a throwaway ``mongod`` (or uses
+``--mongo-url``) and a multi-worker ``uvicorn server:app``, then drives a
+clinic traffic mix from closed-loop clients (each one a clinician issuing
+the next request when the previous one returns, after ``--think-time``):
+
+    dashboard    GET /appointments/today
+    patients     GET /patients
+    profile      GET /patients/{id} + GET /patients/{id}/diet-charts
+    chart        POST /generate-enhanced-diet-chart with text recipes
+    chart_ocr    POST /generate-enhanced-diet-chart with a recipe image
+
+Concurrency is ramped through ``--concurrency`` levels, printing throughput
+against latency per level (the capacity curve).  ``--soak`` then holds
+``--soak-concurrency`` clients for that many seconds while the server's
+resident memory (all uvicorn processes, from /proc) is sampled; a memory
+slope above ``--leak-mb-per-hour`` fails the run.
+
+    cd tests
+    python load_soak_benchmark.py --workers 4 --concurrency 1 4 16 64 --step 30
+    python load_soak_benchmark.py --concurrency 16 --step 10 --soak 3600 --csv curve.csv --memory-csv rss.csv
+"""
+import argparse
+import base64
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+# Relative weights of each scenario in the traffic mix
+MIX = {
+    "dashboard": 30,
+    "patients": 20,
+    "profile": 25,
+    "chart": 22,
+    "chart_ocr": 3,
+}
+CITIES = ["Mumbai", "Delhi", "Chennai", "Kolkata", "Bengaluru", "Jaipur", "Shimla"]
+RECIPES = [
+    "Dal Rice\nToor dal, rice, ghee, turmeric, cumin",
+    "Vegetable Khichdi\nMoong dal, rice, carrot, peas, ginger, ghee",
+    "Chapati and Sabzi\nWheat flour, potato, spinach, onion, tomato",
+    "Poha\nFlattened rice, peanuts, onion, curry leaves, lemon",
+]
+
+
+class WeatherStub(BaseHTTPRequestHandler):
+    """OpenWeather-shaped responses after ``latency`` seconds, so no test touches the real API."""
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        city = parse_qs(urlparse(self.path).query).get('q', ['Mumbai'])[0]
+        temperature = 12 + (sum(map(ord, city)) % 26)
+        body = json.dumps({
+            "name": city,
+            "main": {"temp": temperature, "humidity": 40 + temperature},
+            "weather": [{"description": "clear sky"}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_weather_stub(port, latency):
+    WeatherStub.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), WeatherStub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_mongod(port):
+    """A throwaway mongod on ``port``; returns (process, data dir) or (None, None) without one installed."""
+    mongod = shutil.which("mongod")
+    if not mongod:
+        return None, None
+    dbpath = tempfile.mkdtemp(prefix="ayushaahar-load-")
+    process = subprocess.Popen(
+        [mongod, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    return process, dbpath
+
+
+def start_server(port, workers, mongo_url, db_name, weather_url):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        env={**os.environ, "MONGO_URL": mongo_url, "DB_NAME": db_name, "OPENWEATHER_URL": weather_url,
+             "OPENWEATHER_API_KEY": "load-test", "DATASET_WATCH_INTERVAL": "0"},
+    )
+
+
+def stop_process(process):
+    if process is None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=15)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def wait_until_ready(api_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{api_url}/", timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def process_tree_rss(pid):
+    """Resident memory in MB of ``pid`` and all its descendants (Linux /proc)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after it are fixed
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def recipe_image():
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (1600, 1200), color='white')
+    ImageDraw.Draw(img).text((40, 40), RECIPES[0], fill='black')
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class Clinic:
+    """The request scenarios, over patients taken from the running server."""
+
+    def __init__(self, api_url, patients, image_base64):
+        self.api_url = api_url
+        self.patients = patients
+        self.image_base64 = image_base64
+
+    def chart_request(self, rng, patient, meal_recipes):
+        return {
+            "patient_profile": {
+                "patient_id": patient.get("PatientID", "load_test"),
+                "name": patient.get("Name", "Load Test"),
+                "age": int(patient.get("Age") or 35),
+                "gender": patient.get("Gender") if patient.get("Gender") in ("Male", "Female") else "Other",
+                "city": rng.choice(CITIES),
+                "constitution": rng.choice(["Vata", "Pitta", "Kapha", "Vata-Pitta", "Tridoshic"]),
+                "condition": patient.get("Condition") or "Healthy",
+                "allergies": [],
+                "activity_level": rng.choice(["low", "moderate", "high"])
+            },
+            "diet_preferences": {
+                "allergies": rng.choice([[], [], ["milk"], ["gluten"]]),
+                "dislikes": [],
+                "calorie_target": rng.choice([None, 1600, 2000, 2400]),
+                "custom_preferences": ""
+            },
+            "city_name": rng.choice(CITIES),
+            "meal_recipes": meal_recipes,
+            "doctor_id": f"doctor_{rng.randrange(20)}"
+        }
+
+    def run(self, scenario, session, rng):
+        """Issue one scenario's requests; returns True when every response was a success."""
+        api = self.api_url
+        patient = rng.choice(self.patients)
+        patient_id = patient.get("PatientID")
+        if scenario == "dashboard":
+            responses = [session.get(f"{api}/appointments/today", timeout=30)]
+        elif scenario == "patients":
+            responses = [session.get(f"{api}/patients", headers={"Accept-Encoding": "gzip"}, timeout=30)]
+        elif scenario == "profile":
+            responses = [session.get(f"{api}/patients/{patient_id}", timeout=30),
+                         session.get(f"{api}/patients/{patient_id}/diet-charts", timeout=30)]
+        elif scenario == "chart":
+            recipes = {"lunch": {"recipe_text": rng.choice(RECIPES)}, "dinner": {"recipe_text": rng.choice(RECIPES)}}
+            responses = [session.post(f"{api}/generate-enhanced-diet-chart",
+                                      json=self.chart_request(rng, patient, recipes), timeout=60)]
+        else:
+            recipes = {"dinner": {"recipe_image_base64": self.image_base64}}
+            responses = [session.post(f"{api}/generate-enhanced-diet-chart",
+                                      json=self.chart_request(rng, patient, recipes), timeout=60)]
+        for response in responses:
+            response.content
+        return all(response.ok for response in responses)
+
+
+def drive(clinic, concurrency, duration, think_time, seed):
+    """Closed-loop clients for ``duration`` seconds; returns [(scenario, seconds, ok)]."""
+    results = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+    scenarios, weights = list(MIX), list(MIX.values())
+
+    def client(index):
+        rng = random.Random(seed * 7919 + index)
+        session = requests.Session()
+        local = []
+        while time.perf_counter() < stop_at:
+            scenario = rng.choices(scenarios, weights)[0]
+            start = time.perf_counter()
+            try:
+                ok = clinic.run(scenario, session, rng)
+            except requests.exceptions.RequestException:
+                ok = False
+            local.append((scenario, time.perf_counter() - start, ok))
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+        with lock:
+            results.extend(local)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index in range(concurrency):
+            pool.submit(client, index)
+    return results
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(results, duration):
+    latencies = sorted(seconds for _, seconds, ok in results if ok)
+    errors = sum(1 for _, _, ok in results if not ok)
+    by_scenario = {}
+    for scenario, seconds, ok in results:
+        if ok:
+            by_scenario.setdefault(scenario, []).append(seconds)
+    return {
+        "rps": len(latencies) / duration,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "errors": errors / len(results) * 100 if results else 0.0,
+        "scenario_p95": {name: percentile(sorted(values), 0.95) * 1000 for name, values in by_scenario.items()},
+    }
+
+
+class MemorySampler(threading.Thread):
+    """Samples the server's resident memory every ``interval`` seconds."""
+
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.started_at = time.time()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.samples.append((time.time() - self.started_at, process_tree_rss(self.pid)))
+            self.stopped.wait(self.interval)
+
+    def slope_mb_per_hour(self, since=0.0):
+        """Least-squares growth of resident memory over the samples taken after ``since`` seconds."""
+        points = [(t, mb) for t, mb in self.samples if t >= since]
+        if len(points) < 3:
+            return 0.0
+        mean_t = sum(t for t, _ in points) / len(points)
+        mean_mb = sum(mb for _, mb in points) / len(points)
+        variance = sum((t - mean_t) ** 2 for t, _ in points)
+        if not variance:
+            return 0.0
+        return sum((t - mean_t) * (mb - mean_mb) for t, mb in points) / variance * 3600
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--step", type=float, default=20.0, help="seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds between a client's requests")
+    parser.add_argument("--soak", type=float, default=0.0, help="seconds to hold --soak-concurrency after the ramp")
+    parser.add_argument("--soak-concurrency", type=int, default=16)
+    parser.add_argument("--leak-mb-per-hour", type=float, default=50.0)
+    parser.add_argument("--sample-interval", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--weather-port", type=int, default=8190)
+    parser.add_argument("--weather-latency", type=float, default=0.05)
+    parser.add_argument("--mongo-url", help="use this MongoDB instead of starting a throwaway mongod")
+    parser.add_argument("--mongo-port", type=int, default=27117)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--csv", help="write the capacity curve here")
+    parser.add_argument("--memory-csv", help="write the memory samples here")
+    args = parser.parse_args()
+
+    print("🏁 Load and Soak Test: server.py")
+    print("=" * 70)
+
+    weather = start_weather_stub(args.weather_port, args.weather_latency)
+    mongod, dbpath = (None, None) if args.mongo_url else start_mongod(args.mongo_port)
+    if not args.mongo_url and mongod is None:
+        print("❌ No mongod on PATH; pass --mongo-url for a running MongoDB (or compatible stand-in)")
+        weather.shutdown()
+        return 1
+    mongo_url = args.mongo_url or f"mongodb://127.0.0.1:{args.mongo_port}"
+    db_name = f"ayushaahar_load_{int(time.time())}"
+    api_url = f"http://127.0.0.1:{args.port}/api"
+    server = start_server(args.port, args.workers, mongo_url, db_name,
+                          f"http://127.0.0.1:{args.weather_port}/data/2.5/weather")
+    sampler = MemorySampler(server.pid, args.sample_interval)
+    curve = []
+    try:
+        if not wait_until_ready(api_url):
+            print(f"❌ server did not start on port {args.port}")
+            return 1
+        patients = requests.get(f"{api_url}/patients", timeout=30).json() or [{}]
+        clinic = Clinic(api_url, patients, recipe_image())
+        print(f"Workers: {args.workers}, patients: {len(patients)}, mix: "
+              + ", ".join(f"{name} {weight}" for name, weight in MIX.items()))
+        sampler.start()
+
+        drive(clinic, max(1, min(args.concurrency)), args.warmup, args.think_time, args.seed)
+        print(f"\n{'clients':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err %':>7}{'RSS MB':>9}   p95 ms by scenario")
+        for level in args.concurrency:
+            summary = summarize(drive(clinic, level, args.step, args.think_time, args.seed + level), args.step)
+            summary.update(clients=level, rss=process_tree_rss(server.pid))
+            curve.append(summary)
+            by_scenario = " ".join(f"{name}={ms:.0f}" for name, ms in sorted(summary["scenario_p95"].items()))
+            print(f"{level:>8}{summary['rps']:>9.1f}{summary['p50']:>9.1f}{summary['p95']:>9.1f}"
+                  f"{summary['p99']:>9.1f}{summary['errors']:>7.1f}{summary['rss']:>9.0f}   {by_scenario}")
+
+        best = max(curve, key=lambda row: row["rps"]) if curve else None
+        if best:
+            print(f"\n📈 Peak {best['rps']:.1f} req/s at {best['clients']} clients (p95 {best['p95']:.0f} ms)")
+
+        leaked = False
+        if args.soak:
+            soak_start = time.time() - sampler.started_at
+            print(f"\n⏳ Soak: {args.soak_concurrency} clients for {args.soak:.0f}s")
+            summary = summarize(drive(clinic, args.soak_concurrency, args.soak, args.think_time, args.seed), args.soak)
+            slope = sampler.slope_mb_per_hour(since=soak_start)
+            soak_samples = [mb for t, mb in sampler.samples if t >= soak_start]
+            print(f"   {summary['rps']:.1f} req/s, p95 {summary['p95']:.0f} ms, errors {summary['errors']:.1f}%")
+            if soak_samples:
+                print(f"   RSS {soak_samples[0]:.0f} → {soak_samples[-1]:.0f} MB, trend {slope:+.1f} MB/hour")
+            leaked = slope > args.leak_mb_per_hour
+            print(f"{'❌' if leaked else '✅'} Memory trend {'above' if leaked else 'within'} "
+                  f"{args.leak_mb_per_hour:.0f} MB/hour")
+        return 1 if leaked else 0
+    finally:
+        sampler.stopped.set()
+        stop_process(server)
+        if args.csv and curve:
+            with open(args.csv, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["clients", "rps", "p50_ms", "p95_ms", "p99_ms", "error_pct", "rss_mb"])
+                for row in curve:
+                    writer.writerow([row["clients"], f"{row['rps']:.2f}", f"{row['p50']:.1f}", f"{row['p95']:.1f}",
+                                     f"{row['p99']:.1f}", f"{row['errors']:.2f}", f"{row['rss']:.0f}"])
+        if args.memory_csv and sampler.samples:
+            with open(args.memory_csv, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["seconds", "rss_mb"])
+                writer.writerows((f"{t:.1f}", f"{mb:.1f}") for t, mb in sampler.samples)
+        stop_process(mongod)
+        if dbpath:
+            shutil.rmtree(dbpath, ignore_errors=True)
+        weather.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark for OCR preprocessing (backend/ocr_preprocess.py): legacy vs adaptive.
+
+Runs every image in tests/fixtures/ocr_recipes through each preprocessing
+mode, OCRs the result with the same Tesseract settings as the server and
+reports milliseconds per stage, OCR time and ingredient recall (how many of
+the ingredients printed on each card are found in the OCR text).
+
+Exits non-zero when the adaptive pipeline finds fewer ingredients than the
+legacy one, so a faster pipeline cannot silently lose recall.
+
+    cd tests
+    python ocr_preprocess_benchmark.py --repeat 3
+    python ocr_preprocess_benchmark.py --no-ocr     # stage timings only
+    python ocr_preprocess_benchmark.py --engine pytesseract   # process per image
+"""
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'ocr_recipes'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from catalog import CatalogStore  # noqa: E402
+from ocr_engine import create_engine  # noqa: E402
+from ocr_preprocess import OCRPreprocessor, PreprocessConfig  # noqa: E402
+
+MODES = ["legacy", "adaptive"]
+
+
+def load_fixtures():
+    manifest = json.loads((FIXTURES_DIR / 'manifest.json').read_text())
+    fixtures = []
+    for name, entry in manifest.items():
+        image = Image.open(FIXTURES_DIR / name)
+        dpi = image.info.get('dpi', (None,))[0]
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB')
+        fixtures.append((name, np.array(image), dpi, set(entry['ingredients'])))
+    return fixtures
+
+
+def found_ingredients(text, resolver):
+    """Food keys whose name, key spelling or regional alias appears in ``text``."""
+    text = ' '.join(text.lower().split())
+    found = set()
+    for food_key, spellings in resolver.spellings.items():
+        pattern = resolver.alias_patterns.get(food_key)
+        if (pattern and pattern.search(text)) or any(len(s) > 2 and s in text for s in spellings):
+            found.add(food_key)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="preprocessing runs per image (best is kept)")
+    parser.add_argument("--no-ocr", action="store_true", help="skip Tesseract; report stage timings only")
+    parser.add_argument("--engine", choices=["auto", "workers", "pytesseract"], default="auto",
+                        help="OCR engine (see backend/ocr_engine.py)")
+    args = parser.parse_args()
+
+    engine = None
+    if not args.no_ocr:
+        engine = create_engine(args.engine)
+        engine.start()
+    resolver = CatalogStore(BACKEND_DIR / 'datasets').current.resolver
+    fixtures = load_fixtures()
+
+    print("🏁 OCR Preprocessing Benchmark")
+    print("=" * 70)
+    print(f"{len(fixtures)} fixture images from {FIXTURES_DIR}")
+    if engine:
+        print(f"OCR engine: {engine.name}")
+
+    recall = {}
+    for mode in MODES:
+        preprocessor = OCRPreprocessor(PreprocessConfig(mode=mode))
+        stage_totals = defaultdict(float)
+        totals = {"preprocess": 0.0, "ocr": 0.0, "expected": 0, "found": 0}
+        print(f"\n[{mode}]")
+        print(f"{'image':<24}{'prep ms':>9}{'ocr ms':>9}{'recall':>9}  stages")
+
+        for name, image, dpi, expected in fixtures:
+            best = None
+            for _ in range(args.repeat):
+                result = preprocessor.run(image, dpi)
+                if best is None or sum(result.timings.values()) < sum(best.timings.values()):
+                    best = result
+            prep = sum(best.timings.values())
+            for stage, seconds in best.timings.items():
+                stage_totals[stage] += seconds
+            totals["preprocess"] += prep
+
+            ocr_ms, recall_text = 0.0, "-"
+            if not args.no_ocr:
+                start = time.perf_counter()
+                text = engine.recognize(best.image)
+                ocr_ms = (time.perf_counter() - start) * 1000
+                totals["ocr"] += ocr_ms / 1000
+                hits = found_ingredients(text, resolver) & expected
+                totals["expected"] += len(expected)
+                totals["found"] += len(hits)
+                recall_text = f"{len(hits)}/{len(expected)}"
+
+            print(f"{name:<24}{prep * 1000:>9.1f}{ocr_ms:>9.0f}{recall_text:>9}  {' > '.join(best.stages)}")
+
+        print("   per stage (ms, all images): " +
+              ", ".join(f"{stage} {seconds * 1000:.1f}" for stage, seconds in stage_totals.items()))
+        summary = f"   total: preprocess {totals['preprocess'] * 1000:.1f} ms"
+        if not args.no_ocr:
+            recall[mode] = totals["found"] / max(totals["expected"], 1)
+            summary += f", OCR {totals['ocr'] * 1000:.0f} ms, ingredient recall {recall[mode] * 100:.1f}%"
+        print(summary)
+
+    if engine:
+        engine.close()
+    if recall.get("adaptive", 1.0) < recall.get("legacy", 0.0):
+        print(f"\n❌ Adaptive preprocessing lost recall: {recall['adaptive'] * 100:.1f}% "
+              f"< legacy {recall['legacy'] * 100:.1f}%")
+        return 1
+    if recall:
+        print(f"\n✅ Adaptive recall {recall['adaptive'] * 100:.1f}% vs legacy {recall['legacy'] * 100:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
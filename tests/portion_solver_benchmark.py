@@ -0,0 +1,80 @@
+"""
+Benchmark for the vectorized portion solver (backend/portion_solver.py).
+
+Builds batches of synthetic patients - four meals each with 2-4 foods from
+the catalog at their default portions and a random daily calorie target -
+solves them in one call and prints solve time, how close meals land to their
+calorie targets and how many end within their macro ranges.  Random meals
+of two to four foods often cannot reach the ranges at any portions the
+solver allows; those are scaled for calories only and counted separately.
+
+    cd tests
+    python portion_solver_benchmark.py --patients 100 500 1000 --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from catalog import CatalogStore  # noqa: E402
+from portion_solver import NutrientMatrix, meal_targets, out_of_bounds, solve_portions  # noqa: E402
+
+MEAL_SIZES = {"breakfast": 2, "lunch": 4, "snack": 2, "dinner": 3}
+
+
+def make_meals(keys, patients, rng):
+    meals = []
+    for _ in range(patients):
+        targets = meal_targets(float(rng.integers(1400, 2800)), list(MEAL_SIZES))
+        for meal_type, size in MEAL_SIZES.items():
+            foods = list(rng.choice(keys, size=min(size, len(keys)), replace=False))
+            grams = [float(g) for g in rng.choice([50, 60, 80, 100], size=len(foods))]
+            meals.append((foods, grams, targets[meal_type]))
+    return meals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    foods = CatalogStore(BACKEND_DIR / 'datasets').current.foods
+    matrix = NutrientMatrix(foods)
+    rng = np.random.default_rng(args.seed)
+    keys = [key for key in matrix.keys if foods[key].get('calories_per_100g', 0) > 0]
+
+    print("🏁 Portion Solver Benchmark")
+    print("=" * 70)
+    print(f"{len(keys)} foods, {sum(MEAL_SIZES.values())} foods/patient/day, best of {args.repeat} runs")
+    print(f"\n{'patients':>9}{'meals':>8}{'solve ms':>10}{'median kcal err':>17}{'macros in range':>17}"
+          f"{'calories only':>15}")
+
+    for patients in args.patients:
+        per_gram, base, targets, max_grams = matrix.pack(make_meals(keys, patients, rng))
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            grams = solve_portions(per_gram, base, targets, max_grams=max_grams)
+            timings.append(time.perf_counter() - start)
+
+        nutrients = np.einsum('bfr,bf->br', per_gram, grams)
+        kcal_error = np.abs(nutrients[:, 0] - targets) / targets
+        outside = out_of_bounds(per_gram, grams)
+
+        print(f"{patients:>9}{len(targets):>8}{min(timings) * 1000:>10.2f}"
+              f"{statistics.median(kcal_error) * 100:>16.1f}%{(1 - outside.mean()) * 100:>16.0f}%"
+              f"{outside.mean() * 100:>14.0f}%")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
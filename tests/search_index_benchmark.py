@@ -0,0 +1,78 @@
+"""
+Benchmark for the food search index (backend/search_index.py).
+
+Replicates the food catalog (and its regional aliases) up to each requested
+size, then reports how long building the index takes and how much memory it
+keeps (tracemalloc), both paid per process on every dataset reload, and the
+latency of type-ahead queries: short and long prefixes, a prefix of a later
+word, a misspelling (trigram fallback) and a deep page.
+
+    cd tests
+    python search_index_benchmark.py --sizes 1000 10000 30000 --repeat 200
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from catalog import CatalogStore  # noqa: E402
+from search_index import FoodSearchIndex  # noqa: E402
+from synthetic_catalog import replicate  # noqa: E402
+
+# (query, offset)
+QUERIES = [("r", 0), ("ch", 0), ("coc", 0), ("coconut o", 0), ("seeds", 0), ("tumeric", 0),
+           ("chawal", 0), ("d", 200)]
+
+
+def replicate_aliases(aliases, foods):
+    """The aliases of each replicated food's original"""
+    return {key: aliases[key.rsplit('_', 1)[0]] for key in foods if key.rsplit('_', 1)[0] in aliases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 30000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    snapshot = CatalogStore(BACKEND_DIR / 'datasets').current
+
+    print("🏁 Food Search Index Benchmark")
+    print("=" * 70)
+    print(f"{'foods':>8}{'build ms':>10}{'index MB':>10}{'query µs':>10}{'p99 µs':>10}")
+
+    for size in args.sizes:
+        foods = replicate(snapshot.foods, size)
+        aliases = replicate_aliases(dict(snapshot.aliases), foods)
+
+        start = time.perf_counter()
+        index = FoodSearchIndex(foods, aliases)
+        build = time.perf_counter() - start
+        # Traced separately: tracemalloc itself slows the build down several times
+        del index
+        tracemalloc.start()
+        index = FoodSearchIndex(foods, aliases)
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        timings = []
+        for i in range(args.repeat):
+            query, offset = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            index.search(query, 20, offset)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        print(f"{size:>8}{build * 1000:>10.0f}{retained / 2 ** 20:>10.1f}"
+              f"{timings[len(timings) // 2] * 1e6:>10.0f}"
+              f"{timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6:>10.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
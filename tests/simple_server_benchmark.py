@@ -0,0 +1,155 @@
+"""
+Throughput benchmark for simple_server.py: development server vs. production mode.
+
+Launches the server in each mode on its own port, drives concurrent GET
+requests against the read-only endpoints and prints requests/second and
+latency percentiles per endpoint.
+
+    cd tests
+    python simple_server_benchmark.py --concurrency 32 --duration 10 --workers 4
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+ENDPOINTS = [
+    "/patients",
+    "/food-items",
+    "/nutrition/rice",
+]
+
+MODES = {
+    "development": [],
+    "production": ["--production"],
+}
+
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def start_server(mode, port, workers):
+    args = [sys.executable, "simple_server.py", "--port", str(port)] + MODES[mode]
+    if mode == "production":
+        args += ["--workers", str(workers)]
+    return subprocess.Popen(
+        args,
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,  # the dev reloader forks; kill the whole group
+        env={**os.environ, "DATASET_WATCH_INTERVAL": "0"},
+    )
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def drive(url, concurrency, duration):
+    """Hammer one URL from `concurrency` threads for `duration` seconds."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        local, local_errors = [], 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                session.get(url, timeout=10).content
+                local.append(time.perf_counter() - start)
+            except requests.exceptions.RequestException:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+
+    return latencies, errors
+
+
+def summarize(latencies, errors, duration):
+    if not latencies:
+        return {"rps": 0.0, "p50": 0.0, "p99": 0.0, "errors": errors}
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    print("🏁 simple_server.py Throughput Benchmark")
+    print("=" * 70)
+    print(f"Concurrency: {args.concurrency}, duration: {args.duration}s per endpoint, "
+          f"production workers: {args.workers}")
+
+    results = {}
+    for offset, mode in enumerate(args.modes):
+        port = args.port + offset
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_server(mode, port, args.workers)
+        try:
+            if not wait_until_ready(base_url):
+                print(f"❌ {mode} server did not start on port {port}")
+                continue
+            for endpoint in ENDPOINTS:
+                drive(f"{base_url}{endpoint}", args.concurrency, min(1.0, args.duration))  # warm-up
+                latencies, errors = drive(f"{base_url}{endpoint}", args.concurrency, args.duration)
+                results[(mode, endpoint)] = summarize(latencies, errors, args.duration)
+        finally:
+            stop_server(process)
+
+    print(f"\n{'mode':<13}{'endpoint':<18}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for (mode, endpoint), r in results.items():
+        print(f"{mode:<13}{endpoint:<18}{r['rps']:>10.0f}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['errors']:>8}")
+
+    for endpoint in ENDPOINTS:
+        dev, prod = results.get(("development", endpoint)), results.get(("production", endpoint))
+        if dev and prod and dev["rps"]:
+            print(f"📈 {endpoint}: production is {prod['rps'] / dev['rps']:.1f}x development throughput")
+
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
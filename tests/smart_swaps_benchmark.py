@@ -0,0 +1,67 @@
+"""
+Benchmark for the precomputed smart-swap graph (backend/smart_swaps.py).
+
+Replicates the food catalog up to each requested size, builds the swap graph
+once and times swap lookups for a whole chart (every food of a typical
+four-meal chart) with and without allergens and dislikes.
+
+    cd tests
+    python smart_swaps_benchmark.py --sizes 1000 10000 50000 --repeat 500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from catalog import CatalogStore  # noqa: E402
+from food_scoring import FoodScorer  # noqa: E402
+from smart_swaps import SwapGraph  # noqa: E402
+from synthetic_catalog import replicate  # noqa: E402
+
+# Foods in a typical chart: 2 + 4 + 2 + 3 across the four meals
+CHART_FOODS = 11
+PATIENTS = [([], []), (["milk"], []), (["gluten", "nuts"], ["rice"])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    snapshot = CatalogStore(BACKEND_DIR / 'datasets').current
+
+    print("🏁 Smart Swap Benchmark")
+    print("=" * 70)
+    print(f"{'foods':>8}{'build ms':>10}{'chart µs':>10}{'p99 µs':>10}")
+
+    for size in args.sizes:
+        foods = replicate(snapshot.foods, size)
+        scorer = FoodScorer(foods, snapshot.allergy_map)
+        start = time.perf_counter()
+        graph = SwapGraph(foods, scorer)
+        build = time.perf_counter() - start
+
+        keys = graph.keys
+        timings = []
+        for i in range(args.repeat):
+            allergens, dislikes = PATIENTS[i % len(PATIENTS)]
+            chart = [keys[(i * CHART_FOODS + j) % len(keys)] for j in range(CHART_FOODS)]
+            start = time.perf_counter()
+            bits, disliked = graph.allergen_bitmask(allergens), graph.disliked(dislikes)
+            for food_key in chart:
+                graph.swaps(food_key, bits, disliked)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        print(f"{size:>8}{build * 1000:>10.1f}{timings[len(timings) // 2] * 1e6:>10.1f}"
+              f"{timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6:>10.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
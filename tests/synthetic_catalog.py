@@ -0,0 +1,10 @@
+"""
+Synthetic food catalogs for the benchmarks: the real catalog replicated up to
+a requested size, so per-food costs can be measured at production scale.
+"""
+
+
+def replicate(foods, size):
+    """``size`` foods cycling through ``foods``, keyed ``<original key>_<n>``"""
+    keys = list(foods)
+    return {f"{keys[i % len(keys)]}_{i}": foods[keys[i % len(keys)]] for i in range(size)}